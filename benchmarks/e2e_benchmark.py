@@ -0,0 +1,370 @@
+"""
+End-to-end matches-per-hour benchmark of a whole battle sequence.
+
+Runs GameController.execute_battle_sequence in process against a recorded
+session (a state graph in the format of virtual_device.py) and reports, per
+match, the seconds spent in every phase, the ADB calls, the screenshots and
+the CPU seconds. Run from the repository root:
+
+    python benchmarks/e2e_benchmark.py [--session FILE] [--matches 3]
+        [--history benchmarks/e2e_history.jsonl]
+
+A session may also name a directory of zoomed card images ("cards", relative
+to the graph like its images) and their card info ("deck", by card id), used
+instead of images/cards and deck.json so the bot recognizes the cards the
+session shows.
+
+Every run is appended to the history file and compared with the previous
+run of the same session, so an added sleep or an extra screenshot shows up
+as a regression.
+
+The bot's adb calls are answered by the replay device instead of a
+subprocess, and the bot runs on a SimulatedClock (utils/clock.py): sleeps
+and the device latency cost no real time while the time spent matching
+still counts, so a match takes about its CPU seconds to run. CPU seconds
+include the replay device, which is cheap next to the bot's own matching.
+The turn detector runs inline (TurnDetector.threaded) rather than on its
+own thread, so identical runs make the same calls and take the same
+simulated seconds, and the tolerances below only catch real changes.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.virtual_device import VirtualDevice
+from controllers.battle_controller import BattleController
+from controllers.emulator_controller import EmulatorController
+from controllers.game_controller import GameController
+from models.app_state import AppState
+from models.game_state import GameState
+from services.card_data_service import CardDataService
+from services.card_recognition_service import CardRecognitionService
+from utils.clock import SimulatedClock, clock
+from utils.image_utils import ImageProcessor
+from utils.loaders import load_all_cards, load_template_images
+
+DEFAULT_SESSION = os.path.join("benchmarks", "sessions", "one_turn.json")
+DEFAULT_HISTORY = os.path.join("benchmarks", "e2e_history.jsonl")
+PHASES = [
+    "prepare_for_battle",
+    "navigate_to_battle",
+    "start_battle",
+    "handle_battle",
+    "end_battle",
+]
+# Modules whose subprocess is replaced while the benchmark runs
+BOT_PACKAGES = ("controllers.", "services.", "utils.")
+# Slower matches than this (relative) or more calls than this per match
+# compared to the previous run are reported as regressions
+SECONDS_TOLERANCE = 0.05
+CALLS_TOLERANCE = 0.5
+
+
+class ReplayDevice(VirtualDevice):
+    """VirtualDevice kept in memory that answers subprocess.run in process"""
+
+    def __init__(self, graph_path, clock):
+        super().__init__(graph_path, clock=clock)
+        self.state = self.initial_state()
+        self.entries = []
+        self.calls = 0
+        self._frames = {}
+        self._png = {}
+        self._lock = threading.RLock()
+
+    def locked(self, func, *args, **kwargs):
+        with self._lock:
+            self.advance_timers()
+            return func(*args, **kwargs)
+
+    def log(self, command, **details):
+        self.entries.append(
+            {
+                "t": self.clock.time(),
+                "command": command,
+                "screen": self.state["screen"],
+                **details,
+            }
+        )
+
+    def render(self, screen):
+        # Frames are only ever encoded, so the cached one is never modified
+        if screen not in self._frames:
+            self._frames[screen] = super().render(screen)
+        return self._frames[screen]
+
+    def encode_png(self, frame):
+        if id(frame) not in self._png:
+            self._png[id(frame)] = super().encode_png(frame)
+        return self._png[id(frame)]
+
+    def store_file(self, path, data):
+        self.state["files"][path] = data
+
+    def pull(self, source, destination):
+        data = self.locked(lambda: self.state["files"].get(source))
+        if data is None:
+            return b"", 1
+        with open(destination, "wb") as f:
+            f.write(data)
+        return b"", 0
+
+    def run(self, args, **kwargs):
+        """subprocess.run for the bot, adb commands never leave the process"""
+        if not args or args[0] != "adb":
+            return subprocess.run(args, **kwargs)
+        with self._lock:
+            self.calls += 1
+        out, code = self.handle(list(args[1:]))
+        err = b""
+        if kwargs.get("text"):
+            out, err = out.decode(), ""
+        return subprocess.CompletedProcess(args, code, out, err)
+
+    def count(self, command):
+        return sum(1 for entry in self.entries if entry["command"] == command)
+
+
+class ReplaySubprocess:
+    """The subprocess module as the bot sees it during the benchmark"""
+
+    TimeoutExpired = subprocess.TimeoutExpired
+    CompletedProcess = subprocess.CompletedProcess
+
+    def __init__(self, device):
+        self.run = device.run
+
+    def __getattr__(self, name):
+        return getattr(subprocess, name)
+
+
+def patch_subprocess(device):
+    """Route the bot modules' adb calls to device, returns the patched modules"""
+    replacement = ReplaySubprocess(device)
+    patched = []
+    for name, module in list(sys.modules.items()):
+        if name.startswith(BOT_PACKAGES) and (
+            getattr(module, "subprocess", None) is subprocess
+        ):
+            module.subprocess = replacement
+            patched.append(module)
+    return patched
+
+
+def restore(patched):
+    for module in patched:
+        module.subprocess = subprocess
+
+
+def build_game_controller(device, log_callback):
+    app_state = AppState()
+    app_state.emulator_name = device.graph.get("serial", "emulator-5554")
+    app_state.program_path = "."
+    template_images = load_template_images("images")
+    # A session may bring the cards it shows, otherwise the deck of the checkout
+    cards = device.graph.get("cards")
+    card_images = load_all_cards(
+        os.path.join(device.graph_dir, cards)
+        if cards
+        else os.path.join("images", "cards")
+    )
+    image_processor = ImageProcessor(log_callback)
+    image_processor.register_templates(template_images)
+    card_recognition_service = CardRecognitionService(
+        image_processor, CardDataService(), None, log_callback, card_images
+    )
+    if "deck" in device.graph:
+        card_recognition_service.deck_info = device.graph["deck"]
+    game_controller = GameController(
+        app_state,
+        EmulatorController(app_state, log_callback),
+        BattleController(image_processor, template_images, card_images, log_callback),
+        image_processor,
+        card_recognition_service,
+        GameState(),
+        template_images,
+        log_callback,
+    )
+    # The detector thread would make the simulated clock follow the wall clock
+    # while it matches, and the replay would differ from run to run
+    game_controller.turn_detector.threaded = False
+    game_controller.running_event.set()
+    return game_controller
+
+
+def run_matches(session, matches, verbose=False):
+    simulated = SimulatedClock()
+    device = ReplayDevice(session, simulated)
+
+    def log_callback(message):
+        if verbose:
+            print(f"[{clock.time():8.2f}s] {message}")
+
+    previous_clock = clock.use(simulated)
+    patched = patch_subprocess(device)
+    cwd = os.getcwd()
+    # Screenshots are pulled to images/screenshot.png, keep them out of the
+    # checkout
+    workdir = tempfile.mkdtemp(prefix="e2e-benchmark-")
+    os.makedirs(os.path.join(workdir, "images"))
+    try:
+        game_controller = build_game_controller(device, log_callback)
+        os.chdir(workdir)
+        results = []
+        for _ in range(matches):
+            phases = {}
+            for phase in PHASES:
+                original = getattr(type(game_controller), phase)
+
+                def timed(original=original, phase=phase, phases=phases):
+                    phase_started = clock.time()
+                    try:
+                        return original(game_controller)
+                    finally:
+                        phases[phase] = clock.time() - phase_started
+
+                setattr(game_controller, phase, timed)
+
+            calls, screenshots = device.calls, device.count("screencap")
+            cpu, match_started = time.process_time(), clock.time()
+            game_controller.execute_battle_sequence()
+            results.append(
+                {
+                    "seconds": clock.time() - match_started,
+                    "phases": phases,
+                    "adb_calls": device.calls - calls,
+                    "screenshots": device.count("screencap") - screenshots,
+                    "cpu_seconds": time.process_time() - cpu,
+                }
+            )
+            print(
+                f"Match {len(results)}: {results[-1]['seconds']:.1f}s simulated, "
+                f"{results[-1]['adb_calls']} adb calls"
+            )
+        game_controller.stop()
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+        restore(patched)
+        clock.use(previous_clock)
+    return results
+
+
+def average(results):
+    def mean(values):
+        values = list(values)
+        return sum(values) / len(values)
+
+    summary = {
+        key: mean(result[key] for result in results)
+        for key in ["seconds", "adb_calls", "screenshots", "cpu_seconds"]
+    }
+    summary["phases"] = {
+        phase: mean(result["phases"].get(phase, 0.0) for result in results)
+        for phase in PHASES
+    }
+    summary["matches_per_hour"] = (
+        3600 / summary["seconds"] if summary["seconds"] else 0.0
+    )
+    return summary
+
+
+def git_commit():
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            timeout=5,
+        )
+        return result.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def regressions(summary, previous):
+    found = []
+    if summary["seconds"] > previous["seconds"] * (1 + SECONDS_TOLERANCE):
+        found.append(
+            f"seconds per match {previous['seconds']:.1f} -> {summary['seconds']:.1f}"
+        )
+    for key in ["adb_calls", "screenshots"]:
+        if summary[key] > previous[key] + CALLS_TOLERANCE:
+            found.append(f"{key} per match {previous[key]:.1f} -> {summary[key]:.1f}")
+    return found
+
+
+def print_summary(summary, previous=None):
+    def row(label, value, old=None, unit=""):
+        line = f"{label:<22}{value:>10.2f}{unit}"
+        if old is not None:
+            line += f"   (was {old:.2f}{unit})"
+        print(line)
+
+    old = previous or {}
+    print()
+    row("seconds / match", summary["seconds"], old.get("seconds"), "s")
+    for phase, seconds in summary["phases"].items():
+        row(f"  {phase}", seconds, old.get("phases", {}).get(phase), "s")
+    row("adb calls / match", summary["adb_calls"], old.get("adb_calls"))
+    row("screenshots / match", summary["screenshots"], old.get("screenshots"))
+    row("cpu / match", summary["cpu_seconds"], old.get("cpu_seconds"), "s")
+    row("matches / hour", summary["matches_per_hour"], old.get("matches_per_hour"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--session", default=DEFAULT_SESSION)
+    parser.add_argument("--matches", type=int, default=3)
+    parser.add_argument("--history", default=DEFAULT_HISTORY)
+    parser.add_argument("--verbose", action="store_true", help="Print the bot log")
+    args = parser.parse_args()
+
+    results = run_matches(args.session, args.matches, args.verbose)
+    summary = average(results)
+    previous = next(
+        (
+            entry
+            for entry in reversed(load_history(args.history))
+            if entry["session"] == args.session
+        ),
+        None,
+    )
+    print_summary(summary, previous["summary"] if previous else None)
+
+    entry = {
+        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "commit": git_commit(),
+        "session": args.session,
+        "matches": args.matches,
+        "summary": summary,
+        "matches_detail": results,
+    }
+    with open(args.history, "a") as f:
+        f.write(json.dumps(entry) + "\n")
+    print(f"\nAppended to {args.history}")
+
+    found = regressions(summary, previous["summary"]) if previous else []
+    for regression in found:
+        print(f"⚠️ Regression: {regression}")
+    return 1 if found else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
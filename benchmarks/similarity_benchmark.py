@@ -0,0 +1,197 @@
+"""
+Benchmark and agreement report for the similarity backends.
+
+Compares every backend of utils.similarity against the previous
+implementation (skimage structural_similarity with full=True) on image pairs
+built from the assets in images/. Run from the repository root:
+
+    python benchmarks/similarity_benchmark.py [--repeat 20] [--output report.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.similarity import SIMILARITY_BACKENDS, SimilarityEngine, to_gray
+
+try:
+    from skimage.metrics import structural_similarity
+except ImportError:
+    structural_similarity = None
+
+SCREENSHOT_PATH = os.path.join("images", "screenshot.png")
+TURN_CHECK_REGION = (50, 1560, 200, 20)
+BATTLE_LOG_TEXT_REGION = (225, 1153, 441, 58)
+ZOOM_CARD_REGION = (80, 255, 740, 1020)
+# Thresholds the bot actually decides on
+DECISION_THRESHOLDS = {"check_turn": 0.958, "battle_log": 0.8}
+
+
+def crop(image, region):
+    x, y, w, h = region
+    return image[y : y + h, x : x + w]
+
+
+def perturbations(image, rng):
+    """Yield (label, image) variants spanning high to low similarity"""
+    yield "identical", image.copy()
+    yield "brightness+8", cv2.convertScaleAbs(image, alpha=1.0, beta=8)
+    noise = rng.normal(0, 6, image.shape)
+    yield "noise6", np.clip(image + noise, 0, 255).astype(np.uint8)
+    noise = rng.normal(0, 25, image.shape)
+    yield "noise25", np.clip(image + noise, 0, 255).astype(np.uint8)
+    yield "shift2", np.roll(image, 2, axis=1)
+    yield "blur", cv2.GaussianBlur(image, (5, 5), 0)
+    yield "inverted", 255 - image
+
+
+def build_pairs():
+    rng = np.random.default_rng(1234)
+    pairs = []
+    screenshot = cv2.imread(SCREENSHOT_PATH)
+    if screenshot is not None:
+        for name, region in [
+            ("turn_region", TURN_CHECK_REGION),
+            ("zoom_card", ZOOM_CARD_REGION),
+        ]:
+            reference = crop(screenshot, region)
+            for label, variant in perturbations(reference, rng):
+                pairs.append((f"{name}/{label}", "check_turn", variant, reference))
+
+        battle_log = crop(screenshot, BATTLE_LOG_TEXT_REGION)
+        for template in ["bl_discarded", "bl_put_on_bench", "bl_put_on_active"]:
+            reference = cv2.imread(os.path.join("images", f"{template}.PNG"))
+            if reference is not None and reference.shape == battle_log.shape:
+                pairs.append(
+                    (f"battle_log/{template}", "battle_log", battle_log, reference)
+                )
+                for label, variant in perturbations(reference, rng):
+                    pairs.append(
+                        (f"{template}/{label}", "battle_log", variant, reference)
+                    )
+    return pairs
+
+
+def time_call(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        samples.append(time.perf_counter() - start)
+    return result, float(np.median(samples))
+
+
+def skimage_score(img1, img2):
+    score, _ = structural_similarity(to_gray(img1), to_gray(img2), full=True)
+    return float(score)
+
+
+def spearman(a, b):
+    rank_a = np.argsort(np.argsort(a))
+    rank_b = np.argsort(np.argsort(b))
+    if np.std(rank_a) == 0 or np.std(rank_b) == 0:
+        return 1.0
+    return float(np.corrcoef(rank_a, rank_b)[0, 1])
+
+
+def run(repeat):
+    pairs = build_pairs()
+    if not pairs:
+        print(f"No benchmark pairs could be built, is {SCREENSHOT_PATH} present?")
+        return None
+
+    engine = SimilarityEngine()
+    methods = list(SIMILARITY_BACKENDS)
+    rows = []
+    for label, decision, image, reference in pairs:
+        row = {"pair": label, "decision": decision, "shape": list(image.shape)}
+        if structural_similarity is not None:
+            row["skimage"], row["skimage_s"] = time_call(
+                lambda image=image, reference=reference: skimage_score(
+                    image, reference
+                ),
+                repeat,
+            )
+        for method in methods:
+            # Warm the reference cache so the timing reflects the steady state
+            engine.score(image, reference, method, cache=True)
+            row[method], row[f"{method}_s"] = time_call(
+                lambda image=image, reference=reference, method=method: engine.score(
+                    image, reference, method, cache=True
+                ),
+                repeat,
+            )
+        rows.append(row)
+
+    summary = {}
+    for method in methods:
+        entry = {"median_s": float(np.median([r[f"{method}_s"] for r in rows]))}
+        if structural_similarity is not None:
+            reference_scores = np.array([r["skimage"] for r in rows])
+            scores = np.array([r[method] for r in rows])
+            entry["speedup_vs_skimage"] = float(
+                np.median([r["skimage_s"] / r[f"{method}_s"] for r in rows])
+            )
+            entry["rank_correlation"] = spearman(reference_scores, scores)
+            if method.startswith("ssim"):
+                diff = np.abs(reference_scores - scores)
+                entry["max_abs_diff"] = float(diff.max())
+                entry["mean_abs_diff"] = float(diff.mean())
+                agree = [
+                    (r["skimage"] > DECISION_THRESHOLDS[r["decision"]])
+                    == (r[method] > DECISION_THRESHOLDS[r["decision"]])
+                    for r in rows
+                ]
+                entry["decision_agreement"] = sum(agree) / len(agree)
+        summary[method] = entry
+    if structural_similarity is not None:
+        summary["skimage"] = {
+            "median_s": float(np.median([r["skimage_s"] for r in rows]))
+        }
+    return {"pairs": rows, "summary": summary}
+
+
+def print_report(report):
+    print(f"{'pair':<36}" + "".join(f"{m:>15}" for m in report["summary"]))
+    for row in report["pairs"]:
+        scores = "".join(
+            f"{row[m]:>15.4f}" if m in row else f"{'-':>15}" for m in report["summary"]
+        )
+        print(f"{row['pair']:<36}{scores}")
+    print()
+    for method, entry in report["summary"].items():
+        details = ", ".join(
+            f"{key}={value:.6f}" if isinstance(value, float) else f"{key}={value}"
+            for key, value in entry.items()
+        )
+        print(f"{method:<15} {details}")
+    if structural_similarity is None:
+        print("\nskimage is not installed, agreement against the old scores skipped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", help="Write the full report as JSON")
+    args = parser.parse_args()
+
+    report = run(args.repeat)
+    if report is None:
+        return 1
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
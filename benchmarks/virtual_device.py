@@ -0,0 +1,404 @@
+"""
+Virtual ADB device that replays a recorded state graph.
+
+Installs an `adb` stand-in in a work directory. With that directory first in
+PATH, every adb call of the bot (utils.adb_utils, EmulatorController) is
+answered from the graph instead of an emulator: screencap returns the
+current screen, taps and swipes move to the next screen, and every command
+is logged. Run from the repository root:
+
+    python benchmarks/virtual_device.py install graph.json /tmp/device
+    PATH=/tmp/device:$PATH python app.py
+    python benchmarks/virtual_device.py report /tmp/device
+
+The graph is a JSON file, image paths are relative to it:
+
+    {
+        "serial": "emulator-5554",
+        "start": "lobby",
+        "seed": 1,
+        "latency": {"screencap": [0.25, 0.05], "input": [0.08, 0.02]},
+        "screens": {
+            "lobby": {
+                "image": "frames/lobby.png",
+                "overlays": [{"image": "../images/battle_button.PNG", "at": [300, 1300]}],
+                "taps": [{"region": [300, 1300, 300, 90], "next": "versus"}],
+                "swipes": [{"from": [0, 1400, 900, 200], "to": [0, 0, 900, 1000], "next": "x"}],
+                "holds": [{"region": [400, 1400, 100, 140], "screen": "zoomed_card"}],
+                "after": {"seconds": 5, "next": "opponent_turn"},
+                "match_end": false
+            }
+        }
+    }
+
+taps and swipes are tried in order, the first one containing the gesture
+wins. holds show another screen while a touch rests in their region (long
+press, swipe scan). after moves on by itself, e.g. when the opponent plays.
+A screen without an image is a blank frame of screen_size with only its
+overlays, enough for sessions built from the templates in images/.
+Screens with match_end count as finished matches in the report. latency is
+[mean, jitter] in seconds, added to every screencap and input command and
+drawn from a generator seeded with seed, so two runs wait the same.
+"""
+
+import json
+import os
+import random
+import stat
+import sys
+import time
+
+# A gesture that starts and ends this close (px) and this fast (s) is a tap
+TAP_DISTANCE = 10
+TAP_SECONDS = 0.5
+
+CONFIG_FILE = "config.json"
+STATE_FILE = "state.json"
+LOG_FILE = "device_log.jsonl"
+LOCK_FILE = "state.lock"
+
+SHIM = """#!/bin/sh
+exec "{python}" "{script}" adb "{workdir}" "$@"
+"""
+
+# Screens without an image are plain frames of this size and color (BGR)
+SCREEN_SIZE = (900, 1600)
+BLANK_COLOR = (40, 30, 30)
+
+INPUT_DEVICES = 'N: Name="virtual input"\nH: Handlers=event2\n'
+
+
+def contains(region, point):
+    x, y, w, h = region
+    return x <= point[0] < x + w and y <= point[1] < y + h
+
+
+class VirtualDevice:
+    """
+    State graph of the screens, advanced by the adb commands it receives.
+
+    Every adb call is a separate process, so the current screen, the touch
+    in progress and the files "on the device" live in state.json in the
+    work directory, guarded by a file lock.
+    """
+
+    def __init__(self, graph_path, workdir=None, clock=time):
+        self.graph_path = graph_path
+        self.workdir = workdir
+        self.clock = clock
+        with open(graph_path) as f:
+            self.graph = json.load(f)
+        self.graph_dir = os.path.dirname(os.path.abspath(graph_path))
+        self.screens = self.graph["screens"]
+        self.screen_size = self.graph.get("screen_size", SCREEN_SIZE)
+        self.state = None
+
+    @classmethod
+    def from_workdir(cls, workdir):
+        with open(os.path.join(workdir, CONFIG_FILE)) as f:
+            return cls(json.load(f)["graph"], workdir)
+
+    # State
+
+    def initial_state(self):
+        return {
+            "screen": self.graph["start"],
+            "since": self.clock.time(),
+            "touch": None,
+            "files": {},
+            "calls": 0,
+        }
+
+    def load_state(self):
+        with open(os.path.join(self.workdir, STATE_FILE)) as f:
+            self.state = json.load(f)
+
+    def save_state(self):
+        path = os.path.join(self.workdir, STATE_FILE)
+        with open(path + ".tmp", "w") as f:
+            json.dump(self.state, f)
+        os.replace(path + ".tmp", path)
+
+    def locked(self, func, *args, **kwargs):
+        """Run func on the loaded state and save it, one process at a time"""
+        import fcntl  # Only the adb stand-in needs it, and it is POSIX only
+
+        with open(os.path.join(self.workdir, LOCK_FILE), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self.load_state()
+            self.advance_timers()
+            result = func(*args, **kwargs)
+            self.save_state()
+            return result
+
+    def log(self, command, **details):
+        entry = {
+            "t": self.clock.time(),
+            "command": command,
+            "screen": self.state["screen"],
+            **details,
+        }
+        with open(os.path.join(self.workdir, LOG_FILE), "a") as f:
+            f.write(json.dumps(entry) + "\n")
+
+    def move_to(self, screen):
+        if screen not in self.screens:
+            raise KeyError(f"Unknown screen {screen} in {self.graph_path}")
+        self.state["screen"] = screen
+        self.state["since"] = self.clock.time()
+        if self.screens[screen].get("match_end"):
+            self.log("match_end")
+
+    def advance_timers(self):
+        after = self.screens[self.state["screen"]].get("after")
+        while after and self.clock.time() - self.state["since"] >= after["seconds"]:
+            since = self.state["since"] + after["seconds"]
+            self.move_to(after["next"])
+            self.state["since"] = since
+            after = self.screens[self.state["screen"]].get("after")
+
+    def delay(self, kind):
+        """Injected latency, the same sequence on every run"""
+        mean, jitter = self.graph.get("latency", {}).get(kind, (0, 0))
+        self.state["calls"] += 1
+        rng = random.Random(f"{self.graph.get('seed', 0)}-{self.state['calls']}")
+        return max(0.0, mean + rng.uniform(-jitter, jitter))
+
+    # Screens
+
+    def visible_screen(self):
+        screen = self.state["screen"]
+        touch = self.state["touch"]
+        if touch and touch["points"]:
+            for hold in self.screens[screen].get("holds", []):
+                if contains(hold["region"], touch["points"][-1]):
+                    return hold["screen"]
+        return screen
+
+    def render(self, screen):
+        import cv2
+        import numpy as np
+
+        definition = self.screens[screen]
+        if "image" in definition:
+            frame = cv2.imread(os.path.join(self.graph_dir, definition["image"]))
+            if frame is None:
+                raise FileNotFoundError(definition["image"])
+        else:
+            width, height = self.screen_size
+            frame = np.full((height, width, 3), BLANK_COLOR, np.uint8)
+        for overlay in definition.get("overlays", []):
+            image = cv2.imread(os.path.join(self.graph_dir, overlay["image"]))
+            x, y = overlay["at"]
+            h, w = image.shape[:2]
+            frame[y : y + h, x : x + w] = image
+        return frame
+
+    def encode_raw(self, frame):
+        """Output of `screencap` without -p, 16 byte header then RGBA"""
+        import cv2
+
+        h, w = frame.shape[:2]
+        header = b"".join(value.to_bytes(4, "little") for value in (w, h, 1, 1))
+        return header + cv2.cvtColor(frame, cv2.COLOR_BGR2RGBA).tobytes()
+
+    def encode_png(self, frame):
+        import cv2
+
+        return cv2.imencode(".png", frame)[1].tobytes()
+
+    # Gestures
+
+    def touch_down(self, point):
+        self.state["touch"] = {"started": self.clock.time(), "points": [point]}
+
+    def touch_move(self, point):
+        if self.state["touch"] is not None:
+            self.state["touch"]["points"].append(point)
+
+    def touch_up(self):
+        touch, self.state["touch"] = self.state["touch"], None
+        if touch is None or not touch["points"]:
+            return
+        start, end = touch["points"][0], touch["points"][-1]
+        seconds = self.clock.time() - touch["started"]
+        distance = max(abs(start[0] - end[0]), abs(start[1] - end[1]))
+        definition = self.screens[self.state["screen"]]
+        if distance <= TAP_DISTANCE and seconds < TAP_SECONDS:
+            self.log("tap", point=start)
+            for tap in definition.get("taps", []):
+                if contains(tap["region"], start):
+                    self.move_to(tap["next"])
+                    return
+        elif distance <= TAP_DISTANCE:
+            self.log("long_press", point=start, seconds=round(seconds, 3))
+        else:
+            self.log("swipe", points=touch["points"], seconds=round(seconds, 3))
+            for swipe in definition.get("swipes", []):
+                if contains(swipe["from"], start) and contains(swipe["to"], end):
+                    self.move_to(swipe["next"])
+                    return
+
+    # Commands
+
+    def screencap(self):
+        self.clock.sleep(self.locked(self.delay, "screencap"))
+        screen = self.locked(self.visible_screen)
+        self.locked(self.log, "screencap", shown=screen)
+        return self.render(screen)
+
+    def shell(self, script):
+        out = b""
+        for command in script.split(";"):
+            words = command.split()
+            if not words:
+                continue
+            if words[0] == "sleep":
+                self.clock.sleep(float(words[1]))
+            elif words[0] == "screencap":
+                frame = self.screencap()
+                if len(words) > 1 and not words[-1].startswith("-"):
+                    self.locked(self.store_file, words[-1], self.encode_png(frame))
+                elif "-p" in words:
+                    out += self.encode_png(frame)
+                else:
+                    out += self.encode_raw(frame)
+            elif words[:2] == ["input", "tap"]:
+                self.clock.sleep(self.locked(self.delay, "input"))
+                point = [int(float(words[2])), int(float(words[3]))]
+                self.locked(self.touch_down, point)
+                self.locked(self.touch_up)
+            elif words[:2] == ["input", "swipe"]:
+                self.clock.sleep(self.locked(self.delay, "input"))
+                x1, y1, x2, y2 = (int(float(value)) for value in words[2:6])
+                duration = int(words[6]) / 1000 if len(words) > 6 else 0.3
+                self.locked(self.touch_down, [x1, y1])
+                self.clock.sleep(duration)
+                self.locked(self.touch_move, [x2, y2])
+                self.locked(self.touch_up)
+            elif words[0] == "sendevent":
+                out += self.locked(self.sendevent, *(int(w) for w in words[2:5]))
+            elif words[:2] == ["getprop", "sys.boot_completed"]:
+                out += b"1\n"
+            elif words[:2] == ["cat", "/proc/bus/input/devices"]:
+                out += INPUT_DEVICES.encode()
+            else:
+                self.locked(self.log, "shell", args=words)
+        return out
+
+    def sendevent(self, type, code, value):
+        touch = self.state["touch"]
+        pending = self.state.setdefault("pending", [None, None])
+        if type == 3 and code == 57:
+            if value >= 0:
+                self.state["touch"] = {"started": self.clock.time(), "points": []}
+            else:
+                self.touch_up()
+        elif type == 3 and code in (53, 54):
+            pending[code - 53] = value
+        elif type == 0 and touch is not None and None not in pending:
+            point = list(pending)
+            if not touch["points"] or touch["points"][-1] != point:
+                touch["points"].append(point)
+        return b""
+
+    def store_file(self, path, data):
+        stored = os.path.join(self.workdir, "files", path.strip("/").replace("/", "_"))
+        os.makedirs(os.path.dirname(stored), exist_ok=True)
+        with open(stored, "wb") as f:
+            f.write(data)
+        self.state["files"][path] = stored
+
+    def pull(self, source, destination):
+        stored = self.locked(lambda: self.state["files"].get(source))
+        if stored is None:
+            return b"", 1
+        with open(stored, "rb") as src, open(destination, "wb") as dst:
+            dst.write(src.read())
+        return b"", 0
+
+    def handle(self, args):
+        """(stdout, returncode) of `adb <args>`"""
+        if args[:1] == ["-s"]:
+            args = args[2:]
+        if not args:
+            return b"", 1
+        command = args[0]
+        serial = self.graph.get("serial", "emulator-5554")
+        if command == "devices":
+            return f"List of devices attached\n{serial}\tdevice\n".encode(), 0
+        if command == "connect":
+            return f"connected to {args[1]}\n".encode(), 0
+        if command in ("disconnect", "kill-server", "start-server", "wait-for-device"):
+            return b"", 0
+        if command == "pull":
+            return self.pull(args[1], args[2])
+        if command in ("shell", "exec-out"):
+            return self.shell(" ".join(args[1:])), 0
+        self.locked(self.log, "unknown", args=args)
+        return b"", 1
+
+
+def install(graph_path, workdir):
+    os.makedirs(workdir, exist_ok=True)
+    with open(os.path.join(workdir, CONFIG_FILE), "w") as f:
+        json.dump({"graph": os.path.abspath(graph_path)}, f)
+    device = VirtualDevice.from_workdir(workdir)
+    device.state = device.initial_state()
+    device.save_state()
+    log_path = os.path.join(workdir, LOG_FILE)
+    if os.path.exists(log_path):
+        os.remove(log_path)
+
+    shim = os.path.join(workdir, "adb")
+    with open(shim, "w") as f:
+        f.write(
+            SHIM.format(
+                python=sys.executable,
+                script=os.path.abspath(__file__),
+                workdir=os.path.abspath(workdir),
+            )
+        )
+    os.chmod(shim, os.stat(shim).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    print(f"Virtual device ready, run the bot with PATH={workdir}:$PATH")
+
+
+def report(workdir):
+    """Commands received and matches per hour, from the device log"""
+    log_path = os.path.join(workdir, LOG_FILE)
+    if not os.path.exists(log_path):
+        return {}
+    with open(log_path) as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    if not entries:
+        return {}
+    counts = {}
+    for entry in entries:
+        counts[entry["command"]] = counts.get(entry["command"], 0) + 1
+    seconds = entries[-1]["t"] - entries[0]["t"]
+    matches = counts.get("match_end", 0)
+    return {
+        "seconds": seconds,
+        "commands": counts,
+        "matches": matches,
+        "matches_per_hour": matches * 3600 / seconds if seconds > 0 else 0.0,
+    }
+
+
+def main(argv):
+    if len(argv) >= 3 and argv[0] == "adb":
+        out, code = VirtualDevice.from_workdir(argv[1]).handle(argv[2:])
+        sys.stdout.buffer.write(out)
+        return code
+    if len(argv) == 3 and argv[0] == "install":
+        install(argv[1], argv[2])
+        return 0
+    if len(argv) == 2 and argv[0] == "report":
+        print(json.dumps(report(argv[1]), indent=2))
+        return 0
+    print(__doc__)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
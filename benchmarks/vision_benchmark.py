@@ -0,0 +1,539 @@
+"""
+Latency, memory and accuracy benchmark of the vision primitives.
+
+Times the calls the bot makes on every frame against a corpus of recorded
+frames and zoomed card crops, without an emulator, and checks the labeled
+ones: which template each frame shows, which card each crop is. Run from
+the repository root:
+
+    python benchmarks/vision_benchmark.py [--corpus DIR] [--repeat 30]
+        [--output results.json] [--compare previous.json]
+
+The corpus (benchmarks/corpus by default) holds frames/*.png (full
+screenshots), cards/*.png (zoomed card crops, the size of ZOOM_CARD_REGION)
+and labels.json:
+
+    {
+        "frames": {"frames/lobby.png": {"templates": ["BATTLE_SCREEN"]}},
+        "cards": {"cards/zoom-1.png": "A1-001"},
+        "buttons": {"buttons/attack-1.png": "disabled"}
+    }
+
+Paths are relative to the corpus and must stay inside it: a label on a file
+the bot rewrites (images/screenshot.png is overwritten by every capture)
+would be wrong as soon as it runs, so captures are copied in with --add.
+Labels pointing elsewhere are skipped. "templates" lists the templates
+visible on the frame, empty when none is. Card labels are checked against
+the card images in images/cards. Buttons are attack rows of an opened
+attack menu (ATTACK_BUTTON_SIZE), "enabled" or "disabled". Half of each
+class, every other crop by path, fits a brightness threshold midway
+between the classes; ENABLED_BRIGHTNESS and that threshold are then scored
+on the other half only, so no crop checks the threshold it fitted. Frames
+and crops are added from a PNG, a crash report frame or a recorded session
+(utils/session_recorder.py), --row cuts the attack row at that height out
+of a full frame:
+
+    python benchmarks/vision_benchmark.py --add match.session:120 \
+        --templates END_TURN
+    python benchmarks/vision_benchmark.py --add zoom.png --card A1-001
+    python benchmarks/vision_benchmark.py --add match.session:300 --row 1250 \
+        --button disabled
+
+Only what the corpus lacks is made up: without card crops they are cut from
+the first frame and varied. Those synthetic crops are timed but never
+counted for accuracy.
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils.battle_log as battle_log_module
+from controllers.attack_controller import (
+    ATTACK_BUTTON_SIZE,
+    ATTACK_BUTTON_X,
+    ENABLED_BRIGHTNESS,
+    button_brightness,
+)
+from services.card_recognition_service import CardRecognitionService
+from utils.adb_utils import find_subimage
+from utils.battle_log import BattleLog
+from utils.constants import NUMBER_OF_CARDS_REGION, ZOOM_CARD_REGION
+from utils.image_utils import ImageProcessor
+from utils.loaders import load_all_cards, load_template_images
+from utils.session_recorder import SessionReader
+
+DEFAULT_CORPUS = os.path.join("benchmarks", "corpus")
+LABELS_FILE = "labels.json"
+CARD_IMAGES_DIR = os.path.join("images", "cards")
+TURN_CHECK_REGION = (50, 1560, 200, 20)
+# Templates the bot matches most often, from small buttons to whole screens
+FIND_SUBIMAGE_TEMPLATES = ["END_TURN", "OK", "TAP_TO_PROCEED_BUTTON", "BATTLE_SCREEN"]
+CARD_COLLECTION_SIZES = [10, 100, 500]
+PERCENTILES = [50, 90, 99]
+# Slow cases stop repeating after this many seconds
+CASE_BUDGET_S = 20
+BUTTON_STATES = ["enabled", "disabled"]
+
+
+def crop(image, region):
+    x, y, w, h = region
+    return image[y : y + h, x : x + w]
+
+
+def load_labels(corpus_dir):
+    path = os.path.join(corpus_dir, LABELS_FILE)
+    if not os.path.exists(path):
+        return {"frames": {}, "cards": {}, "buttons": {}}
+    with open(path) as f:
+        labels = json.load(f)
+    for kind in ["frames", "cards", "buttons"]:
+        labels[kind] = {
+            path: label
+            for path, label in labels.get(kind, {}).items()
+            if inside_corpus(corpus_dir, path)
+        }
+    return labels
+
+
+def inside_corpus(corpus_dir, path):
+    root = os.path.abspath(corpus_dir)
+    full = os.path.abspath(os.path.join(root, path))
+    if os.path.isabs(path) or os.path.commonpath([root, full]) != root:
+        print(f"Skipping the label of {path}, it is outside {corpus_dir}")
+        return False
+    return True
+
+
+def load_images(corpus_dir, kind, labeled):
+    """{relative path: image} of kind/*.png and of the labeled paths"""
+    paths = {
+        os.path.relpath(path, corpus_dir)
+        for path in glob.glob(os.path.join(corpus_dir, kind, "*.png"))
+    }
+    paths.update(labeled)
+    images = {}
+    for path in sorted(paths):
+        image = cv2.imread(os.path.normpath(os.path.join(corpus_dir, path)))
+        if image is not None:
+            images[path] = image
+    return images
+
+
+def load_corpus(corpus_dir):
+    """
+    (frames, cards, buttons, labels): frames, cards and buttons map a path to
+    its image. The synthetic fallbacks are not labeled.
+    """
+    labels = load_labels(corpus_dir)
+    frames = load_images(corpus_dir, "frames", labels["frames"])
+    cards = load_images(corpus_dir, "cards", labels["cards"])
+    buttons = load_images(corpus_dir, "buttons", labels["buttons"])
+    if not cards and frames:
+        cards = {"synthetic": crop(next(iter(frames.values())), ZOOM_CARD_REGION)}
+    return frames, cards, buttons, labels
+
+
+def read_source(source):
+    """
+    (image, name) of a PNG, or of frame N of a recorded session given as
+    path.session:N
+    """
+    path, _, frame_id = source.rpartition(":")
+    if path.endswith(".session") and frame_id.isdigit():
+        name = os.path.splitext(os.path.basename(path))[0]
+        with SessionReader(path) as reader:
+            return reader.frame(int(frame_id)), f"{name}-{frame_id}"
+    return cv2.imread(source), os.path.splitext(os.path.basename(source))[0]
+
+
+def attack_row(frame, y):
+    """The attack button crop centered on row y, as the attack controller cuts it"""
+    w, h = ATTACK_BUTTON_SIZE
+    return crop(frame, (ATTACK_BUTTON_X - w // 2, y - h // 2, w, h))
+
+
+def add_to_corpus(
+    corpus_dir, source, templates=None, card_id=None, button=None, row=None
+):
+    """Copy a capture into the corpus with its label, returns its path"""
+    image, name = read_source(source)
+    if image is None:
+        raise ValueError(f"Could not read {source}")
+    if row is not None:
+        image, name = attack_row(image, row), f"{name}-row{row}"
+    kind = "cards" if card_id else "buttons" if button else "frames"
+    labels = load_labels(corpus_dir)
+    path = f"{kind}/{name}.png"
+    os.makedirs(os.path.join(corpus_dir, kind), exist_ok=True)
+    cv2.imwrite(os.path.join(corpus_dir, path), image)
+    if card_id:
+        labels["cards"][path] = card_id
+    elif button:
+        labels["buttons"][path] = button
+    else:
+        labels["frames"][path] = {"templates": templates or []}
+    with open(os.path.join(corpus_dir, LABELS_FILE), "w") as f:
+        json.dump(labels, f, indent=4)
+    return path
+
+
+def split_buttons(buttons, labels):
+    """
+    (fit, held_out), each {state: [(path, brightness)]}: the labeled button
+    crops of every state sorted by path, every other one set aside
+    """
+    fit = {state: [] for state in BUTTON_STATES}
+    held_out = {state: [] for state in BUTTON_STATES}
+    for state in BUTTON_STATES:
+        paths = sorted(
+            path
+            for path, label in labels["buttons"].items()
+            if label == state and path in buttons
+        )
+        for i, path in enumerate(paths):
+            side = fit if i % 2 == 0 else held_out
+            side[state].append((path, button_brightness(buttons[path])))
+    return fit, held_out
+
+
+def derive_enabled_brightness(fit):
+    """
+    Brightness midway between the dimmest enabled and the brightest disabled
+    crop, None unless both are labeled
+    """
+    if not fit["enabled"] or not fit["disabled"]:
+        return None
+    dimmest = min(brightness for _, brightness in fit["enabled"])
+    brightest = max(brightness for _, brightness in fit["disabled"])
+    return (dimmest + brightest) / 2
+
+
+def threshold_accuracy(held_out, threshold):
+    """Correct and total enabled/disabled answers of threshold"""
+    results = {"correct": 0, "total": 0, "wrong": []}
+    for state, crops in held_out.items():
+        for path, brightness in crops:
+            found = "enabled" if brightness > threshold else "disabled"
+            results["total"] += 1
+            if found == state:
+                results["correct"] += 1
+            else:
+                results["wrong"].append(f"{path}: {found} ({brightness:.0f})")
+    return results
+
+
+def button_thresholds(buttons, labels):
+    """
+    The threshold fitted on half of the labeled buttons, and the accuracy of
+    it and of ENABLED_BRIGHTNESS on the other half
+    """
+    fit, held_out = split_buttons(buttons, labels)
+    derived = derive_enabled_brightness(fit)
+    return {
+        "fitted_on": sum(len(crops) for crops in fit.values()),
+        "derived": derived,
+        "current": threshold_accuracy(held_out, ENABLED_BRIGHTNESS),
+        "derived_accuracy": (
+            threshold_accuracy(held_out, derived) if derived is not None else None
+        ),
+    }
+
+
+def accuracy(frames, cards, labels):
+    """
+    Correct and total answers on the labeled frames and card crops. A frame is right when the best template ImageProcessor.classify finds is
+    one of its labels, or nothing for a frame labeled with none.
+    """
+    image_processor = ImageProcessor(log)
+    templates = load_template_images("images")
+    screens = {"correct": 0, "total": 0, "wrong": []}
+    for path, label in labels["frames"].items():
+        if path not in frames:
+            continue
+        name, _, _ = image_processor.classify(frames[path], templates)
+        expected = label.get("templates", [])
+        screens["total"] += 1
+        if (name in expected) if expected else name is None:
+            screens["correct"] += 1
+        else:
+            screens["wrong"].append(f"{path}: {name}")
+
+    card_results = {"correct": 0, "total": 0, "wrong": []}
+    card_images = load_all_cards(CARD_IMAGES_DIR) if labels["cards"] else {}
+    if card_images:
+        service = CardRecognitionService(image_processor, None, None, log, card_images)
+        for path, card_id in labels["cards"].items():
+            if path not in cards:
+                continue
+            found = service.identify_card(cards[path])
+            card_results["total"] += 1
+            if found == card_id:
+                card_results["correct"] += 1
+            else:
+                card_results["wrong"].append(f"{path}: {found}")
+    return {"screens": screens, "cards": card_results}
+
+
+def card_collection(cards, size, rng):
+    """size distinct zoomed card images, varied from the corpus crops"""
+    _, _, w, h = ZOOM_CARD_REGION
+    collection = {}
+    for i in range(size):
+        card = cv2.resize(cards[i % len(cards)], (w, h))
+        if i >= len(cards):
+            # Recolor and shift so every synthetic card is a distinct template
+            card = cv2.convertScaleAbs(
+                card, alpha=rng.uniform(0.7, 1.3), beta=rng.uniform(-40, 40)
+            )
+            card = np.roll(card, int(rng.integers(-60, 60)), axis=1)
+        collection[f"card-{i}.png"] = card
+    return collection
+
+
+def measure(func, repeat, budget=CASE_BUDGET_S):
+    """
+    Latency samples (s) of func and the peak memory (bytes) of one call.
+
+    The first call is traced by tracemalloc (Python and numpy allocations,
+    not OpenCV's internal buffers) and also warms the caches, then
+    func runs repeat times, or fewer if that takes longer than budget.
+    """
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    samples = []
+    started = time.perf_counter()
+    while len(samples) < repeat and (
+        not samples or time.perf_counter() - started < budget
+    ):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples, peak
+
+
+def summarize(samples, peak):
+    entry = {
+        "mean_ms": float(np.mean(samples) * 1000),
+        "min_ms": float(np.min(samples) * 1000),
+        "max_ms": float(np.max(samples) * 1000),
+        "peak_kb": peak / 1024,
+        "samples": len(samples),
+    }
+    for percentile in PERCENTILES:
+        entry[f"p{percentile}_ms"] = float(np.percentile(samples, percentile) * 1000)
+    return entry
+
+
+def log(message):
+    pass
+
+
+def build_cases(frames, cards, rng):
+    """[(name, func)] of everything that is timed"""
+    image_processor = ImageProcessor(log)
+    templates = load_template_images("images")
+    frame = next(iter(frames.values()))
+    cards = list(cards.values())
+    cases = []
+
+    for name in FIND_SUBIMAGE_TEMPLATES:
+        template = templates.get(name)
+        if template is not None:
+            cases.append(
+                (
+                    f"find_subimage[{name}]",
+                    lambda template=template: find_subimage(frame, template),
+                )
+            )
+    if "END_TURN" in templates:
+        cases.append(
+            (
+                "ImageProcessor.check[END_TURN]",
+                lambda: image_processor.check(frame, templates["END_TURN"]),
+            )
+        )
+
+    turn_region = crop(frame, TURN_CHECK_REGION)
+    shifted = np.roll(turn_region, 2, axis=1)
+    cases.append(
+        (
+            "calculate_similarity[turn_region]",
+            lambda: image_processor.calculate_similarity(turn_region, shifted),
+        )
+    )
+    zoomed = cv2.resize(cards[0], ZOOM_CARD_REGION[2:])
+    blurred = cv2.GaussianBlur(zoomed, (5, 5), 0)
+    cases.append(
+        (
+            "calculate_similarity[zoom_card]",
+            lambda: image_processor.calculate_similarity(zoomed, blurred),
+        )
+    )
+
+    for size in CARD_COLLECTION_SIZES:
+        service = CardRecognitionService(
+            image_processor, None, None, log, card_collection(cards, size, rng)
+        )
+        cases.append(
+            (
+                f"CardRecognitionService.identify_card[{size} cards]",
+                lambda service=service: service.identify_card(zoomed),
+            )
+        )
+
+    number_image = crop(frame, NUMBER_OF_CARDS_REGION)
+    cases.append(
+        (
+            "extract_number_from_image",
+            lambda: image_processor.extract_number_from_image(number_image),
+        )
+    )
+
+    # _check_action captures its own frame, serve it the recorded one
+    battle_log_module.take_screenshot = lambda: frame
+    battle_log = BattleLog(log)
+    cases.append(("BattleLog._check_action", battle_log._check_action))
+    return cases
+
+
+def run(corpus_dir, repeat):
+    frames, cards, buttons, labels = load_corpus(corpus_dir)
+    if not frames:
+        print(f"No frames found in {corpus_dir}/frames, add one with --add")
+        return None
+    rng = np.random.default_rng(1234)
+    results = {}
+    for name, func in build_cases(frames, cards, rng):
+        samples, peak = measure(func, repeat)
+        results[name] = summarize(samples, peak)
+        print(f"{name:<50} p50 {results[name]['p50_ms']:>9.2f} ms")
+    return {
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "corpus": corpus_dir,
+        "frames": len(frames),
+        "cards": len(cards),
+        "repeat": repeat,
+        "results": results,
+        "accuracy": accuracy(frames, cards, labels),
+        "buttons": button_thresholds(buttons, labels),
+    }
+
+
+def print_report(report, previous=None):
+    header = f"{'benchmark':<50}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}"
+    header += f"{'peak KB':>10}" + (f"{'p50 vs prev':>13}" if previous else "")
+    print()
+    print(header)
+    for name, entry in report["results"].items():
+        line = (
+            f"{name:<50}{entry['p50_ms']:>10.2f}{entry['p90_ms']:>10.2f}"
+            f"{entry['p99_ms']:>10.2f}{entry['peak_kb']:>10.0f}"
+        )
+        old = previous["results"].get(name) if previous else None
+        if old:
+            change = (entry["p50_ms"] - old["p50_ms"]) / old["p50_ms"] * 100
+            line += f"{change:>+12.1f}%"
+        print(line)
+
+    print()
+    for name, entry in report["accuracy"].items():
+        print_accuracy(f"{name} accuracy", entry, f"no labeled {name} in the corpus")
+
+    buttons = report["buttons"]
+    if buttons["derived"] is None:
+        print(
+            f"button threshold: not derived, {buttons['fitted_on']} labeled "
+            "crops set aside for fitting, it needs both enabled and disabled ones"
+        )
+    else:
+        print(
+            f"button threshold: {buttons['derived']:.0f} fitted on "
+            f"{buttons['fitted_on']} labeled crops"
+        )
+    missing = "no labeled button crop held out"
+    print_accuracy(
+        f"ENABLED_BRIGHTNESS ({ENABLED_BRIGHTNESS}) held-out accuracy",
+        buttons["current"],
+        missing,
+    )
+    if buttons["derived_accuracy"] is not None:
+        print_accuracy(
+            "derived threshold held-out accuracy", buttons["derived_accuracy"], missing
+        )
+
+
+def print_accuracy(title, entry, missing):
+    if not entry["total"]:
+        print(f"{title}: {missing}")
+        return
+    print(
+        f"{title}: {entry['correct']}/{entry['total']} "
+        f"({entry['correct'] / entry['total']:.0%})"
+    )
+    for wrong in entry["wrong"]:
+        print(f"  ✗ {wrong}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--corpus", default=DEFAULT_CORPUS, help="Directory with frames/ and cards/"
+    )
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--output", help="Write the results as JSON")
+    parser.add_argument("--compare", help="Results JSON of a previous run")
+    parser.add_argument(
+        "--add", help="Add a PNG or FILE.session:FRAME to the corpus and exit"
+    )
+    parser.add_argument(
+        "--templates", default="", help="Templates visible on the added frame"
+    )
+    parser.add_argument("--card", help="Card id of an added zoomed card crop")
+    parser.add_argument(
+        "--button", choices=BUTTON_STATES, help="State of an added attack button"
+    )
+    parser.add_argument(
+        "--row",
+        type=int,
+        help="Cut the attack button centered on this row out of the added frame",
+    )
+    args = parser.parse_args()
+
+    if args.add:
+        templates = [name for name in args.templates.split(",") if name]
+        path = add_to_corpus(
+            args.corpus, args.add, templates, args.card, args.button, args.row
+        )
+        print(f"Added {path} to {args.corpus}")
+        return 0
+
+    report = run(args.corpus, args.repeat)
+    if report is None:
+        return 1
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+    print_report(report, previous)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
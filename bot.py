@@ -3,6 +3,7 @@
 import os
 
 from controllers.battle_controller import BattleController
+from controllers.concede_controller import ConcedeController
 from controllers.emulator_controller import EmulatorController
 from controllers.game_controller import GameController
 from models.game_state import GameState
@@ -35,6 +36,7 @@ class PokemonBot:
             # Initialize services
             self.card_data_service = CardDataService()
             self.image_processor = ImageProcessor(self.log_callback, self.debug_window)
+            self.image_processor.register_templates(self.template_images)
             self.battle_controller = BattleController(
                 self.image_processor,
                 self.template_images,
@@ -66,6 +68,10 @@ class PokemonBot:
                 self.debug_window,
             )
 
+            self.concede_controller = ConcedeController(
+                self.game_controller, self.template_images, self.log_callback
+            )
+
             self.decision_maker = DecisionMaker(self.game_controller)
 
             self.log_callback("✅ Bot initialization complete")
@@ -78,5 +84,8 @@ class PokemonBot:
         self.game_controller.start()
         self.decision_maker.make_decision()
 
+    def start_concede(self):
+        self.concede_controller.start()
+
     def stop(self):
         self.game_controller.stop()
@@ -0,0 +1,114 @@
+import cv2
+import numpy as np
+
+from utils.adb_utils import take_screenshot_raw
+from utils.clock import clock
+from utils.timing_profile import timing_profile
+
+# Rows where the attack buttons show up after tapping the active Pokemon,
+# last row first like the taps this replaces
+ATTACK_BUTTON_ROWS = (1250, 1150, 1050)
+ATTACK_BUTTON_X = 540
+ATTACK_BUTTON_SIZE = (560, 70)
+ATTACK_MENU_REGION = (260, 1000, 560, 300)
+ATTACK_CONFIRM_POSITION = (570, 1070)
+# A row that changed this much (1 - SSIM) when the menu opened holds a button
+BUTTON_CHANGE = 0.25
+# Buttons that cannot be used are greyed out, usable ones are lit like every
+# live button (white or coloured, so saturation does not tell them apart).
+# Not measured on attack buttons: 80% of the dimmest lobby button template
+# (233), an assumption until enabled and disabled attack rows are labeled in
+# benchmarks/corpus, from which vision_benchmark.py fits and checks it
+ENABLED_BRIGHTNESS = 186
+
+
+def button_brightness(crop):
+    """Median brightness (HSV value), text and icons on a button barely move it"""
+    return float(np.median(cv2.cvtColor(crop, cv2.COLOR_BGR2HSV)[:, :, 2]))
+
+
+def is_enabled(crop):
+    return button_brightness(crop) > ENABLED_BRIGHTNESS
+
+
+class AttackController:
+    """
+    Attacks with the active Pokemon by looking at the attack menu.
+
+    The active card is tapped once and the menu region is watched until it
+    settles (timed by the calibrator, so the profile learns how long the
+    menu takes). The rows that changed hold the attack buttons, and their
+    brightness tells whether they can be used. Only a usable button is
+    tapped, and the confirmation it opens is timed the same way; when there
+    is none, nothing else is sent.
+    """
+
+    def __init__(
+        self,
+        game_controller,
+        image_processor,
+        calibrator,
+        log_callback,
+        frame_source=None,
+    ):
+        self.game_controller = game_controller
+        self.image_processor = image_processor
+        self.calibrator = calibrator
+        self.log_callback = log_callback
+        self.frame_source = frame_source or take_screenshot_raw
+
+    def _crop(self, frame, center):
+        x, y = center
+        w, h = ATTACK_BUTTON_SIZE
+        return frame[y - h // 2 : y + h // 2, x - w // 2 : x + w // 2]
+
+    def find_buttons(self, before, after):
+        """[(y, enabled)] of the attack buttons in the opened menu"""
+        buttons = []
+        for y in ATTACK_BUTTON_ROWS:
+            previous = self._crop(before, (ATTACK_BUTTON_X, y))
+            current = self._crop(after, (ATTACK_BUTTON_X, y))
+            change = 1 - self.image_processor.similarity_engine.score(
+                previous, current, cache=False
+            )
+            if change < BUTTON_CHANGE:
+                continue
+            buttons.append((y, is_enabled(current)))
+        return buttons
+
+    def attack(self, center_x, center_y):
+        """Returns True if an attack was chosen"""
+        before = self.frame_source()
+        if before is None:
+            return False
+        opened = self.calibrator.measure_settle(
+            "attack_menu_open",
+            lambda: self.game_controller.click(center_x, center_y),
+            ATTACK_MENU_REGION,
+            timeout=timing_profile.get("attack_menu_open") * 3,
+        )
+        after = self.frame_source() if opened else None
+        if after is None:
+            self.log_callback("⚔️ Attack menu did not open")
+            return False
+
+        buttons = self.find_buttons(before, after)
+        enabled = [y for y, is_enabled in buttons if is_enabled]
+        if not enabled:
+            self.log_callback(
+                f"⚔️ No attack available ({len(buttons)} attacks, none usable)"
+            )
+            return False
+
+        self.log_callback(f"⚔️ Attacking ({len(enabled)}/{len(buttons)} usable)")
+        # The confirmation replaces the menu, timed like the menu opening
+        if not self.calibrator.measure_settle(
+            "attack_confirm",
+            lambda: self.game_controller.click(ATTACK_BUTTON_X, enabled[0]),
+            ATTACK_MENU_REGION,
+            timeout=timing_profile.get("attack_confirm") * 3,
+        ):
+            # Never settled, the tap was sent: fall back to the fixed wait
+            clock.sleep(timing_profile.get("attack_confirm"))
+        self.game_controller.click(*ATTACK_CONFIRM_POSITION)
+        return True
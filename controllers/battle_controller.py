@@ -1,8 +1,11 @@
-import time
-
 from utils.adb_utils import long_press_position, take_screenshot
+from utils.clock import clock
 from utils.constants import NUMBER_OF_CARDS_REGION, ZOOM_CARD_REGION
 
+# Seconds each step of the battle search waits for its screen, ten attempts
+# of the old loop took about 20s
+SEARCH_STEP_TIMEOUT = 30
+
 
 class BattleController:
     def __init__(self, image_processor, template_images, card_images, log_callback):
@@ -11,20 +14,30 @@ class BattleController:
         self.template_images = template_images
         self.card_images = card_images
 
-    def check_turn(self, turn_check_region, running_event, game_state):
+    def check_turn(
+        self, turn_check_region, running_event, game_state, turn_detector=None
+    ):
         is_your_turn = False
         is_first_turn = False
         go_first = False
         if not running_event.is_set():
             return is_your_turn, is_first_turn, go_first
-        screenshot1 = self.image_processor.capture_region(turn_check_region)
-        time.sleep(1.1)
-        screenshot2 = self.image_processor.capture_region(turn_check_region)
+        if turn_detector is not None and turn_detector.is_running:
+            # Returns as soon as the indicator moves, waits one window at most
+            if turn_detector.wait_for_turn(turn_detector.window):
+                self.log_callback("🎮 Your turn!")
+                is_your_turn = True
+        else:
+            screenshot1 = self.image_processor.capture_region(turn_check_region)
+            clock.sleep(1.1)
+            screenshot2 = self.image_processor.capture_region(turn_check_region)
 
-        similarity = self.image_processor.calculate_similarity(screenshot1, screenshot2)
-        if similarity < 0.958:
-            self.log_callback("🎮 Your turn!")
-            is_your_turn = True
+            similarity = self.image_processor.calculate_similarity(
+                screenshot1, screenshot2
+            )
+            if similarity < 0.958:
+                self.log_callback("🎮 Your turn!")
+                is_your_turn = True
 
         if not game_state.first_turn_done:
             screenshot = take_screenshot()
@@ -55,12 +68,12 @@ class BattleController:
     def perform_search_battle_actions(self, running_event, run_event=False):
         if not running_event.is_set():
             return
-        time.sleep(1)
+        clock.sleep(1)
         if not self.image_processor.check_and_click_until_found(
             self.template_images.get("VERSUS_SCREEN"),
             "Versus Screen",
             running_event,
-            max_attempts=10,
+            timeout=SEARCH_STEP_TIMEOUT,
         ):
             return False
         if run_event:
@@ -68,13 +81,13 @@ class BattleController:
                 self.template_images.get("EVENT_MATCH_SCREEN"),
                 "Event Match Screen",
                 running_event,
-                max_attempts=10,
+                timeout=SEARCH_STEP_TIMEOUT,
             ):
                 if not self.image_processor.check_and_click_until_found(
                     self.template_images.get("RANDOM_MATCH_SCREEN"),
                     "Random Match Screen",
                     running_event,
-                    max_attempts=10,
+                    timeout=SEARCH_STEP_TIMEOUT,
                 ):
                     return False
         else:
@@ -82,42 +95,18 @@ class BattleController:
                 self.template_images.get("RANDOM_MATCH_SCREEN"),
                 "Random Match Screen",
                 running_event,
-                max_attempts=10,
+                timeout=SEARCH_STEP_TIMEOUT,
             ):
                 return False
         if not self.image_processor.check_and_click_until_found(
             self.template_images.get("BATTLE_BUTTON"),
             "Battle Button",
             running_event,
-            max_attempts=10,
+            timeout=SEARCH_STEP_TIMEOUT,
+            optimistic=True,
         ):
             return False
 
-    def check_rival_concede(self, screenshot, running_event):
-        if not running_event.is_set():
-            return
-        if self.image_processor.check(
-            screenshot,
-            self.template_images.get("TAP_TO_PROCEED_BUTTON"),
-            None,
-        ):
-            self.log_callback("🏳️ Rival conceded!")
-            for key in [
-                "NEXT_BUTTON",
-                "THANKS_BUTTON",
-            ]:
-                if not self.image_processor.check_and_click_until_found(
-                    self.template_images.get(key),
-                    f"Checking {key}",
-                    running_event,
-                ):
-                    break
-                time.sleep(2)
-            self.image_processor.check_and_click_until_found(
-                self.template_images.get("CROSS_BUTTON"), None, running_event
-            )
-            time.sleep(4)
-
     def check_rival_afk(self, screenshot):
         if self.image_processor.check_and_click(
             screenshot, self.template_images.get("OK_BUTTON_AFK"), "AFK ok button", 0.7
@@ -0,0 +1,123 @@
+from utils.adb_utils import take_screenshot
+from utils.clock import clock
+
+MATCH_START_TIMEOUT = 120
+SCREEN_TIMEOUT = 15
+
+
+class ConcedeStats:
+    """Counts conceded matches and the throughput of the session"""
+
+    def __init__(self):
+        self.started_at = clock.time()
+        self.matches = 0
+        self.failures = 0
+        self.last_match_seconds = None
+
+    def record(self, seconds):
+        self.matches += 1
+        self.last_match_seconds = seconds
+
+    def matches_per_hour(self):
+        elapsed = clock.time() - self.started_at
+        if elapsed <= 0:
+            return 0.0
+        return self.matches * 3600 / elapsed
+
+    def summary(self):
+        last = (
+            f", last {self.last_match_seconds:.1f}s"
+            if self.last_match_seconds is not None
+            else ""
+        )
+        return (
+            f"📈 {self.matches_per_hour():.1f} matches/hour "
+            f"({self.matches} conceded, {self.failures} failed{last})"
+        )
+
+
+class ConcedeController:
+    """
+    Farms matches by conceding them as soon as they start.
+
+    Reuses GameController for connection handling, the run loop and queueing
+    (through BattleController). Every step waits for the next screen with
+    ImageProcessor.wait_for_any and reacts as soon as it shows up, so no
+    fixed sleeps are spent between screens.
+    """
+
+    def __init__(self, game_controller, template_images, log_callback):
+        self.game_controller = game_controller
+        self.image_processor = game_controller.image_processor
+        self.template_images = template_images
+        self.log_callback = log_callback
+        self.running_event = game_controller.running_event
+        self.stats = ConcedeStats()
+
+    def start(self):
+        self.stats = ConcedeStats()
+        self.game_controller.start(self.execute_concede_sequence)
+
+    def stop(self):
+        self.game_controller.stop()
+
+    def templates(self, names):
+        return {name: self.template_images.get(name) for name in names}
+
+    def wait_for(self, names, timeout=SCREEN_TIMEOUT, click=True):
+        name, _ = self.image_processor.wait_for_any(
+            self.templates(names), self.running_event, timeout=timeout, click=click
+        )
+        return name
+
+    def execute_concede_sequence(self):
+        started = clock.time()
+        self.game_controller.prepare_for_battle()
+        self.queue()
+        if not self.wait_for_match():
+            self.stats.failures += 1
+            self.log_callback("⚠️ Match did not start, requeueing")
+            return
+        if not self.concede():
+            self.stats.failures += 1
+            return
+        self.skip_results()
+        self.stats.record(clock.time() - started)
+        self.log_callback(self.stats.summary())
+
+    def queue(self):
+        if not self.running_event.is_set():
+            return
+        screenshot = take_screenshot()
+        if not self.image_processor.check_and_click(
+            screenshot,
+            self.template_images["BATTLE_ALREADY_SCREEN"],
+            "Battle already screen",
+        ):
+            self.image_processor.check_and_click(
+                screenshot, self.template_images["BATTLE_SCREEN"], "Battle screen"
+            )
+        self.game_controller.battle_controller.perform_search_battle_actions(
+            self.running_event, run_event=True
+        )
+
+    def wait_for_match(self):
+        """The match menu button only shows up once the match has started"""
+        return (
+            self.wait_for(
+                ["MATCH_MENU_BUTTON"], timeout=MATCH_START_TIMEOUT, click=False
+            )
+            is not None
+        )
+
+    def concede(self):
+        for name in ["MATCH_MENU_BUTTON", "CONCEDE_BUTTON", "CONCEDE_ACCEPT_BUTTON"]:
+            if self.wait_for([name]) is None:
+                self.log_callback(f"❌ {name} not found, could not concede")
+                return False
+        self.log_callback("🏳️ Conceded")
+        return True
+
+    def skip_results(self):
+        """Click through the result screens until the lobby is back"""
+        self.game_controller.post_match_navigator.run(self.running_event)
@@ -2,7 +2,8 @@
 
 import os
 import subprocess
-import time
+
+from utils.clock import clock
 
 
 class EmulatorController:
@@ -14,8 +15,8 @@ class EmulatorController:
 
     def wait_for_device(self, timeout=60):
         """Wait for device to be fully online and responsive"""
-        start_time = time.time()
-        while time.time() - start_time < timeout:
+        start_time = clock.time()
+        while clock.time() - start_time < timeout:
             try:
                 result = subprocess.run(
                     ["adb", "wait-for-device"],
@@ -40,7 +41,7 @@ class EmulatorController:
             except Exception as e:
                 self.log_callback(f"❌ Device error: {e}")
 
-            time.sleep(2)
+            clock.sleep(2)
 
         return False
 
@@ -91,16 +92,16 @@ class EmulatorController:
         try:
             # Kill ADB server
             subprocess.run(["adb", "kill-server"], timeout=5)
-            time.sleep(2)
+            clock.sleep(2)
 
             # Start ADB server
             subprocess.run(["adb", "start-server"], timeout=5)
-            time.sleep(2)
+            clock.sleep(2)
 
             # Try to reconnect to each device
             for device_id in device_ids:
                 subprocess.run(["adb", "disconnect", device_id], timeout=5)
-                time.sleep(1)
+                clock.sleep(1)
                 subprocess.run(["adb", "connect", device_id], timeout=5)
 
         except Exception as e:
@@ -181,7 +182,7 @@ class EmulatorController:
                 self.log_callback(f"Connection attempt {attempts + 1} failed: {e}")
 
             attempts += 1
-            time.sleep(self.reconnect_delay)
+            clock.sleep(self.reconnect_delay)
 
         self.log_callback("Failed to connect after maximum attempts")
         return False
@@ -191,7 +192,7 @@ class EmulatorController:
         try:
             # First try graceful shutdown
             subprocess.run(["adb", "shell", "reboot"], timeout=10)
-            time.sleep(5)
+            clock.sleep(5)
 
             # Kill any existing emulator processes
             if os.name == "nt":  # Windows
@@ -201,7 +202,7 @@ class EmulatorController:
             else:  # Linux/Mac
                 subprocess.run(["pkill", "dnplayer"], capture_output=True)
 
-            time.sleep(5)
+            clock.sleep(5)
 
             # Start emulator
             emulator_path = self.app_state.program_path
@@ -1,16 +1,35 @@
 # controllers/game_controller.py
+import os
 import threading
-import time
 import traceback
-
-from utils.adb_utils import click_position, drag_position, take_screenshot
+from datetime import datetime
+
+from controllers.attack_controller import AttackController
+from controllers.play_verifier import PlayVerifier
+from controllers.post_match_navigator import PostMatchNavigator
+from controllers.turn_detector import TurnDetector
+from controllers.turn_planner import TurnExecutor, TurnPlanner
+from services.hand_tracking_service import HandTrackingService
+from utils.adb_utils import (
+    click_position,
+    drag_position,
+    take_screenshot,
+    take_screenshot_raw,
+)
 from utils.battle_log import BattleLog
-from utils.constants import bench_positions, card_offset_mapping, default_pokemon_stats
+from utils.button_cache import button_cache
+from utils.clock import Cancelled, clock
+from utils.constants import bench_positions, default_pokemon_stats
+from utils.flight_recorder import flight_recorder
+from utils.session_recorder import session_recorder
+from utils.timing_profile import TimingCalibrator, timing_profile
+from utils.tracing import traced, tracer
 
-card_effects = {
-    "professor's research": lambda hand_size: 2,  # Draw 2 (+2)
-    "poké ball": lambda hand_size: 1,  # Search and add one base Pokemon card (+1)
-}
+# Seconds to wait for an opponent and the battle screen, the old 50 attempts
+# took about 100s
+MATCHMAKING_TIMEOUT = 120
+# Seconds the first turn's start battle button is waited for
+START_BATTLE_TIMEOUT = 20
 
 
 class GameController:
@@ -35,6 +54,8 @@ class GameController:
         self.template_images = template_images
         self.log_callback = log_callback
         self.running_event = threading.Event()  # Use threading.Event
+        # Set by stop(), ends the sleep or wait the bot thread is in
+        self.stop_event = threading.Event()
 
         ## COORDS
         self.zoom_card_region = (80, 255, 740, 1020)
@@ -45,53 +66,130 @@ class GameController:
         self.card_y = 1470
         self.number_of_cards_region = (790, 1325, 60, 50)
         self.debug_window = debug_window
-        self.last_screenshot = None
 
         # New flag to track turn state
         self.is_new_turn = True  # Assume starting as a new turn
+        # Energy can be attached once per turn
+        self.energy_attached = False
 
         # Add battle_log initialization
         self.battle_log = BattleLog(
             log_callback, card_recognition_service, debug_window
         )
 
-    def start(self):
+        self.board_recognition_service = (
+            card_recognition_service.board_recognition_service
+        )
+        self.hand_tracking_service = HandTrackingService(log_callback)
+        self.turn_detector = TurnDetector(
+            image_processor, self.turn_check_region, log_callback
+        )
+        self.turn_planner = TurnPlanner(
+            self.card_start_x, self.card_y, self.center_x, self.center_y
+        )
+        self.timing_calibrator = TimingCalibrator(
+            timing_profile, image_processor, take_screenshot_raw, log_callback
+        )
+        self.play_verifier = PlayVerifier(self, image_processor, log_callback)
+        self.turn_executor = TurnExecutor(
+            self,
+            log_callback,
+            verifier=self.play_verifier,
+            calibrator=self.timing_calibrator,
+        )
+        self.attack_controller = AttackController(
+            self, image_processor, self.timing_calibrator, log_callback
+        )
+        self.post_match_navigator = PostMatchNavigator(
+            image_processor, template_images, log_callback
+        )
+
+    def start(self, sequence=None):
         if not self.app_state.program_path:
             self.log_callback("Please select emulator path first.")
             return
         self.running_event.set()  # Set the event to indicate running
-        threading.Thread(target=self.run).start()
+        # A new event, a previous run still winding down keeps its own
+        self.stop_event = threading.Event()
+        threading.Thread(target=self.run, args=(sequence,)).start()
 
     def stop(self):
         self.running_event.clear()  # Clear the event to stop the bot
+        self.stop_event.set()
 
-    def run(self):
-        """Main bot loop"""
+    def run(self, sequence=None):
+        """
+        Main bot loop, repeats sequence (a full battle by default). Every
+        sleep and wait of the loop is cancellable: stop() ends it at once.
+        """
         try:
-            self.log_callback("🔄 Starting bot...")
-
-            # Try to connect first
-            if not self.emulator_controller.connect_and_run():
-                self.log_callback("❌ Failed to connect to any device. Stopping bot.")
-                self.running_event.clear()
-                return
+            with clock.cancellable(self.stop_event):
+                self._run(sequence or self.execute_battle_sequence)
+        except Cancelled:
+            self.log_callback("⏹️ Bot stopped")
+            if tracer.enabled:
+                tracer.stop()
+        except Exception as e:
+            self.handle_critical_error(e)
 
-            self.log_callback("✅ Connected successfully")
+    def _run(self, sequence):
+        self.log_callback("🔄 Starting bot...")
 
-            while self.running_event.is_set():
-                try:
-                    if not self.check_connection():
-                        continue
+        # Try to connect first
+        if not self.emulator_controller.connect_and_run():
+            self.log_callback("❌ Failed to connect to any device. Stopping bot.")
+            self.running_event.clear()
+            return
 
-                    self.log_callback("🎮 Starting new battle sequence")
-                    self.execute_battle_sequence()
-                    self.log_callback("✅ Battle sequence completed")
+        self.log_callback("✅ Connected successfully")
+        timing_profile.load(self.app_state.emulator_name)
+        button_cache.load(self.app_state.emulator_name)
+        if self.app_state.trace_file:
+            tracer.start(self.app_state.trace_file)
+            self.log_callback(f"🔬 Tracing to {self.app_state.trace_file}")
 
-                except Exception as e:
-                    self.handle_battle_error(e)
+        match_id = 0
+        while self.running_event.is_set():
+            try:
+                if not self.check_connection():
+                    continue
 
-        except Exception as e:
-            self.handle_critical_error(e)
+                match_id += 1
+                tracer.set_context(device=self.app_state.emulator_name, match=match_id)
+                flight_recorder.set_context(
+                    device=self.app_state.emulator_name, match=match_id
+                )
+                self.log_callback("🎮 Starting new battle sequence")
+                self.start_session_recording(match_id)
+                try:
+                    with tracer.span("game.sequence"):
+                        sequence()
+                finally:
+                    session_recorder.stop()
+                timing_profile.save()
+                button_cache.save()
+                tracer.save()
+                self.log_callback("✅ Battle sequence completed")
+
+            except Exception as e:
+                self.handle_battle_error(e)
+
+        if tracer.enabled:
+            tracer.stop()
+
+    def start_session_recording(self, match_id):
+        """Record the frames and inputs of this match when configured"""
+        if not self.app_state.session_dir:
+            return
+        device = self.app_state.emulator_name.replace(":", "_")
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(
+            self.app_state.session_dir, f"{device}-{stamp}-{match_id}.session"
+        )
+        session_recorder.start(
+            path, device=self.app_state.emulator_name, match=match_id
+        )
+        self.log_callback(f"🎞️ Recording match to {path}")
 
     def check_connection(self):
         devices = self.emulator_controller.get_all_devices()
@@ -120,16 +218,25 @@ class GameController:
     def handle_battle_error(self, e):
         error_msg = f"⚠️ Error during battle sequence:\n{e!s}\n\nTraceback:\n{''.join(traceback.format_exc())}"
         self.log_callback(error_msg)
-        time.sleep(5)  # Wait before retrying
+        self.dump_flight_recorder("battle_error", traceback.format_exc())
+        clock.sleep(5)  # Wait before retrying
 
     def handle_critical_error(self, e):
         error_msg = f"❌ Critical error in bot loop:\n{e!s}\n\nTraceback:\n{''.join(traceback.format_exc())}"
         self.log_callback(error_msg)
+        self.dump_flight_recorder("critical_error", traceback.format_exc())
         self.running_event.clear()
 
+    def dump_flight_recorder(self, reason, details=None):
+        report_dir = flight_recorder.dump(reason, details)
+        if report_dir:
+            self.log_callback(f"🧾 Last frames and actions saved to {report_dir}")
+
     def prepare_for_battle(self):
         self.game_state.reset()
+        self.energy_attached = False
 
+    @traced("game.navigate_to_battle")
     def navigate_to_battle(self):
         if not self.running_event.is_set():
             return
@@ -142,11 +249,12 @@ class GameController:
             self.image_processor.check_and_click(
                 screenshot, self.template_images["BATTLE_SCREEN"], "Battle screen"
             )
-        time.sleep(4)
+        clock.sleep(4)
         self.battle_controller.perform_search_battle_actions(
             self.running_event, run_event=True
         )
 
+    @traced("game.start_battle")
     def start_battle(self):
         if not self.running_event.is_set():
             return
@@ -154,29 +262,38 @@ class GameController:
             self.template_images["TIME_LIMIT_INDICATOR"],
             "Time limit indicator",
             self.running_event,
+            timeout=MATCHMAKING_TIMEOUT,
         )
-        time.sleep(3)
+        clock.sleep(3)
 
     def handle_battle(self):
+        self.turn_detector.start(self.running_event)
+        try:
+            self._battle_loop()
+        finally:
+            self.turn_detector.stop()
+
+    def _battle_loop(self):
         while self.running_event.is_set():
             screenshot = take_screenshot()
             if self.is_battle_over(screenshot) or self.next_step_available(screenshot):
-                break
+                break  # Won, lost or conceded, end_battle gets back to the lobby
 
             self.battle_controller.check_rival_afk(screenshot)
-            # Add check for rival concede
-            self.battle_controller.check_rival_concede(screenshot, self.running_event)
 
             is_turn, self.game_state.is_first_turn, self.game_state.go_first = (
                 self.battle_controller.check_turn(
-                    self.turn_check_region, self.running_event, self.game_state
+                    self.turn_check_region,
+                    self.running_event,
+                    self.game_state,
+                    self.turn_detector,
                 )
             )
 
             self.check_active_pokemon()
             self.reset_view()
 
-            time.sleep(3)  # wait to draw the card if need
+            clock.sleep(3)  # wait to draw the card if need
 
             if is_turn and self.game_state.active_pokemon:
                 if self.is_new_turn:
@@ -197,7 +314,7 @@ class GameController:
                         "Start battle button",
                         self.running_event,
                         similarity_threshold=0.5,
-                        max_attempts=10,
+                        timeout=START_BATTLE_TIMEOUT,
                     )
                 ):
                     self.game_state.first_turn_done = True
@@ -213,7 +330,7 @@ class GameController:
                 self.log_callback("Played first!")
             else:
                 self.log_callback("Waiting for opponent's turn...")
-                time.sleep(1)
+                clock.sleep(1)
 
             # Detect new cards drawn (e.g., after end of turn)
             # if self.detect_new_cards():
@@ -232,6 +349,7 @@ class GameController:
         return False
 
     # Update methods to check self.running_event.is_set()
+    @traced("game.update_game_state")
     def update_game_state(self, cards_delta=0):
         if not self.running_event.is_set():
             return
@@ -243,26 +361,66 @@ class GameController:
         if cards_delta == 0:
             if self.game_state.number_of_cards and self.game_state.number_of_cards > 0:
                 self.log_callback("🔍 Scanning cards...")
-                self.card_recognition_service.check_cards(
+                hand_frame = self.card_recognition_service.check_cards(
                     self.game_state.number_of_cards,
                     self.card_start_x,
                     self.card_y,
                     self.game_state.hand_state,
                     False,
                 )
+                self.hand_tracking_service.remember(
+                    hand_frame,
+                    self.game_state.hand_state,
+                    self.game_state.number_of_cards,
+                    self.card_start_x,
+                    self.card_y,
+                )
             else:
                 self.game_state.hand_state = []
 
+    @traced("game.refresh_hand")
+    def refresh_hand(self):
+        """Re-read a hand that changed, identifying only the cards not seen yet"""
+        if not self.running_event.is_set():
+            return
+        self.reset_view()
+        self.check_number_of_cards()
+        number_of_cards = self.game_state.number_of_cards
+        if not number_of_cards:
+            self.game_state.hand_state = []
+            return
+        self.reset_view()
+        hand_frame = take_screenshot()
+        known = self.hand_tracking_service.match(
+            hand_frame, number_of_cards, self.card_start_x, self.card_y
+        )
+        hand_frame = self.card_recognition_service.check_cards(
+            number_of_cards,
+            self.card_start_x,
+            self.card_y,
+            self.game_state.hand_state,
+            False,
+            known=known,
+            hand_frame=hand_frame,
+        )
+        self.hand_tracking_service.remember(
+            hand_frame,
+            self.game_state.hand_state,
+            number_of_cards,
+            self.card_start_x,
+            self.card_y,
+        )
+
+    @traced("game.play_turn")
     def play_turn(self):
         if not self.running_event.is_set():
             return
         self.log_callback("🎮 Starting turn...")
-        time.sleep(1)
+        clock.sleep(1)
 
         if not self.game_state.is_first_turn:
             self.add_energy_to_pokemon()
-        self.check_active_pokemon()
-        self.check_bench_cards()
+        self.check_board()
 
         if 0 < len(self.game_state.hand_state):
             # self.log_callback("📋 Current hand:")
@@ -296,131 +454,37 @@ class GameController:
         if len(self.game_state.hand_state) == 0:
             self.update_game_state()
 
-        cards_played = 0
-        max_cards_per_turn = 5  # Safety limit
-
-        while cards_played < max_cards_per_turn and self.game_state.hand_state:
-            cards_to_play = []
-            current_hand = self.game_state.hand_state[:]
-            cards_played_this_iteration = 0
-
-            # First, identify all playable cards
-            for card in current_hand:
-                if card in self.game_state.failed_cards:
-                    continue
-
-                if self.game_state.is_first_turn and card["info"].get("item_card"):
-                    continue
-
-                if (
-                    card["info"].get("item_card")
-                    and self.game_state.played_trainer_cards >= 2
-                ):
-                    continue
-
-                can_play = False
-                if card["info"].get("item_card"):
-                    can_play = True
-                elif self.can_set_active_pokemon(card):
-                    can_play = True
-                elif self.can_place_on_bench(card):
-                    can_play = True
-                elif self.can_evolve_pokemon(card):
-                    can_play = True
-
-                if can_play:
-                    cards_to_play.append(card)
-
-            if not cards_to_play:
+        max_plan_rounds = 3  # A new plan is only needed after drawing cards
+        for _ in range(max_plan_rounds):
+            if not self.running_event.is_set():
+                return
+            plan = self.turn_planner.plan(self.game_state)
+            if not plan:
                 break
-
-            # Now try to play each identified card
-            played_any = False
-            for card in cards_to_play:
-                if not self.running_event.is_set():
-                    return
-
-                card_offset_x = card_offset_mapping.get(
-                    len(self.game_state.hand_state), 20
-                )
-                start_x = self.card_start_x - (card["position"] * card_offset_x)
-
-                action_taken = False
-                delta = 0
-
-                # Try to play the card
-                if card["info"].get("item_card"):
-                    played, this_delta = self.play_trainer_card(card, start_x)
-                    delta += this_delta
-                    if played:
-                        self.game_state.played_trainer_cards += 1
-                        self.remove_card_from_hand(card)
-                        action_taken = True
-                elif self.can_set_active_pokemon(card):
-                    if self.set_active_pokemon(card, start_x):
-                        self.remove_card_from_hand(card)
-                        action_taken = True
-                elif self.can_place_on_bench(card):
-                    if self.place_pokemon_on_bench(card, start_x):
-                        self.remove_card_from_hand(card)
-                        action_taken = True
-                elif self.can_evolve_pokemon(card):
-                    if self.evolve_pokemon(card, start_x):
-                        self.remove_card_from_hand(card)
-                        action_taken = True
-
-                if action_taken:
-                    played_any = True
-                    cards_played += 1
-                    cards_played_this_iteration += 1
-                    # Update positions for remaining cards
-                    for i, remaining_card in enumerate(self.game_state.hand_state):
-                        remaining_card["position"] = i
-                    self.reset_view()
-                    time.sleep(1)
-
-            if not played_any:
+            self.log_callback(
+                "🧭 Turn plan: "
+                + ", ".join(f"{p['action']} {p['card']['name']}" for p in plan)
+            )
+            self.reset_view()
+            played, drawn = self.turn_executor.execute(plan, self.running_event)
+            self.reset_view()
+            if not played or not drawn:
                 break
-
-            delta -= cards_played_this_iteration
-            # Scan for any new cards that might have been drawn
-            if self.detect_new_cards() or delta != 0:
-                self.update_game_state(delta)
+            # Drawn cards shift the hand, only they need to be identified
+            self.refresh_hand()
 
         # Reset counters after processing all cards
         self.game_state.played_trainer_cards = 0
         self.game_state.failed_cards = []
 
-    def remove_card_from_hand(self, card):
-        """
-        Removes a card from the hand_state manually after it has been played.
-        """
-        try:
-            self.game_state.hand_state.remove(card)
-            self.log_callback(f"Removed card {card['name']} from hand manually.")
-        except ValueError:
-            self.log_callback(f"Card {card['name']} not found in hand to remove.")
-
-    def verify_card_play(self, card, action_func):
-        """
-        Verifies if a card was successfully played by checking the battle log.
-
-        Args:
-            card: The card being played
-            action_func: Function that performs the actual card play action
-
-        Returns:
-            bool: True if the card was successfully played, False otherwise
-        """
-        # Perform the card play action
-        action_func()
-        time.sleep(2)  # Wait for animation to complete
+    def confirm_play_in_battle_log(self, card):
+        """True if the battle log shows card was just played"""
         if not self.game_state.first_turn_done:
             self.log_callback(
                 "Skipping card play verification on first turn because dont have logs..."
             )
             return True
-        time.sleep(2)  # Need to really wait for some animations
+        clock.sleep(timing_profile.get("battle_log_ready"))
         # Check battle log for the action
         self.reset_view()
         action, card_info = self.battle_log.check_battle_log_action()
@@ -451,274 +515,82 @@ class GameController:
         self.log_callback(f"No battle log action detected for {card['name']}")
         return False
 
-    def play_trainer_card(self, card, start_x):
-        self.log_callback(f"Playing trainer card: {card['name']}...")
-        card_name_lower = card["name"].lower()
-
-        # Define the card play action
-        def play_action():
-            # time.sleep(1)
-            self.drag_first_y((start_x, self.card_y), (self.center_x, self.center_y))
-
-        # Attempt to play the card and verify success
-        if self.verify_card_play(card, play_action):
-            self.game_state.played_trainer_cards += 1
-            # Calculate card effect
-            effect_func = card_effects.get(card_name_lower)
-            if effect_func:
-                return True, effect_func(self.game_state.number_of_cards)
-            return True, 0  # Default effect: does nothing
-        self.game_state.failed_cards.append(card)
-
-        self.log_callback(f"Failed to play trainer card: {card['name']}")
-        return False, 0  # No change in hand size if card wasn't played
-
-    def can_set_active_pokemon(self, card):
-        return (
-            not self.game_state.active_pokemon
-            and card["info"].get("level") == 0
-            and not card["info"].get("item_card", False)
-        )
-
-    def set_active_pokemon(self, card, start_x):
-        self.log_callback(f"Setting Active Pokémon: {card['name']}")
-        self.reset_view()
-
-        def play_action():
-            # time.sleep(0.7)
-            self.drag((start_x, self.card_y), (self.center_x, self.center_y - 50))
-
-        if self.verify_card_play(card, play_action):
-            self.game_state.active_pokemon.clear()
-            self.game_state.active_pokemon.append(card)
-            time.sleep(1)
-            self.log_callback("Battle Start!")
-            return True
-        else:
-            self.log_callback(f"Failed to set active Pokémon: {card['name']}")
-            self.game_state.failed_cards.append(card)
-            return False
-
-    def can_place_on_bench(self, card):
-        # Count non-None values in bench_pokemon dict
-        occupied_slots = sum(
-            1 for slot in self.game_state.bench_pokemon.values() if slot is not None
-        )
-        return (
-            occupied_slots < 3
-            and card["info"].get("level") == 0
-            and not card["info"].get("item_card", False)
-            and card["name"]
+    def add_energy_to_pokemon(self):
+        if not self.running_event.is_set():
+            return
+        self.drag(
+            (750, 1450),
+            (self.center_x, self.center_y),
+            timing_profile.get("energy_drag_duration"),
         )
+        self.energy_attached = True
+        if self.game_state.active_pokemon:
+            active = self.game_state.active_pokemon[0]
+            active["energies"] = active.get("energies", 0) + 1
 
-    def place_pokemon_on_bench(self, card, start_x):
-        # Find first empty slot
-        empty_slot = next(
-            (
-                idx
-                for idx, pokemon in self.game_state.bench_pokemon.items()
-                if pokemon is None
-            ),
-            None,
-        )
-        if empty_slot is None:
+    def can_attack(self):
+        """
+        False when the attack menu cannot offer a usable attack: no active
+        Pokemon, or fewer energies attached than its cheapest attack needs
+        """
+        if not self.game_state.active_pokemon:
+            self.log_callback("⚔️ No active Pokémon, not attacking")
             return False
-
-        bench_position = bench_positions[empty_slot]
-        self.reset_view()
-
-        def play_action():
-            # time.sleep(1)
+        active = self.game_state.active_pokemon[0]
+        cost = active.get("info", {}).get("energies", 0)
+        attached = active.get("energies", 0)
+        if attached < cost:
             self.log_callback(
-                f"Placing card {card['name']} on bench at position {empty_slot}..."
-            )
-            self.drag_first_y(
-                (start_x, self.card_y), (bench_position[0], bench_position[1])
+                f"⚔️ {active['name']} has {attached}/{cost} energies, no attack possible"
             )
-
-        if self.verify_card_play(card, play_action):
-            bench_pokemon_info = {
-                "name": card["name"].capitalize(),
-                "info": card["info"],
-                "energies": 0,
-            }
-            self.game_state.bench_pokemon[empty_slot] = bench_pokemon_info
-            self.log_callback(f"Updated bench slot {empty_slot} with {card['name']}")
-            return True
-        else:
-            self.log_callback(f"Failed to place {card['name']} on bench")
-            self.game_state.failed_cards.append(card)
             return False
+        return True
 
-    def can_evolve_pokemon(self, card):
-        # Check active pokemon evolution
-        if (
-            card["info"].get("evolves_from")
-            and self.game_state.active_pokemon
-            and card["info"]["evolves_from"].lower()
-            == self.game_state.active_pokemon[0]["name"].lower()
-            and self.game_state.first_turn_done
-            and not self.game_state.go_first
-        ):
-            return True
-
-        # Check bench pokemon evolution
-        if card["info"].get("evolves_from"):
-            for bench_slot, bench_pokemon in self.game_state.bench_pokemon.items():
-                if (
-                    bench_pokemon is not None  # Check if slot is occupied
-                    and card["info"]["evolves_from"].lower()
-                    == bench_pokemon["name"].lower()
-                ):
-                    return True
-        return False
-
-    def evolve_pokemon(self, card, start_x):
-        # First check if we can evolve any bench pokemon
-        for slot_idx, bench_pokemon in self.game_state.bench_pokemon.items():
-            if (
-                bench_pokemon is not None  # Check if slot is occupied
-                and card["info"].get("evolves_from")
-                and card["info"]["evolves_from"].lower()
-                == bench_pokemon["name"].lower()
-            ):
-                self.log_callback(
-                    f"Evolving bench {bench_pokemon['name']} to {card['name']}..."
-                )
-                bench_position = bench_positions[slot_idx]
-
-                def play_action():
-                    self.drag_first_y(
-                        (start_x, self.card_y), (bench_position[0], bench_position[1])
-                    )
-
-                if self.verify_card_play(
-                    card, play_action
-                ):  # TODO here start_x must come from hand position of the card
-                    self.game_state.bench_pokemon[slot_idx] = {
-                        "name": card["name"],
-                        "info": card["info"],
-                        "energies": bench_pokemon.get("energies", 0),
-                    }
-                    time.sleep(1)
-                    return True
-                else:
-                    self.log_callback(
-                        f"Failed to evolve bench pokemon to {card['name']}"
-                    )
-                    self.game_state.failed_cards.append(card)
-                    return False
-
-        # If no bench pokemon to evolve, try active pokemon
-        if self.game_state.active_pokemon:  # Check if there's an active pokemon
-            self.log_callback(
-                f"Evolving {self.game_state.active_pokemon[0]['name']} to {card['name']}..."
-            )
-
-            def play_action():
-                self.drag_first_y(
-                    (start_x, self.card_y), (self.center_x, self.center_y)
-                )
-
-            if self.verify_card_play(card, play_action):
-                self.game_state.active_pokemon[0] = {
-                    "name": card["name"],
-                    "info": card["info"],
-                    "energies": self.game_state.active_pokemon[0].get("energies", 0),
-                }
-                time.sleep(1)
-                return True
-            else:
-                self.log_callback(f"Failed to evolve to {card['name']}")
-                self.game_state.failed_cards.append(card)
-                return False
-
-        return False
-
-    def add_energy_to_pokemon(self):
-        if not self.running_event.is_set():
-            return
-        self.drag((750, 1450), (self.center_x, self.center_y), 0.3)
-
+    @traced("game.try_attack")
     def try_attack(self):
-        self.add_energy_to_pokemon()
+        # Already attached at the start of a turn that had an active Pokemon
+        if not self.energy_attached and not self.game_state.is_first_turn:
+            self.add_energy_to_pokemon()
+        if not self.can_attack():
+            return
         self.drag((500, 1250), (self.center_x, self.center_y))
-        time.sleep(0.25)
+        clock.sleep(0.25)
         self.reset_view()
-        self.click(self.center_x, self.center_y)
-        time.sleep(1)
-        self.click(540, 1250)
-        self.click(540, 1150)
-        self.click(540, 1050)
-        time.sleep(1)
-        self.click(570, 1070)
+        self.attack_controller.attack(self.center_x, self.center_y)
         self.reset_view()
 
+    @traced("game.end_turn")
     def end_turn(self):
         if not self.running_event.is_set():
             return
         self.try_attack()
         self.reset_view()
-        time.sleep(0.35)
+        clock.sleep(0.35)
         screenshot = take_screenshot()
         if not self.image_processor.check_and_click(
-            screenshot, self.template_images["END_TURN"], "End turn"
+            screenshot, self.template_images["END_TURN"], "End turn", optimistic=True
         ):
             self.log_callback("❌ End turn not found")
             return
-        time.sleep(1.0)
+        clock.sleep(1.0)
         screenshot = take_screenshot()
         self.image_processor.check_and_click(
-            screenshot, self.template_images["OK"], "Ok"
+            screenshot, self.template_images["OK"], "Ok", optimistic=True
         )
         self.game_state.is_first_turn = False  # Ensure we reset the first turn flag
         self.game_state.go_first_done = True
         # Mark that the next turn is a new turn
         self.is_new_turn = True
+        self.energy_attached = False
+        # The indicator motion seen so far belongs to the turn we just ended
+        self.turn_detector.reset()
+        self.hand_tracking_service.forget()
 
+    @traced("game.end_battle")
     def end_battle(self):
         if not self.running_event.is_set():
             return
-        time.sleep(4)
-        screenshot = take_screenshot()
-        if self.image_processor.check_and_click(
-            screenshot, self.template_images["TAP_TO_PROCEED_BUTTON"], "Game ended"
-        ):
-            time.sleep(2)
-
-        max_attempts = 5
-        for _ in range(max_attempts):
-            if not self.running_event.is_set():
-                return
-            screenshot = take_screenshot()
-            if self.image_processor.check_and_click(
-                screenshot,
-                self.template_images["NEXT_BUTTON"],
-                "Checking next button",
-            ):
-                time.sleep(2)
-                break
-            time.sleep(1)
-
-        for _ in range(max_attempts):
-            if not self.running_event.is_set():
-                return
-            screenshot = take_screenshot()
-            if self.image_processor.check_and_click(
-                screenshot,
-                self.template_images["THANKS_BUTTON"],
-                "Checking thanks button",
-            ):
-                time.sleep(3)
-                break
-            time.sleep(1)
-
-        self.image_processor.check_and_click(
-            screenshot,
-            self.template_images["CROSS_BUTTON"],
-            "Checking cross button",
-        )
-        time.sleep(3)
+        self.post_match_navigator.run(self.running_event)
 
     def is_battle_over(self, screenshot):
         return self.image_processor.check(
@@ -778,19 +650,49 @@ class GameController:
         self.click(0, 1350, include_debug=False)
         self.click(0, 1350, include_debug=False)
 
-    def check_bench_cards(self):
+    def read_board(self):
+        """One screenshot of the battlefield, identified slot by slot"""
+        self.reset_view()
+        screenshot = take_screenshot()
+        board = self.board_recognition_service.identify_board(
+            screenshot, (self.center_x, self.center_y), bench_positions
+        )
+        return board, screenshot
+
+    @traced("game.check_board")
+    def check_board(self):
+        """Active and bench from a single frame, zooming only unsure slots"""
+        if not self.running_event.is_set():
+            return
+        board = self.read_board()
+        self.check_active_pokemon(board)
+        self.check_bench_cards(board)
+
+    def learn_empty_slot(self, slot, screenshot, zoomed_card_image):
+        """
+        Remember how slot looked in screenshot, only once the zoom on it
+        opened nothing: an unidentified card must not become the empty slot
+        """
+        if not self.board_recognition_service.zoom_opened_nothing(
+            screenshot, zoomed_card_image
+        ):
+            return
+        self.board_recognition_service.learn_empty(
+            slot, screenshot, (self.center_x, self.center_y), bench_positions
+        )
+
+    def check_bench_cards(self, board=None):
         """Full bench check that identifies cards and updates game state"""
         if not self.running_event.is_set():
             return
         self.log_callback("Checking bench cards...")
+        board, screenshot = board or self.read_board()
         for slot_idx, bench_position in enumerate(bench_positions):
-            self.reset_view()
-            time.sleep(0.5)
-            self.click(bench_position[0], bench_position[1])
-            zoomed_card_image = self.battle_controller.get_card(
-                bench_position[0], bench_position[1], 0.7
-            )
-            pokemon_id = self.card_recognition_service.identify_card(zoomed_card_image)
+            pokemon_id, state = board[slot_idx]
+            if state == "unsure":
+                pokemon_id, zoomed_card_image = self.zoom_bench_slot(bench_position)
+                if pokemon_id is None:
+                    self.learn_empty_slot(slot_idx, screenshot, zoomed_card_image)
             if pokemon_id:
                 card_info = self.card_recognition_service.deck_info.get(
                     pokemon_id, default_pokemon_stats
@@ -805,10 +707,24 @@ class GameController:
                     "energies": current_energies,
                 }
                 self.log_callback(f"Bench Pokemon {slot_idx}: {card_info['name']}")
-                time.sleep(0.35)
             else:
                 self.game_state.bench_pokemon[slot_idx] = None
-            self.reset_view()
+
+    def zoom_bench_slot(self, bench_position):
+        """(card id or None, zoomed image) of a bench slot"""
+        self.reset_view()
+        clock.sleep(0.5)
+        self.click(bench_position[0], bench_position[1])
+        zoomed_card_image = self.battle_controller.get_card(
+            bench_position[0],
+            bench_position[1],
+            timing_profile.get("long_press_duration"),
+        )
+        pokemon_id = self.card_recognition_service.identify_card(zoomed_card_image)
+        if pokemon_id:
+            clock.sleep(0.35)
+        self.reset_view()
+        return pokemon_id, zoomed_card_image
 
     def click_bench_positions(self):
         """Simply clicks all bench positions and active pokemon spot without checking cards"""
@@ -823,15 +739,21 @@ class GameController:
         # self.click(self.center_x, self.center_y)
         self.reset_view()
 
-    def check_active_pokemon(self):
-        self.drag((500, 1100), (self.center_x, self.center_y))
-        zoomed_card_image = self.battle_controller.get_card(
-            self.center_x, self.center_y, 0.7
-        )
-        main_zone_pokemon_id = self.card_recognition_service.identify_card(
-            zoomed_card_image
-        )
+    def check_active_pokemon(self, board=None):
+        board, screenshot = board or self.read_board()
+        main_zone_pokemon_id, state = board["active"]
+        if state == "unsure":
+            main_zone_pokemon_id, zoomed_card_image = self.zoom_active_pokemon()
+            if main_zone_pokemon_id is None:
+                self.learn_empty_slot("active", screenshot, zoomed_card_image)
         if main_zone_pokemon_id:
+            # Energies attached stay with the Pokemon while it is active
+            previous = (self.game_state.active_pokemon or [{}])[0]
+            energies = (
+                previous.get("energies", 0)
+                if previous.get("info", {}).get("id") == main_zone_pokemon_id
+                else 0
+            )
             self.game_state.active_pokemon = []
             card_info = self.card_recognition_service.deck_info.get(
                 main_zone_pokemon_id, default_pokemon_stats
@@ -839,43 +761,42 @@ class GameController:
             card_info = {
                 "name": card_info["name"].capitalize(),
                 "info": card_info,
-                "energies": 0,
+                "energies": energies,
             }
             self.game_state.active_pokemon.append(card_info)
             self.log_callback(f"Active Pokémon: {card_info['name']}")
         # else:
         # self.game_state.active_pokemon = []
 
+    def zoom_active_pokemon(self):
+        """(card id or None, zoomed image) of the active spot"""
+        self.drag((500, 1100), (self.center_x, self.center_y))
+        zoomed_card_image = self.battle_controller.get_card(
+            self.center_x, self.center_y, timing_profile.get("long_press_duration")
+        )
+        return (
+            self.card_recognition_service.identify_card(zoomed_card_image),
+            zoomed_card_image,
+        )
+
     def click(self, x, y, include_debug=True):
         """Wrapper for click_position with default debug parameters"""
         if include_debug and self.debug_window and self.debug_window.is_open:
-            click_position(
-                x, y, debug_window=self.debug_window, screenshot=self.last_screenshot
-            )
+            click_position(x, y, debug_window=self.debug_window)
         else:
             click_position(x, y)
 
-    def drag(self, start_pos, end_pos, duration=0.5):
+    def drag(self, start_pos, end_pos, duration=None):
         """Wrapper for drag_position with default debug parameters"""
         if self.debug_window and self.debug_window.is_open:
-            drag_position(
-                start_pos,
-                end_pos,
-                duration,
-                debug_window=self.debug_window,
-                screenshot=self.last_screenshot,
-            )
+            drag_position(start_pos, end_pos, duration, debug_window=self.debug_window)
         else:
             drag_position(start_pos, end_pos, duration)
 
-    def drag_first_y(self, start_pos, end_pos, duration=0.5):
-        # drag_first_y(
-        # start_pos, end_pos, duration, self.debug_window, self.last_screenshot
-        # )
+    def drag_first_y(self, start_pos, end_pos, duration=None):
+        # drag_first_y(start_pos, end_pos, duration, self.debug_window)
         ## TODO: Implement drag_first_y, not working as expected
-        drag_position(
-            start_pos, end_pos, duration, self.debug_window, self.last_screenshot
-        )
+        drag_position(start_pos, end_pos, duration, self.debug_window)
 
     def read_hand_cards(self):
         self.reset_view()
@@ -887,6 +808,18 @@ class GameController:
         self.check_bench_cards()
         return self.game_state.bench_pokemon
 
+    def calibrate_timings(self):
+        """Measure this device's timings, must be run on the battle screen"""
+        if timing_profile.device_id != self.app_state.emulator_name:
+            timing_profile.load(self.app_state.emulator_name)
+        self.timing_calibrator.calibrate(
+            self.card_start_x,
+            self.card_y,
+            self.zoom_card_region,
+            self.reset_view,
+            lambda x, y, duration: drag_position((x, y), (x, y), duration),
+        )
+
     def read_active_pokemon(self):
         self.reset_view()
         self.check_active_pokemon()
@@ -0,0 +1,92 @@
+from utils.adb_utils import take_screenshot_raw
+from utils.constants import ACTIVE_CARD_SIZE, BENCH_CARD_SIZE, HAND_CARD_SIZE
+from utils.tracing import traced
+
+# 1 - SSIM of a region above CHANGED means something new is there, below
+# UNCHANGED it is the same picture; anything in between is ambiguous
+CHANGED = 0.15
+UNCHANGED = 0.05
+
+
+def region_around(center, size):
+    x, y = center
+    w, h = size
+    return (max(x - w // 2, 0), max(y - h // 2, 0), w, h)
+
+
+class PlayVerifier:
+    """
+    Decides whether a play went through from before/after frames.
+
+    before() keeps a frame taken right before the gesture, verify() takes
+    one after the placement animation and compares the target slot (bench
+    slot or active spot) and the hand slot the card was dragged from; a
+    trainer leaves no mark on the board, so only its hand slot counts. All
+    changed is a success, nothing changed a failure. Anything in between is
+    settled by the battle log (GameController.confirm_play_in_battle_log).
+    """
+
+    def __init__(
+        self, game_controller, image_processor, log_callback, frame_source=None
+    ):
+        self.game_controller = game_controller
+        self.image_processor = image_processor
+        self.log_callback = log_callback
+        self.frame_source = frame_source or take_screenshot_raw
+        self._before = None
+        self._last_frame = None
+
+    def reset(self):
+        """Forget the last frame, the screen may have changed since"""
+        self._last_frame = None
+
+    def before(self, play):
+        # The frame taken after the previous play is still the current screen
+        self._before = (
+            self._last_frame if self._last_frame is not None else self.frame_source()
+        )
+
+    def target_region(self, play):
+        if play["action"] in ("trainer", "draw"):
+            return None
+        if play["slot"] is not None:
+            return region_around(play["target"], BENCH_CARD_SIZE)
+        return region_around(play["target"], ACTIVE_CARD_SIZE)
+
+    def _change(self, before, after, region):
+        x, y, w, h = region
+        return 1 - self.image_processor.similarity_engine.score(
+            before[y : y + h, x : x + w], after[y : y + h, x : x + w], cache=False
+        )
+
+    @traced("play.verify")
+    def verify(self, play):
+        after = self.frame_source()
+        self._last_frame = after
+        before, self._before = self._before, None
+        card = play["card"]
+        if before is None or after is None:
+            return self.confirm_in_battle_log(card)
+
+        hand_change = self._change(
+            before, after, region_around(play["start"], HAND_CARD_SIZE)
+        )
+        region = self.target_region(play)
+        target_change = (
+            hand_change if region is None else self._change(before, after, region)
+        )
+
+        if hand_change > CHANGED and target_change > CHANGED:
+            self.log_callback(
+                f"Verified {card['name']} on screen "
+                f"(slot {target_change:.2f}, hand {hand_change:.2f})"
+            )
+            return True
+        if hand_change < UNCHANGED and target_change < UNCHANGED:
+            self.log_callback(f"Nothing changed, {card['name']} was not played")
+            return False
+        return self.confirm_in_battle_log(card)
+
+    def confirm_in_battle_log(self, card):
+        self._last_frame = None  # Opening the log changes the screen
+        return self.game_controller.confirm_play_in_battle_log(card)
@@ -0,0 +1,114 @@
+from utils.adb_utils import take_screenshot
+from utils.clock import clock
+from utils.flight_recorder import flight_recorder
+
+# What to do on each screen shown after a match. Buttons are tapped as soon
+# as they show up, in whatever order; popups with a template (missions) are
+# dismissed the same way.
+POST_MATCH_SCREENS = {
+    "TAP_TO_PROCEED_BUTTON": "tap",
+    "NEXT_BUTTON": "tap",
+    "THANKS_BUTTON": "tap",
+    "OK": "tap",
+    "OK_2": "tap",
+    "OK_3": "tap",
+    "CROSS_BUTTON": "tap",
+    "BATTLE_ALREADY_SCREEN": "lobby",
+    "BATTLE_SCREEN": "lobby",
+    "BATTLE_BUTTON": "lobby",
+}
+# Give up when no known screen shows up for this long
+SCREEN_TIMEOUT = 15
+POLL_INTERVAL = 0.1
+# A button still on screen this long after its tap is tapped again, before
+# that it is just the transition animating
+RETAP_DELAY = 1.5
+# Screens without a template (level up, rewards) continue on a tap anywhere:
+# after this long with no known screen, the neutral spot reset_view uses is
+# tapped, again every CONTINUE_TAP_DELAY
+CONTINUE_TAP_DELAY = 2.0
+CONTINUE_TAP_POSITION = (0, 1350)
+
+
+class PostMatchNavigator:
+    """
+    Gets from the end of a match back to the lobby.
+
+    Every frame is classified against the post-match screens
+    (ImageProcessor.classify) and the screen found is handled right away,
+    so the bot never sleeps longer than one poll between two screens and
+    does not care about their order. Screens it has no template for are
+    tapped through at CONTINUE_TAP_POSITION once nothing known has shown up
+    for CONTINUE_TAP_DELAY. It stops once a lobby screen shows up, or when
+    nothing known has been on screen for SCREEN_TIMEOUT. The time spent
+    between matches is logged after every run.
+    """
+
+    def __init__(self, image_processor, template_images, log_callback):
+        self.image_processor = image_processor
+        self.template_images = template_images
+        self.log_callback = log_callback
+        self.runs = 0
+        self.total_seconds = 0.0
+
+    def templates(self):
+        return {name: self.template_images.get(name) for name in POST_MATCH_SCREENS}
+
+    def run(self, running_event, timeout=SCREEN_TIMEOUT):
+        """Returns True once the lobby is reached"""
+        started = clock.time()
+        last_seen = started
+        last_tap = (None, started)
+        reached_lobby = False
+        templates = self.templates()
+
+        while running_event.is_set() and clock.time() - last_seen < timeout:
+            screenshot = take_screenshot()
+            if screenshot is None:
+                clock.sleep(POLL_INTERVAL)
+                continue
+            # Buttons such as NEXT_BUTTON are checked at their usual spot first
+            name, position, similarity = self.image_processor.classify(
+                screenshot, templates, optimistic=True
+            )
+            if name is None:
+                now = clock.time()
+                if (
+                    now - last_seen >= CONTINUE_TAP_DELAY
+                    and now - last_tap[1] >= CONTINUE_TAP_DELAY
+                ):
+                    self.image_processor.log_and_click(
+                        CONTINUE_TAP_POSITION, "Unknown screen, tapping to continue"
+                    )
+                    last_tap = (None, clock.time())
+                clock.sleep(POLL_INTERVAL)
+                continue
+            last_seen = clock.time()
+            if POST_MATCH_SCREENS[name] == "lobby":
+                reached_lobby = True
+                break
+            if name == last_tap[0] and last_seen - last_tap[1] < RETAP_DELAY:
+                clock.sleep(POLL_INTERVAL)
+                continue
+            self.image_processor.log_and_click(
+                position, f"{name} found - {similarity:.2f}", screenshot=screenshot
+            )
+            last_tap = (name, clock.time())
+
+        self.report(clock.time() - started, reached_lobby)
+        if not reached_lobby and running_event.is_set():
+            report_dir = flight_recorder.dump(
+                "stuck_screen", f"No known screen for {timeout}s after the match"
+            )
+            if report_dir:
+                self.log_callback(f"🧾 Last frames and actions saved to {report_dir}")
+        return reached_lobby
+
+    def report(self, seconds, reached_lobby):
+        self.runs += 1
+        self.total_seconds += seconds
+        status = "back in the lobby" if reached_lobby else "lobby not seen"
+        self.log_callback(
+            f"⏱️ {seconds:.1f}s between matches, {status} "
+            f"(average {self.total_seconds / self.runs:.1f}s)"
+        )
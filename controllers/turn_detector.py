@@ -0,0 +1,121 @@
+import threading
+from collections import deque
+
+from utils.adb_utils import take_screenshot_raw
+from utils.clock import clock
+
+# The turn indicator animates while it is our turn. Two frames of the region
+# 1.1s apart with SSIM below 0.958 used to mean "your turn"; the same window
+# and threshold are kept, but any frame inside the window can trigger it.
+TURN_WINDOW_SECONDS = 1.1
+TURN_SIMILARITY_THRESHOLD = 0.958
+FRAME_INTERVAL_SECONDS = 0.15
+
+
+class TurnDetector:
+    """
+    Watches the turn indicator region on a background stream of frames.
+
+    Every frame the region is compared against the frames kept in a sliding
+    window; the motion energy is 1 - SSIM against the most different one.
+    When it goes above the threshold the turn event is set, so the battle
+    loop can block on wait_for_turn instead of capturing twice and sleeping.
+    The event is cleared once the region is static across a whole window.
+    With threaded=False start() runs nothing and check_turn compares two
+    captures inline instead, which keeps a replay on a simulated clock
+    deterministic.
+    """
+
+    def __init__(
+        self,
+        image_processor,
+        region,
+        log_callback,
+        frame_source=None,
+        interval=FRAME_INTERVAL_SECONDS,
+        window=TURN_WINDOW_SECONDS,
+        threshold=TURN_SIMILARITY_THRESHOLD,
+        threaded=True,
+    ):
+        self.image_processor = image_processor
+        self.region = region
+        self.log_callback = log_callback
+        self.frame_source = frame_source or take_screenshot_raw
+        self.interval = interval
+        self.window = window
+        self.threshold = threshold
+        self.threaded = threaded
+
+        self.turn_event = threading.Event()
+        self.motion_energy = 0.0
+        self._frames = deque()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self, running_event):
+        if not self.threaded or (self._thread is not None and self._thread.is_alive()):
+            return
+        self.reset()
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(running_event,), daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+        self.turn_event.clear()
+
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def reset(self):
+        """Forget the window, e.g. right after we ended our turn"""
+        with self._lock:
+            self._frames.clear()
+            self.motion_energy = 0.0
+            self.turn_event.clear()
+
+    def is_turn(self):
+        return self.turn_event.is_set()
+
+    def wait_for_turn(self, timeout=None):
+        """Block until our turn starts or the timeout expires"""
+        return clock.wait(self.turn_event, timeout)
+
+    def _run(self, running_event):
+        while running_event.is_set() and not self._stop_event.is_set():
+            started = clock.time()
+            frame = self.frame_source()
+            if frame is not None:
+                self.process_frame(frame, started)
+            elapsed = clock.time() - started
+            clock.wait(self._stop_event, max(self.interval - elapsed, 0))
+
+    def process_frame(self, frame, timestamp):
+        x, y, w, h = self.region
+        roi = frame[y : y + h, x : x + w].copy()
+        with self._lock:
+            while self._frames and timestamp - self._frames[0][0] > self.window:
+                self._frames.popleft()
+            energy = 0.0
+            for _, previous in self._frames:
+                similarity = self.image_processor.similarity_engine.score(
+                    roi, previous, cache=False
+                )
+                energy = max(energy, 1 - similarity)
+            self._frames.append((timestamp, roi))
+            self.motion_energy = energy
+
+            if energy > 1 - self.threshold:
+                if not self.turn_event.is_set():
+                    self.turn_event.set()
+                    self.log_callback(f"🎮 Turn indicator moving ({energy:.3f})")
+            elif self.turn_event.is_set():
+                # Current frame matches every frame of the window: static again
+                self.turn_event.clear()
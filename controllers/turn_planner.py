@@ -0,0 +1,343 @@
+from utils.clock import clock
+from utils.constants import bench_positions, card_offset_mapping
+from utils.timing_profile import timing_profile
+from utils.tracing import traced
+
+card_effects = {
+    "professor's research": lambda hand_size: 2,  # Draw 2 (+2)
+    "poké ball": lambda hand_size: 1,  # Search and add one base Pokemon card (+1)
+}
+
+MAX_CARDS_PER_TURN = 5  # Safety limit
+MAX_TRAINER_CARDS_PER_TURN = 2
+# Size of the board area watched around a drag target when timing a play
+PLAY_SETTLE_BOX = (220, 300)
+
+# Order in which plays are emitted. Cards that draw go last because the
+# cards they add invalidate every hand position computed after them.
+ACTION_ORDER = {"active": 0, "evolve": 1, "bench": 2, "trainer": 3, "draw": 4}
+
+
+def can_set_active(game_state, card):
+    return (
+        not game_state.active_pokemon
+        and card["info"].get("level") == 0
+        and not card["info"].get("item_card", False)
+    )
+
+
+def can_place_on_bench(game_state, card):
+    # Count non-None values in bench_pokemon dict
+    occupied_slots = sum(
+        1 for slot in game_state.bench_pokemon.values() if slot is not None
+    )
+    return (
+        occupied_slots < 3
+        and card["info"].get("level") == 0
+        and not card["info"].get("item_card", False)
+        and card["name"]
+    )
+
+
+def evolution_target(game_state, card, exclude=()):
+    """
+    Returns ("bench", slot_idx) or ("active", None) for the Pokemon the card
+    evolves, bench first, or None.
+    Targets listed in exclude are skipped.
+    """
+    evolves_from = card["info"].get("evolves_from")
+    if not evolves_from:
+        return None
+    for slot_idx, bench_pokemon in game_state.bench_pokemon.items():
+        if (
+            bench_pokemon is not None
+            and ("bench", slot_idx) not in exclude
+            and evolves_from.lower() == bench_pokemon["name"].lower()
+        ):
+            return "bench", slot_idx
+    if (
+        game_state.active_pokemon
+        and ("active", None) not in exclude
+        and evolves_from.lower() == game_state.active_pokemon[0]["name"].lower()
+        and game_state.first_turn_done
+        and not game_state.go_first
+    ):
+        return "active", None
+    return None
+
+
+def apply_play(game_state, play):
+    """Update GameState for a play that was sent to the device"""
+    card = play["card"]
+    action = play["action"]
+    slot = play["slot"]
+    if action == "active":
+        game_state.active_pokemon = [card]
+    elif action == "bench":
+        game_state.bench_pokemon[slot] = {
+            "name": card["name"].capitalize(),
+            "info": card["info"],
+            "energies": 0,
+        }
+    elif action == "evolve" and slot is not None:
+        previous = game_state.bench_pokemon[slot] or {}
+        game_state.bench_pokemon[slot] = {
+            "name": card["name"],
+            "info": card["info"],
+            "energies": previous.get("energies", 0),
+        }
+    elif action == "evolve":
+        previous = game_state.active_pokemon[0]
+        game_state.active_pokemon[0] = {
+            "name": card["name"],
+            "info": card["info"],
+            "energies": previous.get("energies", 0),
+        }
+    else:
+        game_state.played_trainer_cards += 1
+
+    if card in game_state.hand_state:
+        game_state.hand_state.remove(card)
+    # Same shift TurnPlanner assumed when computing the next positions
+    for remaining_card in game_state.hand_state:
+        if remaining_card["position"] > play["hand_position"]:
+            remaining_card["position"] -= 1
+    if game_state.number_of_cards:
+        game_state.number_of_cards -= 1
+
+
+class PlanningState:
+    """Mutable copy of the parts of GameState a plan changes"""
+
+    def __init__(self, game_state):
+        self.active_pokemon = list(game_state.active_pokemon)
+        self.bench_pokemon = dict(game_state.bench_pokemon)
+        self.is_first_turn = game_state.is_first_turn
+        self.first_turn_done = game_state.first_turn_done
+        self.go_first = game_state.go_first
+        self.played_trainer_cards = game_state.played_trainer_cards
+        self.failed_cards = list(game_state.failed_cards)
+        # Pokemon put down by this plan cannot evolve in the same turn
+        self.placed_this_turn = set()
+
+
+class TurnPlanner:
+    """
+    Computes the whole turn up front from a snapshot of GameState.
+
+    The result is an ordered list of plays. Each play is a dict with the
+    card, the action ("active", "evolve", "bench", "trainer" or "draw"), the
+    target slot, the drag start/end coordinates and the gesture to use.
+    Hand positions account for the cards removed by the earlier plays.
+    """
+
+    def __init__(self, card_start_x, card_y, center_x, center_y):
+        self.card_start_x = card_start_x
+        self.card_y = card_y
+        self.center_x = center_x
+        self.center_y = center_y
+
+    def plan(self, game_state):
+        state = PlanningState(game_state)
+        chosen = []
+        for card in game_state.hand_state:
+            play = self._choose_play(state, card)
+            if play is not None:
+                chosen.append(play)
+            if len(chosen) >= MAX_CARDS_PER_TURN:
+                break
+
+        chosen.sort(key=lambda play: ACTION_ORDER[play["action"]])
+        # Stop at the first draw, what comes after depends on the new cards
+        for i, play in enumerate(chosen):
+            if play["action"] == "draw":
+                chosen = chosen[: i + 1]
+                break
+
+        hand_size = game_state.number_of_cards or len(game_state.hand_state)
+        positions = {id(card): card["position"] for card in game_state.hand_state}
+        for play in chosen:
+            position = positions.pop(id(play["card"]))
+            offset = card_offset_mapping.get(hand_size, 20)
+            play["hand_position"] = position
+            play["start"] = (self.card_start_x - position * offset, self.card_y)
+            # Cards to the left of the played one slide into its place
+            for card_id, other in positions.items():
+                if other > position:
+                    positions[card_id] = other - 1
+            hand_size -= 1
+        return chosen
+
+    def _choose_play(self, state, card):
+        info = card["info"]
+        if card in state.failed_cards:
+            return None
+
+        if info.get("item_card"):
+            if (
+                state.is_first_turn
+                or state.played_trainer_cards >= MAX_TRAINER_CARDS_PER_TURN
+            ):
+                return None
+            state.played_trainer_cards += 1
+            draws = card["name"].lower() in card_effects
+            return self._play(
+                card,
+                "draw" if draws else "trainer",
+                (self.center_x, self.center_y),
+                "drag_first_y",
+            )
+
+        if can_set_active(state, card):
+            state.active_pokemon = [card]
+            state.placed_this_turn.add(("active", None))
+            return self._play(
+                card, "active", (self.center_x, self.center_y - 50), "drag"
+            )
+
+        if can_place_on_bench(state, card):
+            slot = next(
+                idx for idx, pokemon in state.bench_pokemon.items() if pokemon is None
+            )
+            state.bench_pokemon[slot] = {
+                "name": card["name"].capitalize(),
+                "info": info,
+                "energies": 0,
+            }
+            state.placed_this_turn.add(("bench", slot))
+            return self._play(
+                card, "bench", bench_positions[slot], "drag_first_y", slot
+            )
+
+        target = evolution_target(state, card, state.placed_this_turn)
+        if target is not None:
+            where, slot = target
+            if where == "bench":
+                previous = state.bench_pokemon[slot]
+                state.bench_pokemon[slot] = {
+                    "name": card["name"],
+                    "info": info,
+                    "energies": previous.get("energies", 0),
+                }
+                return self._play(
+                    card, "evolve", bench_positions[slot], "drag_first_y", slot
+                )
+            previous = state.active_pokemon[0]
+            state.active_pokemon = [
+                {
+                    "name": card["name"],
+                    "info": info,
+                    "energies": previous.get("energies", 0),
+                }
+            ]
+            return self._play(
+                card, "evolve", (self.center_x, self.center_y), "drag_first_y"
+            )
+        return None
+
+    def _play(self, card, action, target, gesture, slot=None):
+        return {
+            "card": card,
+            "action": action,
+            "slot": slot,
+            "target": target,
+            "gesture": gesture,
+        }
+
+
+class BattleLogVerifier:
+    """Confirms every play in the battle log"""
+
+    def __init__(self, game_controller):
+        self.game_controller = game_controller
+
+    def reset(self):
+        pass
+
+    def before(self, play):
+        pass
+
+    def verify(self, play):
+        return self.game_controller.confirm_play_in_battle_log(play["card"])
+
+
+class TurnExecutor:
+    """
+    Runs a planned turn as one sequence of gestures.
+
+    Every gesture is followed by the animation time of its action from the
+    timing profile, and GameState is only updated for a play its verifier
+    confirmed: before(play) is called right before the gesture and
+    verify(play) after the animation (see PlayVerifier). Without one, every
+    play is confirmed in the battle log. With a calibrator, one play out of
+    learn_every waits for the target area to settle instead, which keeps the
+    profile learning.
+    """
+
+    def __init__(
+        self,
+        game_controller,
+        log_callback,
+        verifier=None,
+        calibrator=None,
+        learn_every=4,
+    ):
+        self.game_controller = game_controller
+        self.log_callback = log_callback
+        self.verifier = verifier or BattleLogVerifier(game_controller)
+        self.calibrator = calibrator
+        self.learn_every = learn_every
+        self._plays_sent = 0
+
+    def execute(self, plan, running_event):
+        """Returns (cards_played, cards_drawn)"""
+        game_state = self.game_controller.game_state
+        played = 0
+        drawn = 0
+        self.verifier.reset()
+        for play in plan:
+            if not running_event.is_set():
+                break
+            card = play["card"]
+            self.log_callback(
+                f"▶️ {play['action'].capitalize()}: {card['name']} "
+                f"(hand {play['hand_position']} → {play['target']})"
+            )
+            self.verifier.before(play)
+            self._send(play)
+
+            if not self.verifier.verify(play):
+                self.log_callback(f"Failed to play {card['name']}")
+                game_state.failed_cards.append(card)
+                # Later plays were computed assuming this one succeeded
+                break
+
+            apply_play(game_state, play)
+            played += 1
+            if play["action"] == "draw":
+                drawn += card_effects[card["name"].lower()](game_state.number_of_cards)
+        return played, drawn
+
+    @traced("play.send")
+    def _send(self, play):
+        timing_name = f"play_animation_{play['action']}"
+        self._plays_sent += 1
+        if self.calibrator is not None and self._plays_sent % self.learn_every == 0:
+            x, y = play["target"]
+            w, h = PLAY_SETTLE_BOX
+            region = (max(x - w // 2, 0), max(y - h // 2, 0), w, h)
+            timeout = timing_profile.get(timing_name) * 3
+            if self.calibrator.measure_settle(
+                timing_name, lambda: self._gesture(play), region, timeout
+            ):
+                return
+            # Never settled, the gesture was sent: fall back to the fixed wait
+        else:
+            self._gesture(play)
+        clock.sleep(timing_profile.get(timing_name))
+
+    def _gesture(self, play):
+        if play["gesture"] == "drag":
+            self.game_controller.drag(play["start"], play["target"])
+        else:
+            self.game_controller.drag_first_y(play["start"], play["target"])
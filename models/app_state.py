@@ -2,7 +2,11 @@ class AppState:
     def __init__(self):
         self.program_path = None
         self.emulator_name = None
+        self.trace_file = None  # Chrome trace of every run, off when None
+        self.session_dir = None  # One .session recording per match, off when None
 
     def update(self, config):
         self.program_path = config.get("path")
         self.emulator_name = config.get("emulator")
+        self.trace_file = config.get("trace")
+        self.session_dir = config.get("record_sessions")
@@ -0,0 +1,151 @@
+# src/services/board_recognition_service.py
+
+import os
+import threading
+
+import cv2
+
+from utils.constants import ACTIVE_CARD_SIZE, BENCH_CARD_SIZE, ZOOM_CARD_REGION
+
+# Card sizes on the board are approximate, so thumbnails are tried at a few scales
+SCALES = (0.9, 1.0, 1.1)
+# Margin (px) around a slot searched for the card
+SLOT_SEARCH_MARGIN = 20
+MIN_CONFIDENCE = 0.7
+MIN_MARGIN = 0.05
+# A slot this similar to the learned empty slot holds no card
+EMPTY_SIMILARITY = 0.9
+# A long press that changed the zoom region less than this (mean grey level
+# difference) opened no card
+ZOOM_UNCHANGED_DIFF = 8
+
+
+class BoardRecognitionService:
+    """
+    Identifies the active and bench Pokemon from one unzoomed screenshot.
+
+    Each slot is cropped around its position and matched against thumbnails
+    of the zoomed images in images/cards, scaled down to the card size of
+    that slot. Every slot comes back as (card_id, "card"), (None, "empty")
+    or (None, "unsure"); only unsure slots need a zoom. What an empty slot
+    looks like is learned from the zooms that opened no card at all
+    (zoom_opened_nothing, then learn_empty).
+    """
+
+    def __init__(self, card_images, log_callback):
+        self.log_callback = log_callback
+        self.card_images = {}
+        self.empty_slots = {}
+        self._thumbnails = {}
+        self._lock = threading.Lock()
+        for card_file_name, image in card_images.items():
+            self.add_card(os.path.splitext(card_file_name)[0], image)
+
+    def add_card(self, card_id, zoomed_card_image):
+        if zoomed_card_image is None or zoomed_card_image.size == 0:
+            return
+        with self._lock:
+            self.card_images[card_id] = cv2.cvtColor(
+                zoomed_card_image, cv2.COLOR_BGR2GRAY
+            )
+            self._thumbnails.clear()
+
+    def _thumbnails_for(self, size):
+        """[(card_id, thumbnail)] at every scale of a (w, h) slot size"""
+        with self._lock:
+            thumbnails = self._thumbnails.get(size)
+            if thumbnails is None:
+                thumbnails = [
+                    (
+                        card_id,
+                        cv2.resize(
+                            image,
+                            (int(size[0] * scale), int(size[1] * scale)),
+                            interpolation=cv2.INTER_AREA,
+                        ),
+                    )
+                    for card_id, image in self.card_images.items()
+                    for scale in SCALES
+                ]
+                self._thumbnails[size] = thumbnails
+            return thumbnails
+
+    def slot_regions(self, active_position, bench_positions):
+        """{slot: (x, y, w, h)}, slot is "active" or the bench index"""
+        regions = {}
+        slots = [("active", active_position, ACTIVE_CARD_SIZE)] + [
+            (slot_idx, position, BENCH_CARD_SIZE)
+            for slot_idx, position in enumerate(bench_positions)
+        ]
+        for slot, (x, y), (w, h) in slots:
+            regions[slot] = (x - w // 2, y - h // 2, w, h)
+        return regions
+
+    def _crop(self, gray_screenshot, region, margin=0):
+        x, y, w, h = region
+        screen_h, screen_w = gray_screenshot.shape[:2]
+        return gray_screenshot[
+            max(y - margin, 0) : min(y + h + margin, screen_h),
+            max(x - margin, 0) : min(x + w + margin, screen_w),
+        ]
+
+    def identify_slot(self, gray_screenshot, slot, region):
+        window = self._crop(gray_screenshot, region, SLOT_SEARCH_MARGIN)
+        empty = self.empty_slots.get(slot)
+        if empty is not None:
+            result = cv2.matchTemplate(window, empty, cv2.TM_CCOEFF_NORMED)
+            if result.max() > EMPTY_SIMILARITY:
+                return None, "empty"
+
+        best = {}
+        for card_id, thumbnail in self._thumbnails_for(region[2:]):
+            if (
+                window.shape[0] < thumbnail.shape[0]
+                or window.shape[1] < thumbnail.shape[1]
+            ):
+                continue
+            result = cv2.matchTemplate(window, thumbnail, cv2.TM_CCOEFF_NORMED)
+            best[card_id] = max(best.get(card_id, -1.0), float(result.max()))
+        scores = sorted(
+            ((score, card_id) for card_id, score in best.items()), reverse=True
+        )
+        if not scores:
+            return None, "unsure"
+        best_score, best_id = scores[0]
+        runner_up = scores[1][0] if len(scores) > 1 else -1.0
+        if best_score < MIN_CONFIDENCE or best_score - runner_up < MIN_MARGIN:
+            return None, "unsure"
+        return best_id, "card"
+
+    def identify_board(self, screenshot, active_position, bench_positions):
+        """{slot: (card_id, state)} for the active spot and every bench slot"""
+        regions = self.slot_regions(active_position, bench_positions)
+        if screenshot is None:
+            return dict.fromkeys(regions, (None, "unsure"))
+        gray = cv2.cvtColor(screenshot, cv2.COLOR_BGR2GRAY)
+        return {
+            slot: self.identify_slot(gray, slot, region)
+            for slot, region in regions.items()
+        }
+
+    def zoom_opened_nothing(self, screenshot, zoomed_card_image):
+        """
+        True if the zoom region captured during a long press is the one of
+        screenshot, taken before it: no card was opened, the slot is empty.
+        A card the zoom showed but could not identify is not.
+        """
+        if screenshot is None or zoomed_card_image is None:
+            return False
+        x, y, w, h = ZOOM_CARD_REGION
+        before = screenshot[y : y + h, x : x + w]
+        if before.shape != zoomed_card_image.shape:
+            return False
+        return cv2.absdiff(before, zoomed_card_image).mean() < ZOOM_UNCHANGED_DIFF
+
+    def learn_empty(self, slot, screenshot, active_position, bench_positions):
+        """Remember how slot looks in screenshot, which a zoom found empty"""
+        if screenshot is None:
+            return
+        region = self.slot_regions(active_position, bench_positions)[slot]
+        gray = cv2.cvtColor(screenshot, cv2.COLOR_BGR2GRAY)
+        self.empty_slots[slot] = self._crop(gray, region).copy()
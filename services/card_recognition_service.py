@@ -1,15 +1,38 @@
 # src/services/card_recognition_service.py
 
 import os
+import re
 import threading
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 
 import cv2
 import requests
 
-from utils.adb_utils import find_subimage
+from services.board_recognition_service import BoardRecognitionService
+from services.hand_recognition_service import HandRecognitionService
+from services.hand_swipe_service import HandSwipeService
+from utils.adb_utils import find_subimage, take_screenshot
+from utils.clock import clock
 from utils.constants import card_offset_mapping
 from utils.deck import deck_info, save_deck
+from utils.timing_profile import timing_profile
+
+# The swipe scan costs one gesture for the whole hand, worth it from 2 cards
+SWIPE_SCAN_MIN_CARDS = 2
+# Energy symbols of an attack, one letter each, lead its info text
+ATTACK_COST = re.compile(r"\{(\w*)\}")
+
+
+def attack_cost(attack):
+    """
+    Energies an attack needs: its cost list, or the letters in braces at the
+    start of its info ("{GC} Vine Whip 40" costs 2)
+    """
+    if "cost" in attack:
+        return len(attack["cost"])
+    match = ATTACK_COST.match(attack.get("info") or "")
+    return len(match.group(1)) if match else 0
 
 
 class CardRecognitionService:
@@ -24,74 +47,146 @@ class CardRecognitionService:
         self.image_processor = image_processor
         self.card_data_service = card_data_service
         self.ui_instance = ui_instance
-        self.debug_window = self.ui_instance.debug_window
+        self.debug_window = self.ui_instance.debug_window if self.ui_instance else None
         self.log_callback = log_callback
         self.deck_info = deck_info
         self.card_images = card_images
         self.card_images_api_cache_path = "card_images_api_cache"
+        self.hand_recognition_service = HandRecognitionService(
+            card_images, log_callback
+        )
+        self.hand_swipe_service = HandSwipeService(image_processor, log_callback)
+        self.board_recognition_service = BoardRecognitionService(
+            card_images, log_callback
+        )
+        self.swipe_scan = True
 
         # Create folder if it doesn't exist
         if not os.path.exists(self.card_images_api_cache_path):
             os.makedirs(self.card_images_api_cache_path)
 
     def check_cards(
-        self, number_of_cards, card_start_x, card_y, hand_state, debug_images=False
+        self,
+        number_of_cards,
+        card_start_x,
+        card_y,
+        hand_state,
+        debug_images=False,
+        known=None,
+        hand_frame=None,
     ):
+        """
+        Fill hand_state with the cards in hand. known maps hand positions to
+        card info that is already identified, those slots are not scanned.
+        Returns the unzoomed frame of the hand the scan started from.
+        """
         self.log_callback("Start checking hand cards...")
-        x = card_start_x
-        hand_cards = []
+        started = clock.time()
+        offset = card_offset_mapping.get(number_of_cards, 20)
         hand_state.clear()
+        slots = dict(known or {})
 
-        for i in range(number_of_cards):
+        # One frame of the hand first, long-press only the slots it missed
+        if hand_frame is None:
             self.image_processor.reset_view()
-            # Get debug window from UI instance
-            debug_window = self.ui_instance.debug_window if self.ui_instance else None
-
-            # Pass debug window to get_card method
-            zoomed_card_image = self.image_processor.get_card(
-                x,
-                card_y,
-                0.7,
-                debug_window=debug_window,
-                debug_message=f"Getting card {i+1} of {number_of_cards}",
+            hand_frame = take_screenshot()
+        if len(slots) < number_of_cards:
+            recognized = self.hand_recognition_service.identify_hand(
+                hand_frame, number_of_cards, card_start_x, card_y
+            )
+            for i, (card_id, _) in enumerate(recognized):
+                if i in slots:
+                    continue
+                selected_card = self.get_card_info(card_id) if card_id else None
+                if selected_card:
+                    slots[i] = selected_card
+            self.log_callback(
+                f"🃏 {len(slots)}/{number_of_cards} cards known from one frame"
             )
 
-            if debug_images:
-                self.save_debug_image(zoomed_card_image)
+        # Identifying card i on the worker overlaps with pressing card i + 1
+        pending = []
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            missing = [i for i in range(number_of_cards) if i not in slots]
+            if self.swipe_scan and len(missing) >= SWIPE_SCAN_MIN_CARDS:
+                self.image_processor.reset_view()
+                zoomed_cards = self.hand_swipe_service.scan(
+                    number_of_cards, card_start_x, card_y
+                )
+                swiped = [
+                    (i, executor.submit(self.identify_card, zoomed_cards[i]))
+                    for i in missing
+                    if i in zoomed_cards
+                ]
+                for i, future in swiped:
+                    card_id = future.result()
+                    selected_card = self.get_card_info(card_id) if card_id else None
+                    if selected_card:
+                        slots[i] = selected_card
 
-            card_id = self.identify_card(zoomed_card_image)
-            selected_card = None
+            for i in range(number_of_cards):
+                if i in slots:
+                    continue
 
+                self.image_processor.reset_view()
+                # Get debug window from UI instance
+                debug_window = (
+                    self.ui_instance.debug_window if self.ui_instance else None
+                )
+
+                # Pass debug window to get_card method
+                zoomed_card_image = self.image_processor.get_card(
+                    card_start_x - i * offset,
+                    card_y,
+                    timing_profile.get("long_press_duration"),
+                    debug_window=debug_window,
+                    debug_message=f"Getting card {i+1} of {number_of_cards}",
+                )
+
+                if debug_images:
+                    self.save_debug_image(zoomed_card_image)
+
+                pending.append(
+                    (
+                        i,
+                        zoomed_card_image,
+                        executor.submit(self.identify_card, zoomed_card_image),
+                    )
+                )
+
+            # Wait for every identification before the UI can add card images
+            results = [
+                (i, zoomed_card_image, future.result())
+                for i, zoomed_card_image, future in pending
+            ]
+
+        learned = False
+        for i, zoomed_card_image, card_id in results:
+            if card_id is None and learned:
+                # A card named through the UI may be a copy of this one
+                card_id = self.identify_card(zoomed_card_image)
             if card_id is None:
                 card_id, selected_card = self.handle_unknown_card(zoomed_card_image)
                 if not card_id or not selected_card:
-                    x -= card_offset_mapping.get(number_of_cards, 20)
                     continue
+                learned = True
             else:
-                # Attempt to retrieve card info from deck_info or card_data_service
-                selected_card = self.deck_info.get(card_id)
+                selected_card = self.get_card_info(card_id)
                 if not selected_card:
-                    card_data = self.card_data_service.get_card_by_id(card_id)
-                    if card_data:
-                        selected_card = self.convert_api_card_data(card_data)
-                        # Update deck_info with the new card info
-                        self.deck_info[card_id] = selected_card
-                        save_deck(self.deck_info)
-                    else:
-                        self.log_callback(
-                            f"No card data found for card ID '{card_id}'."
-                        )
-                        x -= card_offset_mapping.get(number_of_cards, 20)
-                        continue
-            cap_name = selected_card["name"].capitalize()
-            hand_cards.append(cap_name)
-            card_info_with_position = {
-                "name": cap_name,
-                "info": selected_card,
-                "position": i,
-            }
-            hand_state.append(card_info_with_position)
-            x -= card_offset_mapping.get(number_of_cards, 20)
+                    self.log_callback(f"No card data found for card ID '{card_id}'.")
+                    continue
+            slots[i] = selected_card
+
+        for i in sorted(slots):
+            hand_state.append(
+                {
+                    "name": slots[i]["name"].capitalize(),
+                    "info": slots[i],
+                    "position": i,
+                }
+            )
+        self.log_callback(f"🃏 Hand scanned in {clock.time() - started:.1f}s")
+        return hand_frame
 
     def identify_card(self, zoomed_card_image):
         highest_similarity = 0
@@ -106,7 +201,22 @@ class CardRecognitionService:
 
         return identified_card
 
+    def get_card_info(self, card_id):
+        """Card info from deck_info, falling back to card_data_service"""
+        selected_card = self.deck_info.get(card_id)
+        if not selected_card:
+            card_data = self.card_data_service.get_card_by_id(card_id)
+            if card_data:
+                selected_card = self.convert_api_card_data(card_data)
+                # Update deck_info with the new card info
+                self.deck_info[card_id] = selected_card
+                save_deck(self.deck_info)
+        return selected_card
+
     def handle_unknown_card(self, zoomed_card_image):
+        if self.ui_instance is None:
+            self.log_callback("Unknown card and no UI to identify it, skipping.")
+            return None, None
         event = threading.Event()
         self.ui_instance.request_card_name(zoomed_card_image, event)
         event.wait()
@@ -170,6 +280,8 @@ class CardRecognitionService:
         card_id = selected_card["id"]
         self.deck_info[card_id] = card_info
         self.card_images[card_id] = zoomed_card_image
+        self.hand_recognition_service.add_card(card_id, zoomed_card_image)
+        self.board_recognition_service.add_card(card_id, zoomed_card_image)
         cv2.imwrite(f"images/cards/{card_id}.png", zoomed_card_image)
         save_deck(self.deck_info)
 
@@ -178,9 +290,7 @@ class CardRecognitionService:
         level_mapping = {"Basic": 0, "Stage 1": 1, "Stage 2": 2}
         min_energies = 0
         if card_data.get("attack"):
-            min_energies = min(
-                len(attack.get("cost", [])) for attack in card_data["attack"]
-            )
+            min_energies = min(attack_cost(attack) for attack in card_data["attack"])
         return {
             "level": level_mapping.get(stage, 0),
             "energies": min_energies,
@@ -218,22 +328,16 @@ class CardRecognitionService:
         x = card_start_x - (position * offset)
 
         # Get and analyze the card image
-        zoomed_card_image = self.image_processor.get_card(x, card_y, 0.7)
+        zoomed_card_image = self.image_processor.get_card(
+            x, card_y, timing_profile.get("long_press_duration")
+        )
         card_id = self.identify_card(zoomed_card_image)
 
         if card_id is None:
             return None, None
 
-        # Get card info from deck_info or card_data_service
-        selected_card = self.deck_info.get(card_id)
+        selected_card = self.get_card_info(card_id)
         if not selected_card:
-            card_data = self.card_data_service.get_card_by_id(card_id)
-            if card_data:
-                selected_card = self.convert_api_card_data(card_data)
-                # Update deck_info with the new card info
-                self.deck_info[card_id] = selected_card
-                save_deck(self.deck_info)
-            else:
-                return None, None
+            return None, None
 
         return card_id, selected_card
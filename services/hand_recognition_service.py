@@ -0,0 +1,116 @@
+# src/services/hand_recognition_service.py
+
+import os
+import threading
+
+import cv2
+
+from utils.constants import HAND_CARD_SIZE, card_offset_mapping
+
+# Margin (px) a visible strip may be off from where the slot math puts it
+SLOT_SEARCH_MARGIN = 8
+# A slot is trusted only when the best thumbnail is above MIN_CONFIDENCE and
+# beats the runner-up by MIN_MARGIN, otherwise the caller long-presses it
+MIN_CONFIDENCE = 0.75
+MIN_MARGIN = 0.05
+
+
+class HandRecognitionService:
+    """
+    Identifies every hand card from one frame of the normal hand fan.
+
+    Thumbnails are harvested from the zoomed images in images/cards by
+    scaling them down to the size of a card in the hand. Neighbouring cards
+    overlap, so only a strip of width offset at one edge of each card is
+    visible; both edge strips of every thumbnail are searched for at the
+    matching edge of the card's rectangle. Slots without a confident match
+    come back as None and are left to the long-press path.
+    """
+
+    def __init__(self, card_images, log_callback):
+        self.log_callback = log_callback
+        self.thumbnails = {}
+        self._strips = {}
+        self._lock = threading.Lock()
+        for card_file_name, image in card_images.items():
+            self.add_card(os.path.splitext(card_file_name)[0], image)
+
+    def add_card(self, card_id, zoomed_card_image):
+        """Harvest the thumbnail of a newly saved zoomed card image"""
+        if zoomed_card_image is None or zoomed_card_image.size == 0:
+            return
+        thumbnail = cv2.cvtColor(
+            cv2.resize(zoomed_card_image, HAND_CARD_SIZE, interpolation=cv2.INTER_AREA),
+            cv2.COLOR_BGR2GRAY,
+        )
+        with self._lock:
+            self.thumbnails[card_id] = thumbnail
+            self._strips.clear()
+
+    def slot_regions(self, number_of_cards, card_start_x, card_y):
+        """(x, y, w, h) of the rectangle of each hand card"""
+        offset = card_offset_mapping.get(number_of_cards, 20)
+        card_w, card_h = HAND_CARD_SIZE
+        top = card_y - card_h // 2
+        return [
+            (card_start_x - i * offset - card_w // 2, top, card_w, card_h)
+            for i in range(number_of_cards)
+        ]
+
+    def _strip_templates(self, strip_w):
+        """Left and right edge strips of every thumbnail"""
+        with self._lock:
+            strips = self._strips.get(strip_w)
+            if strips is None:
+                strips = {
+                    card_id: (thumbnail[:, :strip_w], thumbnail[:, -strip_w:])
+                    for card_id, thumbnail in self.thumbnails.items()
+                }
+                self._strips[strip_w] = strips
+            return strips
+
+    def _window(self, gray_screenshot, x, y, w, h):
+        m = SLOT_SEARCH_MARGIN
+        screen_h, screen_w = gray_screenshot.shape[:2]
+        return gray_screenshot[
+            max(y - m, 0) : min(y + h + m, screen_h),
+            max(x - m, 0) : min(x + w + m, screen_w),
+        ]
+
+    def identify_slot(self, gray_screenshot, region, strip_w):
+        """Returns (card_id, score) of the best thumbnail, card_id None if unsure"""
+        x, y, w, h = region
+        # Each edge strip is only searched for next to its own edge, so the
+        # visible strip of a neighbour offset px away is never matched
+        windows = (
+            self._window(gray_screenshot, x, y, strip_w, h),
+            self._window(gray_screenshot, x + w - strip_w, y, strip_w, h),
+        )
+        scores = []
+        for card_id, edges in self._strip_templates(strip_w).items():
+            score = -1.0
+            for window, strip in zip(windows, edges):
+                if window.shape[0] < strip.shape[0] or window.shape[1] < strip.shape[1]:
+                    continue
+                result = cv2.matchTemplate(window, strip, cv2.TM_CCOEFF_NORMED)
+                score = max(score, float(result.max()))
+            scores.append((score, card_id))
+        if not scores:
+            return None, 0.0
+        scores.sort(reverse=True)
+        best_score, best_id = scores[0]
+        runner_up = scores[1][0] if len(scores) > 1 else -1.0
+        if best_score < MIN_CONFIDENCE or best_score - runner_up < MIN_MARGIN:
+            return None, best_score
+        return best_id, best_score
+
+    def identify_hand(self, screenshot, number_of_cards, card_start_x, card_y):
+        """List with a (card_id, score) per hand position"""
+        if screenshot is None or not number_of_cards:
+            return []
+        gray = cv2.cvtColor(screenshot, cv2.COLOR_BGR2GRAY)
+        strip_w = min(card_offset_mapping.get(number_of_cards, 20), HAND_CARD_SIZE[0])
+        return [
+            self.identify_slot(gray, region, strip_w)
+            for region in self.slot_regions(number_of_cards, card_start_x, card_y)
+        ]
@@ -0,0 +1,142 @@
+# src/services/hand_swipe_service.py
+
+import threading
+
+import cv2
+
+from utils.adb_utils import hold_and_slide, take_screenshot_raw
+from utils.clock import clock
+from utils.constants import ZOOM_CARD_REGION, card_offset_mapping
+from utils.timing_profile import timing_profile
+
+# Downscaled size of the zoom region used by the change detector
+COMPARE_SIZE = (74, 102)
+# Below this the zoom region no longer looks like the unpressed screen
+ZOOMED_SIMILARITY = 0.8
+# Consecutive zoomed frames above this show the same card
+SAME_CARD_SIMILARITY = 0.9
+# The touch rests on each card for at least this many captures, so a card
+# still shows in two frames when the first one caught the zoom animating
+FRAMES_PER_CARD = 3
+
+
+class HandSwipeService:
+    """
+    Zooms every hand card with one touch that slides across the hand fan.
+
+    The touch is held on the first card and then rests on each of the others
+    (hold_and_slide) while frames are captured back to back. A change
+    detector on ZOOM_CARD_REGION splits the burst into runs of frames that
+    show the same zoomed card; run i is card i. The touch rests long enough
+    for FRAMES_PER_CARD captures at the measured screencap latency, so lone
+    frames are the zoom between two cards. A run lasting several dwell
+    periods means identical neighbours and is split accordingly. When the
+    runs cannot be matched to the hand, nothing is returned and the caller
+    falls back to long-presses.
+    """
+
+    def __init__(self, image_processor, log_callback, frame_source=None):
+        self.image_processor = image_processor
+        self.log_callback = log_callback
+        self.frame_source = frame_source or take_screenshot_raw
+
+    def _zoom(self, frame):
+        x, y, w, h = ZOOM_CARD_REGION
+        return frame[y : y + h, x : x + w]
+
+    def _small(self, zoomed):
+        return cv2.resize(
+            cv2.cvtColor(zoomed, cv2.COLOR_BGR2GRAY),
+            COMPARE_SIZE,
+            interpolation=cv2.INTER_AREA,
+        )
+
+    def _similarity(self, img1, img2):
+        return self.image_processor.similarity_engine.score(img1, img2, cache=False)
+
+    def capture_burst(self, points, hold, dwell):
+        """Run the gesture, return [(timestamp, frame)] captured during it"""
+        gesture = threading.Thread(target=hold_and_slide, args=(points, hold, dwell))
+        frames = []
+        gesture.start()
+        while gesture.is_alive():
+            frame = self.frame_source()
+            if frame is not None:
+                frames.append((clock.time(), frame))
+        gesture.join()
+        return frames
+
+    def segment(self, frames, baseline, dwell, frame_interval):
+        """Group zoomed frames into [first_t, last_t, [zoomed, ...]] runs"""
+        runs = []
+        previous = None
+        for timestamp, frame in frames:
+            zoomed = self._zoom(frame)
+            small = self._small(zoomed)
+            if self._similarity(small, baseline) > ZOOMED_SIMILARITY:
+                previous = None  # Not zoomed (yet), or between two cards
+                continue
+            if (
+                previous is not None
+                and self._similarity(small, previous) > SAME_CARD_SIMILARITY
+            ):
+                runs[-1][1] = timestamp
+                runs[-1][2].append(zoomed)
+            else:
+                runs.append([timestamp, timestamp, [zoomed]])
+            previous = small
+        # A lone frame is the zoom animating between two cards, unless frames
+        # are so sparse that a card only gets one
+        sparse = frame_interval * 2 > dwell
+        return [run for run in runs if len(run[2]) > 1 or len(runs) == 1 or sparse]
+
+    def assign(self, runs, number_of_cards, frame_interval, dwell):
+        """Map runs to hand positions, {} when they do not add up"""
+        if len(runs) == number_of_cards:
+            counts = [1] * len(runs)
+        else:
+            counts = [
+                max(1, round((last_t - first_t + frame_interval) / dwell))
+                for first_t, last_t, _ in runs
+            ]
+            if sum(counts) != number_of_cards:
+                return {}
+        cards = {}
+        position = 0
+        for (_, _, zoomed_frames), count in zip(runs, counts):
+            # The middle frame is the one furthest from both transitions
+            zoomed = zoomed_frames[len(zoomed_frames) // 2]
+            for _ in range(count):
+                cards[position] = zoomed
+                position += 1
+        return cards
+
+    def scan(self, number_of_cards, card_start_x, card_y):
+        """{hand position: zoomed card image} for the whole hand, or {}"""
+        if not number_of_cards:
+            return {}
+        baseline_frame = self.frame_source()
+        if baseline_frame is None:
+            return {}
+        baseline = self._small(self._zoom(baseline_frame))
+
+        offset = card_offset_mapping.get(number_of_cards, 20)
+        points = [(card_start_x - i * offset, card_y) for i in range(number_of_cards)]
+        dwell = max(
+            timing_profile.get("swipe_scan_dwell"),
+            FRAMES_PER_CARD * timing_profile.get("screencap_latency"),
+        )
+        hold = timing_profile.get("long_press_capture_delay") + dwell
+
+        started = clock.time()
+        frames = self.capture_burst(points, hold, dwell)
+        if len(frames) < 2:
+            return {}
+        frame_interval = (frames[-1][0] - frames[0][0]) / (len(frames) - 1)
+        runs = self.segment(frames, baseline, dwell, frame_interval)
+        cards = self.assign(runs, number_of_cards, frame_interval, dwell)
+        self.log_callback(
+            f"👆 Swipe scan: {len(frames)} frames, {len(runs)} cards seen, "
+            f"{len(cards)}/{number_of_cards} assigned in {clock.time() - started:.1f}s"
+        )
+        return cards
@@ -0,0 +1,103 @@
+# src/services/hand_tracking_service.py
+
+import cv2
+import numpy as np
+
+from utils.constants import HAND_CARD_SIZE, card_offset_mapping
+
+# Width (px) of the edge strip hashed per card, below the smallest offset so
+# the visible edge of a card never includes its neighbour
+EDGE_STRIP_WIDTH = 40
+# Max differing bits (out of 64) for two strips to show the same card
+MAX_HASH_DISTANCE = 6
+
+
+def dhash(gray_image):
+    """64-bit difference hash of a grayscale image"""
+    small = cv2.resize(gray_image, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+def hash_distance(hash1, hash2):
+    return bin(hash1 ^ hash2).count("1")
+
+
+class HandTrackingService:
+    """
+    Keeps track of which card sits in each hand slot during a turn.
+
+    Every slot gets a visual hash of both edge strips of its card; one of
+    them is the visible edge, which looks the same wherever the card moves
+    in the fan, the other one depends on the neighbours. After an action
+    the new frame of the hand is hashed again and each slot is matched
+    against the cards remembered from the last scan, so only the slots that
+    match nothing (drawn cards) are identified again. forget() drops
+    everything, e.g. when a new turn starts.
+    """
+
+    def __init__(self, log_callback):
+        self.log_callback = log_callback
+        self.remembered = []  # [((left_hash, right_hash), card_info)]
+
+    def slot_hashes(self, screenshot, number_of_cards, card_start_x, card_y):
+        """[(left_hash, right_hash)] per hand position"""
+        gray = cv2.cvtColor(screenshot, cv2.COLOR_BGR2GRAY)
+        offset = card_offset_mapping.get(number_of_cards, 20)
+        card_w, card_h = HAND_CARD_SIZE
+        top = card_y - card_h // 2
+        hashes = []
+        for i in range(number_of_cards):
+            left = card_start_x - i * offset - card_w // 2
+            right = left + card_w
+            hashes.append(
+                (
+                    dhash(gray[top : top + card_h, left : left + EDGE_STRIP_WIDTH]),
+                    dhash(gray[top : top + card_h, right - EDGE_STRIP_WIDTH : right]),
+                )
+            )
+        return hashes
+
+    def remember(self, screenshot, hand_state, number_of_cards, card_start_x, card_y):
+        """Store the hashes of the identified cards of a fresh scan"""
+        if screenshot is None or not number_of_cards:
+            self.remembered = []
+            return
+        hashes = self.slot_hashes(screenshot, number_of_cards, card_start_x, card_y)
+        self.remembered = [
+            (hashes[card["position"]], card["info"])
+            for card in hand_state
+            if card["position"] < number_of_cards
+        ]
+
+    def _match_side(self, hashes, side):
+        available = list(self.remembered)
+        known = {}
+        for position, slot_hashes in enumerate(hashes):
+            best = None
+            for idx, (remembered_hashes, _) in enumerate(available):
+                distance = hash_distance(slot_hashes[side], remembered_hashes[side])
+                if distance <= MAX_HASH_DISTANCE and (
+                    best is None or distance < best[0]
+                ):
+                    best = (distance, idx)
+            if best is not None:
+                # Each remembered card can only be matched once
+                known[position] = available.pop(best[1])[1]
+        return known
+
+    def match(self, screenshot, number_of_cards, card_start_x, card_y):
+        """{position: card_info} of the slots showing a remembered card"""
+        if screenshot is None or not number_of_cards or not self.remembered:
+            return {}
+        hashes = self.slot_hashes(screenshot, number_of_cards, card_start_x, card_y)
+        # The covered edge shows whatever neighbour the card has now, so only
+        # the visible side keeps matching; trust the side that matches more
+        known = max((self._match_side(hashes, side) for side in (0, 1)), key=len)
+        self.log_callback(
+            f"🔁 {len(known)}/{number_of_cards} hand cards unchanged since last scan"
+        )
+        return known
+
+    def forget(self):
+        self.remembered = []
@@ -0,0 +1,80 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from services.hand_swipe_service import FRAMES_PER_CARD, HandSwipeService
+from utils.constants import ZOOM_CARD_REGION
+from utils.similarity import SimilarityEngine
+
+SCREENCAP_LATENCY = 0.5  # The default, one raw frame every half second
+SCREEN_SHAPE = (1600, 900, 3)
+
+
+def make_service():
+    image_processor = SimpleNamespace(similarity_engine=SimilarityEngine())
+    return HandSwipeService(image_processor, lambda message: None)
+
+
+def card(seed):
+    """Zoomed card of random blocks, unlike any other seed"""
+    rng = np.random.default_rng(seed)
+    _, _, w, h = ZOOM_CARD_REGION
+    blocks = rng.integers(0, 256, (h // 20 + 1, w // 20 + 1, 3), dtype=np.uint8)
+    return np.kron(blocks, np.ones((20, 20, 1), np.uint8))[:h, :w]
+
+
+def frame(zoomed=None):
+    screen = np.full(SCREEN_SHAPE, 90, np.uint8)
+    if zoomed is not None:
+        x, y, w, h = ZOOM_CARD_REGION
+        screen[y : y + h, x : x + w] = zoomed
+    return screen
+
+
+def burst(cards, frames_per_card):
+    """Frames at the screencap latency: the zoom animating, then the card"""
+    frames = []
+    previous = card(100)
+    for zoomed in cards:
+        # Sliding onto an identical card does not animate anything
+        animating = zoomed if zoomed is previous else previous // 2 + zoomed // 2
+        frames.append((len(frames) * SCREENCAP_LATENCY, frame(animating)))
+        for _ in range(frames_per_card - 1):
+            frames.append((len(frames) * SCREENCAP_LATENCY, frame(zoomed)))
+        previous = zoomed
+    return frames
+
+
+def scan(cards, frames_per_card, dwell):
+    service = make_service()
+    baseline = service._small(service._zoom(frame()))
+    frames = burst(cards, frames_per_card)
+    runs = service.segment(frames, baseline, dwell, SCREENCAP_LATENCY)
+    return service.assign(runs, len(cards), SCREENCAP_LATENCY, dwell)
+
+
+def test_every_card_assigned_at_the_derived_dwell():
+    cards = [card(seed) for seed in range(4)]
+    found = scan(cards, FRAMES_PER_CARD, FRAMES_PER_CARD * SCREENCAP_LATENCY)
+    assert sorted(found) == [0, 1, 2, 3]
+    for position, zoomed in found.items():
+        assert np.array_equal(zoomed, cards[position])
+
+
+def test_identical_neighbours_split_by_duration():
+    same = card(1)
+    cards = [card(0), same, same, card(2)]
+    found = scan(cards, FRAMES_PER_CARD, FRAMES_PER_CARD * SCREENCAP_LATENCY)
+    assert sorted(found) == [0, 1, 2, 3]
+    assert np.array_equal(found[1], cards[1])
+    assert np.array_equal(found[2], cards[2])
+
+
+def test_lone_frames_kept_when_sparse():
+    # A dwell shorter than two captures: each card is seen once, if at all
+    service = make_service()
+    baseline = service._small(service._zoom(frame()))
+    cards = [card(seed) for seed in range(3)]
+    frames = [(i * SCREENCAP_LATENCY, frame(zoomed)) for i, zoomed in enumerate(cards)]
+    runs = service.segment(frames, baseline, 0.4, SCREENCAP_LATENCY)
+    assert len(service.assign(runs, 3, SCREENCAP_LATENCY, 0.4)) == 3
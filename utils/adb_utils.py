@@ -2,12 +2,60 @@
 
 import os
 import subprocess
-import time
 from threading import Thread
 
 import cv2
+import numpy as np
 
+from utils.clock import clock
+from utils.flight_recorder import flight_recorder
+from utils.session_recorder import session_recorder
+from utils.timing_profile import timing_profile
+from utils.tracing import traced
 
+# Last frame captured through this module and when, shown in the debug
+# window for actions whose caller had no frame at hand
+_latest_frame = (None, None)
+
+
+def record_frame(frame):
+    """Keep a captured frame as the latest, hand it to the recorders"""
+    global _latest_frame
+    if frame is not None:
+        _latest_frame = (frame, clock.time())
+    flight_recorder.record_frame(frame)
+    session_recorder.record_frame(frame)
+
+
+def record_action(kind, coords, description=None):
+    flight_recorder.record_action(kind, coords, description)
+    session_recorder.record_action(kind, coords, description)
+
+
+def latest_frame():
+    """(frame, age in seconds) of the last capture, (None, None) before any"""
+    frame, captured_at = _latest_frame
+    if frame is None:
+        return None, None
+    return frame, clock.time() - captured_at
+
+
+def debug_frame(screenshot=None):
+    """
+    (frame, annotation) to log an action with in the debug window.
+
+    Never captures: without a frame from the caller the latest capture is
+    used, and its age is appended so a stale frame is recognizable.
+    """
+    if screenshot is not None and screenshot is not _latest_frame[0]:
+        return screenshot, ""
+    frame, age = latest_frame()
+    if frame is None:
+        return None, " [no frame yet]"
+    return frame, f" [frame {age:.1f}s old]"
+
+
+@traced("adb.get_input_device")
 def get_input_device():
     try:
         # First check if we can access the devices list
@@ -39,10 +87,12 @@ def get_input_device():
         return "/dev/input/event2"  # Default to event2 based on your device list
 
 
+@traced("adb.connect")
 def connect_to_emulator(emulator_name):
     subprocess.run(["adb", "connect", emulator_name])
 
 
+@traced("adb.screenshot")
 def take_screenshot(screenshot_object_receiver=None):
     screenshot_path = os.path.join("images", "screenshot.png")
     try:
@@ -53,6 +103,7 @@ def take_screenshot(screenshot_object_receiver=None):
             ["adb", "pull", "/sdcard/screenshot.png", screenshot_path], timeout=5
         )
         screenshot = cv2.imread(screenshot_path)
+        record_frame(screenshot)
         if screenshot_object_receiver:
             screenshot_object_receiver.last_screenshot = screenshot
         return screenshot
@@ -64,31 +115,77 @@ def take_screenshot(screenshot_object_receiver=None):
         return None
 
 
+def decode_raw_screencap(data):
+    """Decode the output of `screencap` without -p into a BGR image"""
+    if len(data) < 12:
+        return None
+    width = int.from_bytes(data[0:4], "little")
+    height = int.from_bytes(data[4:8], "little")
+    # Header is 12 bytes, or 16 on Android 9+ (adds the color space)
+    header_size = len(data) - width * height * 4
+    if header_size not in (12, 16):
+        return None
+    rgba = np.frombuffer(data, np.uint8, offset=header_size).reshape(height, width, 4)
+    return cv2.cvtColor(rgba, cv2.COLOR_RGBA2BGR)
+
+
+@traced("adb.screenshot_raw")
+def take_screenshot_raw():
+    """
+    Capture the screen through `adb exec-out screencap` without PNG encoding.
+
+    Nothing is written to the device or to images/screenshot.png, so it is
+    cheaper than take_screenshot and safe to call from a background thread.
+    """
+    try:
+        result = subprocess.run(
+            ["adb", "exec-out", "screencap"], capture_output=True, timeout=5
+        )
+        if result.returncode != 0:
+            return None
+        screenshot = decode_raw_screencap(result.stdout)
+        record_frame(screenshot)
+        return screenshot
+    except subprocess.TimeoutExpired:
+        print("ADB command timed out. Emulator may be unresponsive.")
+        return None
+    except Exception as e:
+        print(f"Error taking raw screenshot: {e}")
+        return None
+
+
+@traced("adb.tap")
 def click_position(x, y, debug_window=None, screenshot=None):
     if debug_window and debug_window.window is not None and debug_window.is_open:
-        if screenshot is None:
-            screenshot = take_screenshot()
+        screenshot, age = debug_frame(screenshot)
         action_coords = {"type": "click", "coords": (x, y)}
-        debug_window.log_action(f"Click at ({x}, {y})", screenshot, action_coords)
+        debug_window.log_action(f"Click at ({x}, {y}){age}", screenshot, action_coords)
+    record_action("tap", [x, y])
     subprocess.run(["adb", "shell", "input", "tap", str(x), str(y)])
 
 
+@traced("match.find_subimage")
 def find_subimage(screenshot, subimage):
     result = cv2.matchTemplate(screenshot, subimage, cv2.TM_CCOEFF_NORMED)
     _, max_val, _, max_loc = cv2.minMaxLoc(result)
     return max_loc, max_val
 
 
+@traced("adb.long_press")
 def long_press_position(x, y, duration=1.0, debug_window=None, debug_message=None):
     screenshot = None
+    capture_delay = timing_profile.get("long_press_capture_delay")
+    # The press must outlast the capture or the zoom is gone when it lands
+    duration = max(duration, capture_delay + timing_profile.get("screencap_latency"))
 
     def capture_screenshot_during_press():
         nonlocal screenshot
-        time.sleep(0.5)
+        clock.sleep(capture_delay)
         screenshot = take_screenshot()
 
     screenshot_thread = Thread(target=capture_screenshot_during_press)
     screenshot_thread.start()
+    record_action("long_press", [x, y], debug_message)
 
     # Execute the long press
     subprocess.run(
@@ -117,20 +214,25 @@ def long_press_position(x, y, duration=1.0, debug_window=None, debug_message=Non
     return screenshot
 
 
-def drag_position(start_pos, end_pos, duration=0.5, debug_window=None, screenshot=None):
+@traced("adb.drag")
+def drag_position(
+    start_pos, end_pos, duration=None, debug_window=None, screenshot=None
+):
+    if duration is None:
+        duration = timing_profile.get("drag_duration")
     start_x, start_y = start_pos
     end_x, end_y = end_pos
     if debug_window and debug_window.window is not None and debug_window.is_open:
-        if screenshot is None:
-            screenshot = take_screenshot()
+        screenshot, age = debug_frame(screenshot)
         action_coords = {"type": "drag", "coords": (start_x, start_y, end_x, end_y)}
         debug_window.log_action(
-            f"Drag from ({start_x}, {start_y}) to ({end_x}, {end_y})",
+            f"Drag from ({start_x}, {start_y}) to ({end_x}, {end_y}){age}",
             screenshot,
             action_coords,
         )
 
     duration_ms = int(duration * 1000)
+    record_action("drag", [start_x, start_y, end_x, end_y])
 
     subprocess.run(
         [
@@ -147,12 +249,14 @@ def drag_position(start_pos, end_pos, duration=0.5, debug_window=None, screensho
     )
 
 
+@traced("adb.send_event")
 def send_event(device, type, code, value):
     subprocess.run(
         ["adb", "shell", "sendevent", device, str(type), str(code), str(value)]
     )
 
 
+@traced("adb.drag_points")
 def drag_points(points, duration=1.0, device=None):
     """
     Perform a drag operation through multiple points.
@@ -170,6 +274,7 @@ def drag_points(points, duration=1.0, device=None):
 
     # Delay between points
     delay = duration / (len(points) - 1)
+    record_action("drag_points", [list(point) for point in points])
 
     # Start the touch
     send_event(device, 3, 57, 0)  # EV_ABS, ABS_MT_TRACKING_ID, 0
@@ -179,7 +284,7 @@ def drag_points(points, duration=1.0, device=None):
     send_event(device, 0, 0, 0)  # EV_SYN, SYN_REPORT, 0
     print(f"Start at ({x}, {y})")  # Debug log
 
-    time.sleep(delay)
+    clock.sleep(delay)
 
     # Move through intermediate points
     for i, (x, y) in enumerate(points[1:], start=1):
@@ -187,7 +292,7 @@ def drag_points(points, duration=1.0, device=None):
         send_event(device, 3, 54, y)  # EV_ABS, ABS_MT_POSITION_Y, y
         send_event(device, 0, 0, 0)  # EV_SYN, SYN_REPORT, 0
         print(f"Move to ({x}, {y}), point {i}")  # Debug log
-        time.sleep(delay)
+        clock.sleep(delay)
 
     # End the touch
     send_event(device, 3, 57, -1)  # EV_ABS, ABS_MT_TRACKING_ID, -1
@@ -195,10 +300,41 @@ def drag_points(points, duration=1.0, device=None):
     print("End touch")  # Debug log
 
 
-def drag_first_y(start_pos, end_pos, duration=0.5, debug_window=None, screenshot=None):
+@traced("adb.hold_and_slide")
+def hold_and_slide(points, hold=0.5, dwell=0.4, device=None):
+    """
+    Press points[0], hold, then slide the same touch through the other points,
+    resting `dwell` seconds on each, and release.
+
+    Unlike drag_points the whole gesture is sent as a single `adb shell`
+    script, so the adb round trips do not add up between points.
+    """
+    if device is None:
+        device = get_input_device()
+
+    def move(x, y):
+        return (
+            f"sendevent {device} 3 53 {x};"  # EV_ABS, ABS_MT_POSITION_X
+            f"sendevent {device} 3 54 {y};"  # EV_ABS, ABS_MT_POSITION_Y
+            f"sendevent {device} 0 0 0;"  # EV_SYN, SYN_REPORT
+        )
+
+    x, y = points[0]
+    script = f"sendevent {device} 3 57 0;" + move(x, y) + f"sleep {hold:.3f};"
+    for x, y in points[1:]:
+        script += move(x, y) + f"sleep {dwell:.3f};"
+    script += f"sendevent {device} 3 57 -1;sendevent {device} 0 0 0"
+    record_action("hold_and_slide", [list(point) for point in points])
+    subprocess.run(["adb", "shell", script])
+
+
+@traced("adb.drag_first_y")
+def drag_first_y(start_pos, end_pos, duration=None, debug_window=None, screenshot=None):
     """
     Performs a drag operation through three sequential touch points.
     """
+    if duration is None:
+        duration = timing_profile.get("drag_duration")
     x1, y1 = start_pos
     x3, y3 = end_pos
     # Second point keeps x1 but uses y3 (vertical movement first)
@@ -207,11 +343,10 @@ def drag_first_y(start_pos, end_pos, duration=0.5, debug_window=None, screenshot
     points = [(x1, y1), (x2, y2), (x3, y3)]
     # Log the action if debug window is available
     if debug_window and debug_window.window is not None and debug_window.is_open:
-        if screenshot is None:
-            screenshot = take_screenshot()
+        screenshot, age = debug_frame(screenshot)
         action_coords = {"type": "drag_first_y", "coords": points}
         points_str = " -> ".join([f"({x}, {y})" for x, y in points])
         debug_window.log_action(
-            f"Drag through points: {points_str}", screenshot, action_coords
+            f"Drag through points: {points_str}{age}", screenshot, action_coords
         )
     drag_points(points, duration)
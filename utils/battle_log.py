@@ -1,8 +1,7 @@
-import time
-
 import cv2
 
 from utils.adb_utils import click_position, take_screenshot
+from utils.clock import clock
 from utils.image_utils import ImageProcessor
 
 BATTLE_LOG_TEXT_REGION = (225, 1153, 441, 58)
@@ -18,7 +17,6 @@ class BattleLog:
         self.debug_window = debug_window
         self.image_processor = ImageProcessor(log_callback, debug_window)
         self.card_recognition_service = card_recognition_service
-        self.last_screenshot = None
 
         # Load template images
         self.bl_discarded = cv2.imread("images/bl_discarded.PNG")
@@ -32,7 +30,7 @@ class BattleLog:
         """
         # Click the card position in battle log
         click_position(BATTLE_LOG_CARD_POSITION[0], BATTLE_LOG_CARD_POSITION[1])
-        time.sleep(0.3)  # Wait for zoom animation
+        clock.sleep(0.3)  # Wait for zoom animation
 
         # Capture the zoomed card region
         screenshot = take_screenshot()
@@ -93,7 +91,7 @@ class BattleLog:
         ]
 
         bench_similarity = self.image_processor.calculate_similarity(
-            battle_log_region, self.bl_put_on_bench
+            battle_log_region, self.bl_put_on_bench, cache=True
         )
         if bench_similarity > 0.8:
             self.log_callback(
@@ -102,7 +100,7 @@ class BattleLog:
             return "bench"
 
         discard_similarity = self.image_processor.calculate_similarity(
-            battle_log_region, self.bl_discarded
+            battle_log_region, self.bl_discarded, cache=True
         )
         if discard_similarity > 0.8:
             self.log_callback(
@@ -111,7 +109,7 @@ class BattleLog:
             return "discarded"
 
         active_similarity = self.image_processor.calculate_similarity(
-            battle_log_region, self.bl_put_on_active
+            battle_log_region, self.bl_put_on_active, cache=True
         )
         if active_similarity > 0.8:
             self.log_callback(
@@ -127,16 +125,14 @@ class BattleLog:
             BATTLE_LOG_BUTTON_POSITION[0],
             BATTLE_LOG_BUTTON_POSITION[1],
             debug_window=self.debug_window,
-            screenshot=self.last_screenshot,
         )
-        time.sleep(0.2)
+        clock.sleep(0.2)
         click_position(
             BATTLE_LOG_BUTTON_POSITION[0],
             BATTLE_LOG_BUTTON_POSITION[1],
             debug_window=self.debug_window,
-            screenshot=self.last_screenshot,
         )
-        time.sleep(0.4)  # Wait for animation
+        clock.sleep(0.4)  # Wait for animation
 
     def close_battle_log(self):
         """Closes the battle log by clicking twice on the close button"""
@@ -144,13 +140,11 @@ class BattleLog:
             BATTLE_LOG_CLOSE_POSITION[0],
             BATTLE_LOG_CLOSE_POSITION[1],
             debug_window=self.debug_window,
-            screenshot=self.last_screenshot,
         )
-        time.sleep(0.2)
+        clock.sleep(0.2)
         click_position(
             BATTLE_LOG_CLOSE_POSITION[0],
             BATTLE_LOG_CLOSE_POSITION[1],
             debug_window=self.debug_window,
-            screenshot=self.last_screenshot,
         )
-        time.sleep(0.3)  # Wait for animation
+        clock.sleep(0.3)  # Wait for animation
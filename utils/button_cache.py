@@ -0,0 +1,88 @@
+import json
+import os
+import threading
+
+BUTTON_LOCATIONS_FILE = "button_locations.json"
+# Matches at the same spot before taps there are made without matching first
+TRUSTED_HITS = 3
+# Max distance (px) between two matches of the same button at the same spot
+SAME_SPOT_DISTANCE = 4
+
+
+class ButtonLocationCache:
+    """
+    Per-device positions where each template was matched on screen.
+
+    Every confirmed match of a named template is recorded; matches at the
+    same spot add up, a match elsewhere starts over at the new spot. Once a
+    button was seen TRUSTED_HITS times at the same spot, trusted() returns
+    that position and callers may compare that spot alone before searching
+    (see ImageProcessor.find_template). Locations of every device live in
+    button_locations.json, keyed by the ADB serial.
+    """
+
+    def __init__(self, device_id=None, path=BUTTON_LOCATIONS_FILE):
+        self.path = path
+        self.device_id = None
+        self.locations = {}
+        self._lock = threading.Lock()
+        if device_id:
+            self.load(device_id)
+
+    def position(self, name):
+        """Last confirmed position of name, trusted or not"""
+        with self._lock:
+            entry = self.locations.get(name)
+        return tuple(entry["position"]) if entry else None
+
+    def trusted(self, name):
+        with self._lock:
+            entry = self.locations.get(name)
+        if entry is None or entry["hits"] < TRUSTED_HITS:
+            return None
+        return tuple(entry["position"])
+
+    def confirm(self, name, position):
+        x, y = position
+        with self._lock:
+            entry = self.locations.get(name)
+            if (
+                entry is not None
+                and abs(entry["position"][0] - x) <= SAME_SPOT_DISTANCE
+                and abs(entry["position"][1] - y) <= SAME_SPOT_DISTANCE
+            ):
+                entry["hits"] += 1
+            else:
+                self.locations[name] = {"position": [int(x), int(y)], "hits": 1}
+
+    def load(self, device_id):
+        self.device_id = device_id
+        locations = self._read_all()
+        with self._lock:
+            self.locations = locations.get(device_id, {})
+
+    def save(self):
+        if not self.device_id:
+            return
+        locations = self._read_all()
+        with self._lock:
+            locations[self.device_id] = dict(self.locations)
+        try:
+            with open(self.path, "w") as f:
+                json.dump(locations, f, indent=4)
+        except OSError as e:
+            print(f"Error saving button locations: {e}")
+
+    def _read_all(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error loading button locations: {e}")
+            return {}
+
+
+# Shared by every component, loaded for the connected device
+button_cache = ButtonLocationCache()
@@ -0,0 +1,176 @@
+import contextlib
+import threading
+import time
+
+# How often (real seconds) the next sleeper checks whether the simulated
+# clock may move while another thread is busy
+SIMULATED_GRACE = 0.01
+# Step (simulated seconds) of SimulatedClock.wait while the event is unset
+SIMULATED_WAIT_STEP = 0.05
+# How often clock.wait checks the stop event of a cancellable thread while it
+# waits for another event
+CANCEL_POLL = 0.05
+
+
+class Cancelled(BaseException):
+    """
+    Raised by clock.sleep and clock.wait once the thread's stop event is set.
+
+    A BaseException like asyncio.CancelledError, so the `except Exception`
+    handlers along the way let it through to whoever made the thread
+    cancellable.
+    """
+
+
+class SystemClock:
+    """Wall clock, what the bot uses against a real device"""
+
+    def time(self):
+        return time.time()
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def wait(self, event, timeout=None):
+        return event.wait(timeout)
+
+
+class SimulatedClock:
+    """
+    Clock that jumps to the next deadline instead of sleeping.
+
+    Every thread that sleeps registers its deadline; once every other thread
+    that used the clock is asleep too, time jumps to the earliest deadline
+    and that sleeper wakes up. While a thread is busy outside the clock
+    (matching, or joining another thread) time runs at wall-clock speed, so
+    work still costs what it really takes and a background capture lands
+    after the press the main thread sent.
+    """
+
+    def __init__(self, start=0.0, grace=SIMULATED_GRACE):
+        self.now = start
+        self.grace = grace
+        self._sleepers = {}
+        self._threads = {}
+        self._moved_at = time.monotonic()
+        self._condition = threading.Condition()
+
+    def time(self):
+        with self._condition:
+            self._register()
+            return self.now
+
+    def sleep(self, seconds):
+        ident = threading.get_ident()
+        with self._condition:
+            self._register()
+            deadline = self.now + max(seconds, 0)
+            self._sleepers[ident] = deadline
+            try:
+                while self.now < deadline:
+                    if self._is_next(deadline) and self._others_asleep(ident):
+                        self._move_to(deadline)
+                        continue
+                    notified = self._condition.wait(self.grace)
+                    if not notified and self._is_next(deadline):
+                        # Someone is busy, follow the wall clock meanwhile
+                        elapsed = time.monotonic() - self._moved_at
+                        self._move_to(min(deadline, self.now + elapsed))
+            finally:
+                del self._sleepers[ident]
+                self._condition.notify_all()
+
+    def wait(self, event, timeout=None):
+        """event.wait(timeout), with the timeout in simulated seconds"""
+        deadline = None if timeout is None else self.time() + timeout
+        while not event.is_set():
+            if deadline is not None:
+                remaining = deadline - self.time()
+                if remaining <= 0:
+                    return False
+                self.sleep(min(SIMULATED_WAIT_STEP, remaining))
+            else:
+                self.sleep(SIMULATED_WAIT_STEP)
+        return True
+
+    def _move_to(self, now):
+        self.now = max(self.now, now)
+        self._moved_at = time.monotonic()
+
+    def _register(self):
+        thread = threading.current_thread()
+        self._threads[thread.ident] = thread
+
+    def _is_next(self, deadline):
+        return deadline <= min(self._sleepers.values())
+
+    def _others_asleep(self, ident):
+        for other, thread in list(self._threads.items()):
+            if not thread.is_alive():
+                del self._threads[other]
+            elif other != ident and other not in self._sleepers:
+                return False
+        return True
+
+
+class Clock:
+    """
+    Time source of the bot, every sleep and timestamp goes through it.
+
+    It is the wall clock unless use() swaps in another source, such as a
+    SimulatedClock so a replayed match runs as fast as the CPU allows.
+    Inside cancellable(stop_event), sleeps and waits of the current thread
+    end as soon as stop_event is set and raise Cancelled, so setting it stops
+    that thread at its next wait instead of after it.
+    """
+
+    def __init__(self):
+        self.source = SystemClock()
+        self._local = threading.local()
+
+    def use(self, source):
+        """Switch to source (None for the wall clock), returns the previous one"""
+        previous = self.source
+        self.source = source or SystemClock()
+        return previous
+
+    @contextlib.contextmanager
+    def cancellable(self, stop_event):
+        previous = getattr(self._local, "stop_event", None)
+        self._local.stop_event = stop_event
+        try:
+            yield
+        finally:
+            self._local.stop_event = previous
+
+    def time(self):
+        return self.source.time()
+
+    def sleep(self, seconds):
+        stop_event = getattr(self._local, "stop_event", None)
+        if stop_event is None:
+            self.source.sleep(seconds)
+            return
+        if stop_event.is_set() or self.source.wait(stop_event, max(seconds, 0)):
+            raise Cancelled()
+
+    def wait(self, event, timeout=None):
+        stop_event = getattr(self._local, "stop_event", None)
+        if stop_event is None:
+            return self.source.wait(event, timeout)
+        deadline = None if timeout is None else self.source.time() + timeout
+        while True:
+            if stop_event.is_set():
+                raise Cancelled()
+            step = CANCEL_POLL
+            if deadline is not None:
+                step = min(step, deadline - self.source.time())
+                if step <= 0:
+                    return event.is_set()
+            if self.source.wait(event, step):
+                return True
+
+
+# Shared by every component, swapped by benchmarks and replays
+clock = Clock()
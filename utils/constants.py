@@ -19,4 +19,12 @@ card_offset_mapping = {
 }
 
 ZOOM_CARD_REGION = (80, 255, 740, 1020)
+# (w, h) of a card in the hand fan, centred on (card_start_x - i * offset, card_y).
+# Not measured on a capture: an assumption of at most 2 * 45 px wide (so tapping
+# the centre reaches a card with 8 in hand, offset 45) at the card aspect ratio
+# of ZOOM_CARD_REGION. Slots that do not match fall back to a long press
+HAND_CARD_SIZE = (90, 124)
+# (w, h) of a card on the board, centred on the active spot / bench_positions
+ACTIVE_CARD_SIZE = (150, 210)
+BENCH_CARD_SIZE = (120, 168)
 NUMBER_OF_CARDS_REGION = (790, 1325, 60, 50)
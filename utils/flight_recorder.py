@@ -0,0 +1,110 @@
+import json
+import os
+import shutil
+import threading
+from collections import deque
+from datetime import datetime
+
+import cv2
+
+from utils.clock import clock
+
+CRASH_REPORTS_DIR = "crash_reports"
+# Frames older than this (seconds) leave the ring
+RING_SECONDS = 20
+# Hard cap on frames kept, whatever the capture rate
+MAX_FRAMES = 120
+MAX_ACTIONS = 100
+# Frames are kept at this fraction of their size, 225x400 for 900x1600
+FRAME_SCALE = 0.25
+# Oldest reports are deleted past this many
+MAX_REPORTS = 20
+
+
+class FlightRecorder:
+    """
+    Last seconds of frames and actions, written to disk only when asked.
+
+    Every captured frame is downscaled into a ring bounded by RING_SECONDS
+    and MAX_FRAMES, every input goes into a ring of MAX_ACTIONS; that is
+    about 30 MB at most and one resize per capture. dump() writes the rings
+    with the reason into crash_reports/<date>-<reason>/, for errors, stuck
+    screens and searches that ran out of attempts.
+    """
+
+    def __init__(self, path=CRASH_REPORTS_DIR):
+        self.path = path
+        self.enabled = True
+        self.context = {}
+        self.frames = deque(maxlen=MAX_FRAMES)
+        self.actions = deque(maxlen=MAX_ACTIONS)
+        self._lock = threading.Lock()
+
+    def set_context(self, **context):
+        self.context = {**self.context, **context}
+
+    def record_frame(self, frame):
+        if not self.enabled or frame is None:
+            return
+        now = clock.time()
+        small = cv2.resize(
+            frame, None, fx=FRAME_SCALE, fy=FRAME_SCALE, interpolation=cv2.INTER_AREA
+        )
+        with self._lock:
+            self.frames.append((now, small))
+            while self.frames and now - self.frames[0][0] > RING_SECONDS:
+                self.frames.popleft()
+
+    def record_action(self, kind, coords, description=None):
+        if not self.enabled:
+            return
+        action = {"t": clock.time(), "type": kind, "coords": coords}
+        if description:
+            action["description"] = description
+        with self._lock:
+            self.actions.append(action)
+
+    def dump(self, reason, details=None):
+        """Write the rings to a new report directory, returns its path"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            frames = list(self.frames)
+            actions = list(self.actions)
+        now = clock.time()
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        report_dir = os.path.join(self.path, f"{stamp}-{reason}")
+        try:
+            os.makedirs(report_dir, exist_ok=True)
+            for i, (timestamp, frame) in enumerate(frames):
+                name = f"frame_{i:03d}_{timestamp - now:+.2f}s.png"
+                cv2.imwrite(os.path.join(report_dir, name), frame)
+            report = {
+                "reason": reason,
+                "details": details,
+                "context": self.context,
+                "time": now,
+                "frame_scale": FRAME_SCALE,
+                "frames": [timestamp - now for timestamp, _ in frames],
+                "actions": [{**action, "t": action["t"] - now} for action in actions],
+            }
+            with open(os.path.join(report_dir, "report.json"), "w") as f:
+                json.dump(report, f, indent=4)
+            self._prune()
+        except OSError as e:
+            print(f"Error writing crash report: {e}")
+            return None
+        return report_dir
+
+    def _prune(self):
+        reports = sorted(
+            entry
+            for entry in os.listdir(self.path)
+            if os.path.isdir(os.path.join(self.path, entry))
+        )
+        for entry in reports[:-MAX_REPORTS]:
+            shutil.rmtree(os.path.join(self.path, entry), ignore_errors=True)
+
+
+# Shared by every component, always recording
+flight_recorder = FlightRecorder()
@@ -0,0 +1,161 @@
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import weakref
+from collections import deque
+
+import cv2
+import numpy as np
+
+# Thumbnails kept in memory, JPEG encoded: about 6 KB each
+THUMBNAIL_WIDTH = 160
+THUMBNAIL_QUALITY = 80
+# Full frames per segment file, about 600 KB each as PNG
+SEGMENT_FRAMES = 200
+# Oldest segment is deleted past this many, about 1.2 GB on disk
+MAX_SEGMENTS = 10
+# Frames waiting for the writer thread, add() blocks past this
+MAX_PENDING_FRAMES = 8
+
+
+class FrameSpool:
+    """
+    Full frames on disk, a thumbnail of each in memory.
+
+    add() keeps a JPEG thumbnail and queues the frame for a writer thread,
+    which appends it as PNG (lossless) to the current segment file. frame()
+    reads and decodes one only when it is asked for. Segments hold
+    SEGMENT_FRAMES frames; past MAX_SEGMENTS the oldest is deleted and its
+    frames are served from their thumbnail, so memory and disk both stay
+    bounded however long the history gets. Files are deleted at exit.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or tempfile.mkdtemp(prefix="frame-spool-")
+        os.makedirs(self.directory, exist_ok=True)
+        self._next_id = 0
+        self._generation = 0
+        self._thumbnails = {}  # id -> (JPEG bytes, full frame shape)
+        self._locations = {}  # id -> (segment, offset, size)
+        self._pending = {}  # id -> frame the writer has not written yet
+        self._segments = deque()
+        self._segment_frames = 0
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=MAX_PENDING_FRAMES)
+        threading.Thread(target=self._write, daemon=True).start()
+        self._cleanup = weakref.finalize(
+            self, shutil.rmtree, self.directory, ignore_errors=True
+        )
+
+    def add(self, frame):
+        """Store a BGR frame, returns its id"""
+        height, width = frame.shape[:2]
+        thumbnail = cv2.resize(
+            frame,
+            (THUMBNAIL_WIDTH, max(1, height * THUMBNAIL_WIDTH // width)),
+            interpolation=cv2.INTER_AREA,
+        )
+        jpeg = cv2.imencode(
+            ".jpg", thumbnail, [cv2.IMWRITE_JPEG_QUALITY, THUMBNAIL_QUALITY]
+        )[1].tobytes()
+        frame = frame.copy()
+        with self._lock:
+            frame_id = self._next_id
+            self._next_id += 1
+            self._thumbnails[frame_id] = (jpeg, frame.shape)
+            self._pending[frame_id] = frame
+            generation = self._generation
+        self._queue.put((frame_id, generation, frame))
+        return frame_id
+
+    def thumbnail(self, frame_id):
+        with self._lock:
+            entry = self._thumbnails.get(frame_id)
+        if entry is None:
+            return None
+        return cv2.imdecode(np.frombuffer(entry[0], np.uint8), cv2.IMREAD_COLOR)
+
+    def frame(self, frame_id):
+        """
+        The full frame, or its thumbnail scaled back to the frame size once
+        the segment holding it was deleted. None for an unknown id.
+        """
+        with self._lock:
+            pending = self._pending.get(frame_id)
+            location = self._locations.get(frame_id)
+            entry = self._thumbnails.get(frame_id)
+        if pending is not None:
+            return pending.copy()
+        if location is not None:
+            segment, offset, size = location
+            try:
+                with open(self._segment_path(segment), "rb") as f:
+                    f.seek(offset)
+                    data = f.read(size)
+                return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+            except OSError:
+                pass  # Deleted meanwhile, fall back to the thumbnail
+        if entry is None:
+            return None
+        height, width = entry[1][:2]
+        return cv2.resize(self.thumbnail(frame_id), (width, height))
+
+    def discard(self, frame_id):
+        """Forget the thumbnail, the full frame goes with its segment"""
+        with self._lock:
+            self._thumbnails.pop(frame_id, None)
+            self._locations.pop(frame_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._thumbnails.clear()
+            self._locations.clear()
+            self._pending.clear()
+            while self._segments:
+                self._remove_segment(self._segments.popleft())
+            self._segment_frames = 0
+
+    def _segment_path(self, segment):
+        return os.path.join(self.directory, f"segment_{segment:06d}.bin")
+
+    def _remove_segment(self, segment):
+        try:
+            os.remove(self._segment_path(segment))
+        except OSError:
+            pass
+
+    def _write(self):
+        segment = -1
+        while True:
+            frame_id, generation, frame = self._queue.get()
+            data = cv2.imencode(".png", frame)[1].tobytes()
+            with self._lock:
+                if generation != self._generation:
+                    continue  # Cleared while it waited
+                if not self._segments or self._segment_frames >= SEGMENT_FRAMES:
+                    segment += 1
+                    self._segments.append(segment)
+                    self._segment_frames = 0
+                    while len(self._segments) > MAX_SEGMENTS:
+                        expired = self._segments.popleft()
+                        self._remove_segment(expired)
+                        self._locations = {
+                            key: location
+                            for key, location in self._locations.items()
+                            if location[0] != expired
+                        }
+                path = self._segment_path(self._segments[-1])
+                try:
+                    with open(path, "ab") as f:
+                        offset = f.tell()
+                        f.write(data)
+                    self._locations[frame_id] = (self._segments[-1], offset, len(data))
+                    self._segment_frames += 1
+                except OSError as e:
+                    print(f"Error spooling frame: {e}")
+                self._pending.pop(frame_id, None)
+                if frame_id not in self._thumbnails:
+                    self._locations.pop(frame_id, None)  # Discarded meanwhile
@@ -1,16 +1,35 @@
-import time
-
 import cv2
 import easyocr
-from skimage.metrics import structural_similarity as ssim
 
 from utils.adb_utils import click_position, find_subimage, take_screenshot
+from utils.button_cache import button_cache
+from utils.clock import clock
+from utils.flight_recorder import flight_recorder
+from utils.similarity import SimilarityEngine
+from utils.tracing import traced
+
+# Waiting polls every POLL_MIN_INTERVAL while the screen changes and backs
+# off by POLL_BACKOFF up to POLL_MAX_INTERVAL while it stays the same
+POLL_MIN_INTERVAL = 0.1
+POLL_MAX_INTERVAL = 1.0
+POLL_BACKOFF = 1.5
+# Downscaled frames whose pixels all differ less than this show the same screen
+STATIC_COMPARE_SIZE = (90, 160)
+STATIC_FRAME_DIFF = 12
+# Margin (px) searched around the position a template was last found at
+KNOWN_REGION_MARGIN = 40
+# Seconds one attempt of the old search loop took on an emulator: screencap,
+# pull, a full-screen match and its 0.5s sleep
+SECONDS_PER_ATTEMPT = 2.0
 
 
 class ImageProcessor:
     def __init__(self, log_callback, debug_window=None):
         self.log_callback = log_callback
         self.debug_window = debug_window
+        self.similarity_engine = SimilarityEngine()
+        self.known_positions = {}  # Positions of unnamed templates
+        self.template_names = {}
 
     def reset_view(self):
         click_position(0, 1350)
@@ -33,7 +52,9 @@ class ImageProcessor:
 
         return card_image
 
-    def calculate_similarity(self, img1, img2):
+    @traced("similarity.calculate")
+    def calculate_similarity(self, img1, img2, method=None, cache=False):
+        """Similarity of img1 to img2, cache only when img2 is a loaded template"""
         # Check if either image is None or empty
         if img1 is None or img2 is None:
             self.log_callback(
@@ -54,10 +75,7 @@ class ImageProcessor:
             return 0
 
         try:
-            img1_gray = cv2.cvtColor(img1, cv2.COLOR_BGR2GRAY)
-            img2_gray = cv2.cvtColor(img2, cv2.COLOR_BGR2GRAY)
-            score, _ = ssim(img1_gray, img2_gray, full=True)
-            return score
+            return self.similarity_engine.score(img1, img2, method, cache)
         except cv2.error as e:
             self.log_callback(f"OpenCV error in calculate_similarity: {e}")
             return 0
@@ -65,6 +83,7 @@ class ImageProcessor:
             self.log_callback(f"Unexpected error in calculate_similarity: {e}")
             return 0
 
+    @traced("ocr.number")
     def extract_number_from_image(self, image):
         grayscale_image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
         reader = easyocr.Reader(["en"])
@@ -72,6 +91,7 @@ class ImageProcessor:
         numbers = [text for text in result if text.isdigit()]
         return numbers[0] if numbers else None
 
+    @traced("ocr.text")
     def extract_text_from_image(self, image):
         grayscale_image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
         reader = easyocr.Reader(["en"])
@@ -92,7 +112,9 @@ class ImageProcessor:
         if screenshot is None:
             self.log_callback("Screenshot is None in check method")
             return False
-        _, similarity = find_subimage(screenshot, template_image)
+        _, similarity = self.find_template(
+            screenshot, template_image, similarity_threshold
+        )
         if log_message:
             log_message = (
                 f"{log_message} found - {similarity:.2f}"
@@ -109,44 +131,224 @@ class ImageProcessor:
         running_event,
         similarity_threshold=0.8,
         max_attempts=50,
+        timeout=None,
+        optimistic=False,
     ):
-        attempts = 0
-
+        """
+        Wait up to timeout seconds for the template and click it. Without a
+        timeout, max_attempts is converted to the time that many attempts of
+        the old loop took.
+        """
+        if timeout is None:
+            timeout = max_attempts * SECONDS_PER_ATTEMPT
         self.log_callback(f"Searching... {log_message}")
-        while running_event.is_set():
-            screenshot = take_screenshot()
-            if screenshot is None:
+        name, position, similarity, screenshot = self.wait_for_templates(
+            {log_message: template_image},
+            running_event,
+            timeout=timeout,
+            similarity_threshold=similarity_threshold,
+            optimistic=optimistic,
+        )
+        if name is None:
+            if running_event.is_set():
                 self.log_callback(
-                    "Failed to take screenshot in check_and_click_until_found"
+                    f"❌ {log_message} not found after {timeout:.0f}s. "
+                    "Stopping the bot."
                 )
-                time.sleep(0.5)
-                continue
-            position, similarity = find_subimage(screenshot, template_image)
-
-            if similarity > similarity_threshold:
-                self.log_and_click(
-                    position,
-                    f"{log_message} found - {similarity:.2f}",
-                    screenshot=screenshot,
+                report_dir = flight_recorder.dump(
+                    "max_attempts", f"{log_message} not found"
                 )
-                self.log_callback(f"✅ {log_message} found")
-                return True
-            else:
-                attempts += 1
-                if attempts >= max_attempts:
+                if report_dir:
                     self.log_callback(
-                        f"❌ Max attempts reached. {log_message} not found. Stopping the bot."
+                        f"🧾 Last frames and actions saved to {report_dir}"
                     )
-                    return False
-                time.sleep(0.5)
+            return False
+        self.log_and_click(
+            position, f"{log_message} found - {similarity:.2f}", screenshot=screenshot
+        )
+        self.log_callback(f"✅ {log_message} found")
+        return True
+
+    def wait_for_templates(
+        self,
+        templates,
+        running_event,
+        timeout=30,
+        similarity_threshold=0.8,
+        interval=POLL_MIN_INTERVAL,
+        optimistic=False,
+    ):
+        """
+        Poll the screen until one of several templates shows up.
+
+        Polling starts every interval seconds and backs off up to
+        POLL_MAX_INTERVAL while the screen stays the same; a frame that did
+        not change since the last matched one is not matched again either.
+        As soon as the frame changes, polling is back to interval. Returns
+        (name, position, similarity, screenshot), name is None on timeout or
+        stop.
+        """
+        deadline = clock.time() + timeout
+        delay = interval
+        previous = None
+        while running_event.is_set() and clock.time() < deadline:
+            screenshot = take_screenshot()
+            if screenshot is None:
+                clock.sleep(delay)
+                continue
+            small = cv2.resize(
+                cv2.cvtColor(screenshot, cv2.COLOR_BGR2GRAY),
+                STATIC_COMPARE_SIZE,
+                interpolation=cv2.INTER_AREA,
+            )
+            # Compared with the last frame matched, not the last one captured,
+            # so a screen fading in slowly still adds up to a change
+            static = (
+                previous is not None
+                and cv2.absdiff(small, previous).max() < STATIC_FRAME_DIFF
+            )
+            if static:
+                delay = min(delay * POLL_BACKOFF, POLL_MAX_INTERVAL)
+            else:
+                previous = small
+                delay = interval
+                name, position, similarity = self.classify(
+                    screenshot, templates, similarity_threshold, optimistic
+                )
+                if name is not None:
+                    return name, position, similarity, screenshot
+            clock.sleep(delay)
+        return None, None, 0, None
+
+    def wait_for_any(
+        self,
+        templates,
+        running_event,
+        timeout=30,
+        interval=POLL_MIN_INTERVAL,
+        similarity_threshold=0.8,
+        click=True,
+    ):
+        """
+        Wait until one of several templates is on screen.
+
+        templates maps a name to its template image. Every capture is matched
+        against all of them and the best match above the threshold wins, so
+        the caller reacts to whichever screen shows up first, in any order.
+        Returns (name, position), or (None, None) on timeout or stop.
+        """
+        name, position, similarity, screenshot = self.wait_for_templates(
+            templates, running_event, timeout, similarity_threshold, interval
+        )
+        if name is not None and click:
+            self.log_and_click(
+                position, f"{name} found - {similarity:.2f}", screenshot=screenshot
+            )
+        return name, position
+
+    def register_templates(self, template_images):
+        """Name the templates so their locations are kept in button_cache"""
+        self.template_names.update(
+            {id(image): name for name, image in template_images.items()}
+        )
+
+    def _known_position(self, template_image):
+        name = self.template_names.get(id(template_image))
+        if name is not None:
+            return button_cache.position(name)
+        return self.known_positions.get(id(template_image))
+
+    def _remember_position(self, template_image, position):
+        name = self.template_names.get(id(template_image))
+        if name is not None:
+            button_cache.confirm(name, position)
+        else:
+            self.known_positions[id(template_image)] = position
+
+    def find_template(
+        self, screenshot, template_image, similarity_threshold=0.8, optimistic=False
+    ):
+        """
+        find_subimage that looks where the template was last found first.
+
+        Buttons rarely move, so a match around the last position is enough
+        and the full frame is only searched when it is not there. With
+        optimistic, a button always found at the same spot
+        (button_cache.trusted) is first compared right there, one crop of its
+        size instead of a search.
+        """
+        if optimistic:
+            name = self.template_names.get(id(template_image))
+            trusted = button_cache.trusted(name) if name else None
+            if trusted is not None:
+                similarity = self._similarity_at(screenshot, template_image, trusted)
+                if similarity > similarity_threshold:
+                    button_cache.confirm(name, trusted)
+                    return trusted, similarity
+        known = self._known_position(template_image)
+        if known is not None:
+            x, y = known
+            h, w = template_image.shape[:2]
+            left = max(x - KNOWN_REGION_MARGIN, 0)
+            top = max(y - KNOWN_REGION_MARGIN, 0)
+            window = screenshot[
+                top : y + h + KNOWN_REGION_MARGIN, left : x + w + KNOWN_REGION_MARGIN
+            ]
+            if window.shape[0] >= h and window.shape[1] >= w:
+                (window_x, window_y), similarity = find_subimage(window, template_image)
+                if similarity > similarity_threshold:
+                    position = (left + window_x, top + window_y)
+                    self._remember_position(template_image, position)
+                    return position, similarity
+        position, similarity = find_subimage(screenshot, template_image)
+        if similarity > similarity_threshold:
+            self._remember_position(template_image, position)
+        return position, similarity
+
+    def _similarity_at(self, screenshot, template_image, position):
+        x, y = position
+        h, w = template_image.shape[:2]
+        crop = screenshot[y : y + h, x : x + w]
+        if crop.shape[:2] != (h, w):
+            return 0
+        return find_subimage(crop, template_image)[1]
+
+    def classify(
+        self, screenshot, templates, similarity_threshold=0.8, optimistic=False
+    ):
+        """(name, position, similarity) of the best template on screen"""
+        best_name, best_position, best_similarity = None, None, 0
+        for name, template_image in templates.items():
+            if template_image is None:
+                continue
+            position, similarity = self.find_template(
+                screenshot, template_image, similarity_threshold, optimistic
+            )
+            if similarity > similarity_threshold and similarity > best_similarity:
+                best_name, best_position, best_similarity = name, position, similarity
+        return best_name, best_position, best_similarity
 
     def check_and_click(
-        self, screenshot, template_image, log_message=None, similarity_threshold=0.8
+        self,
+        screenshot,
+        template_image,
+        log_message=None,
+        similarity_threshold=0.8,
+        optimistic=False,
     ):
+        """
+        Click template_image if it is in screenshot.
+
+        With optimistic, a button always found at the same spot is checked
+        there first (see find_template); it is only ever clicked once this
+        screenshot showed it.
+        """
         if screenshot is None:
             self.log_callback("Screenshot is None in check_and_click")
             return False
-        position, similarity = find_subimage(screenshot, template_image)
+        position, similarity = self.find_template(
+            screenshot, template_image, similarity_threshold, optimistic
+        )
         if similarity > similarity_threshold:
             if log_message:
                 self.log_and_click(
@@ -0,0 +1,277 @@
+import bisect
+import json
+import mmap
+import os
+import queue
+import struct
+import threading
+import zlib
+
+import cv2
+import numpy as np
+
+from utils.clock import clock
+
+MAGIC = b"PPSESSN1"
+# tag, frame id, timestamp, kind, height, width, channels, payload size
+RECORD = struct.Struct("<4sIdBHHBI")
+# index offset, magic
+FOOTER = struct.Struct("<Q8s")
+FRAME_TAG = b"FRME"
+ACTION_TAG = b"ACTN"
+INDEX_TAG = b"INDX"
+KEYFRAME, DELTA = 0, 1
+# A full frame every this many frames bounds the deltas applied on a seek
+KEYFRAME_INTERVAL = 30
+DELTA_COMPRESSION = 1
+# Frames waiting for the writer thread, capture blocks past this
+MAX_PENDING_FRAMES = 16
+
+
+class SessionRecorder:
+    """
+    Streams every frame and input action of a match into a .session file.
+
+    The file is a sequence of records: a keyframe (PNG) every
+    KEYFRAME_INTERVAL frames and, in between, the zlib-compressed difference
+    from the previous frame, which is mostly zeros on a static board. Actions
+    are JSON records pointing at the last frame captured before them. On
+    stop() an index of every record is appended, so SessionReader can seek to
+    any frame; a file cut short by a crash is still readable by scanning.
+
+    Encoding runs on a writer thread, the capture path only copies the frame
+    (and blocks once MAX_PENDING_FRAMES are waiting, no frame is dropped).
+    While stopped, record_frame and record_action cost one attribute check.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.path = None
+        self.metadata = {}
+        self._queue = None
+        self._writer = None
+        self._lock = threading.Lock()
+        self._frame_id = -1
+
+    def start(self, path, **metadata):
+        self.stop()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.metadata = {"started": clock.time(), **metadata}
+        self._frame_id = -1
+        self._queue = queue.Queue(maxsize=MAX_PENDING_FRAMES)
+        self._writer = threading.Thread(
+            target=self._write, args=(path, self._queue), daemon=True
+        )
+        self._writer.start()
+        self.enabled = True
+
+    def stop(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        self._queue.put(None)
+        self._writer.join()
+        self._writer = None
+
+    def record_frame(self, frame):
+        """Queue a captured BGR frame, returns its frame id"""
+        if not self.enabled or frame is None:
+            return None
+        with self._lock:
+            self._frame_id += 1
+            frame_id = self._frame_id
+            self._queue.put((FRAME_TAG, frame_id, clock.time(), frame.copy()))
+        return frame_id
+
+    def record_action(self, kind, coords, description=None):
+        if not self.enabled:
+            return
+        with self._lock:
+            action = {
+                "t": clock.time(),
+                "frame": self._frame_id,
+                "type": kind,
+                "coords": coords,
+            }
+            if description:
+                action["description"] = description
+            self._queue.put((ACTION_TAG, action))
+
+    def _write(self, path, pending):
+        try:
+            self._write_records(path, pending)
+        except Exception as e:
+            print(f"Error recording session to {path}: {e}")
+            self.enabled = False
+            # Keep draining so capture never blocks on a full queue
+            while pending.get() is not None:
+                pass
+
+    def _write_records(self, path, pending):
+        frames, actions = [], []
+        previous = None
+        with open(path, "wb") as f:
+            f.write(MAGIC)
+            while True:
+                item = pending.get()
+                if item is None:
+                    break
+                if item[0] == ACTION_TAG:
+                    payload = json.dumps(item[1]).encode()
+                    f.write(
+                        RECORD.pack(
+                            ACTION_TAG, 0, item[1]["t"], 0, 0, 0, 0, len(payload)
+                        )
+                    )
+                    f.write(payload)
+                    actions.append(item[1])
+                    continue
+                _, frame_id, timestamp, frame = item
+                height, width = frame.shape[:2]
+                channels = frame.shape[2] if frame.ndim == 3 else 1
+                if (
+                    previous is None
+                    or previous.shape != frame.shape
+                    or frame_id % KEYFRAME_INTERVAL == 0
+                ):
+                    kind, keyframe = KEYFRAME, frame_id
+                    payload = cv2.imencode(".png", frame)[1].tobytes()
+                else:
+                    kind, keyframe = DELTA, frames[-1][2]
+                    delta = np.subtract(frame, previous, dtype=np.uint8)
+                    payload = zlib.compress(delta.tobytes(), DELTA_COMPRESSION)
+                frames.append([f.tell(), timestamp, keyframe])
+                f.write(
+                    RECORD.pack(
+                        FRAME_TAG,
+                        frame_id,
+                        timestamp,
+                        kind,
+                        height,
+                        width,
+                        channels,
+                        len(payload),
+                    )
+                )
+                f.write(payload)
+                previous = frame
+            index = json.dumps(
+                {"metadata": self.metadata, "frames": frames, "actions": actions}
+            ).encode()
+            index_offset = f.tell()
+            f.write(RECORD.pack(INDEX_TAG, 0, 0.0, 0, 0, 0, 0, len(index)))
+            f.write(index)
+            f.write(FOOTER.pack(index_offset, MAGIC))
+
+
+class SessionReader:
+    """
+    Random access to the frames of a .session file, memory-mapped.
+
+    frame(i) decodes from the keyframe before i, or continues from the last
+    decoded frame when reading forward, so replaying in order applies one
+    delta per frame and never reads the file into memory.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+        if self._map[: len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a session file")
+        index = self._read_index()
+        if index is None:
+            index = self._scan()
+        self.metadata = index["metadata"]
+        self.offsets = [entry[0] for entry in index["frames"]]
+        self.timestamps = [entry[1] for entry in index["frames"]]
+        self.keyframes = [entry[2] for entry in index["frames"]]
+        self.actions = index["actions"]
+        self._last = None  # (frame id, frame) of the last decoded frame
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def close(self):
+        self._last = None
+        self._view.release()
+        self._map.close()
+        self._file.close()
+
+    def frame(self, frame_id):
+        if not 0 <= frame_id < len(self):
+            raise IndexError(frame_id)
+        keyframe = self.keyframes[frame_id]
+        if self._last and keyframe <= self._last[0] <= frame_id:
+            start, frame = self._last
+        else:
+            start, frame = keyframe, self._decode(keyframe, None)
+        for i in range(start + 1, frame_id + 1):
+            frame = self._decode(i, frame)
+        self._last = (frame_id, frame)
+        return frame.copy()
+
+    def frame_at(self, timestamp):
+        """Last frame captured at or before timestamp"""
+        return self.frame(max(bisect.bisect_right(self.timestamps, timestamp) - 1, 0))
+
+    def frames(self):
+        """(timestamp, frame) of every frame in order"""
+        for frame_id in range(len(self)):
+            yield self.timestamps[frame_id], self.frame(frame_id)
+
+    def _decode(self, frame_id, previous):
+        offset = self.offsets[frame_id]
+        _, _, _, kind, *_, size = RECORD.unpack_from(self._map, offset)
+        payload = self._view[offset + RECORD.size : offset + RECORD.size + size]
+        if kind == KEYFRAME:
+            return cv2.imdecode(np.frombuffer(payload, np.uint8), cv2.IMREAD_UNCHANGED)
+        delta = np.frombuffer(zlib.decompress(payload), np.uint8)
+        return np.add(previous, delta.reshape(previous.shape), dtype=np.uint8)
+
+    def _read_index(self):
+        if len(self._map) < len(MAGIC) + FOOTER.size:
+            return None
+        offset, magic = FOOTER.unpack_from(self._map, len(self._map) - FOOTER.size)
+        if magic != MAGIC:
+            return None
+        tag, *_, size = RECORD.unpack_from(self._map, offset)
+        if tag != INDEX_TAG:
+            return None
+        start = offset + RECORD.size
+        return json.loads(bytes(self._view[start : start + size]))
+
+    def _scan(self):
+        """Rebuild the index of a file that was never closed"""
+        frames, actions = [], []
+        offset = len(MAGIC)
+        while offset + RECORD.size <= len(self._map):
+            tag, frame_id, timestamp, kind, *_, size = RECORD.unpack_from(
+                self._map, offset
+            )
+            end = offset + RECORD.size + size
+            if end > len(self._map) or tag not in (FRAME_TAG, ACTION_TAG):
+                break  # Cut short while it was written
+            if tag == FRAME_TAG:
+                keyframe = frame_id if kind == KEYFRAME else frames[-1][2]
+                frames.append([offset, timestamp, keyframe])
+            else:
+                actions.append(
+                    json.loads(bytes(self._view[offset + RECORD.size : end]))
+                )
+            offset = end
+        return {"metadata": {}, "frames": frames, "actions": actions}
+
+
+# Shared by every component, started from the run loop when configured
+session_recorder = SessionRecorder()
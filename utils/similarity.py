@@ -0,0 +1,190 @@
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from utils.tracing import traced
+
+# SSIM constants, same defaults as skimage.metrics.structural_similarity
+SSIM_K1 = 0.01
+SSIM_K2 = 0.03
+SSIM_DATA_RANGE = 255.0
+SSIM_WINDOW = 7
+SSIM_GAUSSIAN_WINDOW = 11
+SSIM_GAUSSIAN_SIGMA = 1.5
+
+
+def to_gray(image):
+    """Return a single channel view of a BGR (or already gray) image"""
+    if image.ndim == 2:
+        return image
+    if image.shape[2] == 4:
+        return cv2.cvtColor(image, cv2.COLOR_BGRA2GRAY)
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+
+class SSIMBackend:
+    """
+    Mean SSIM computed with separable OpenCV filters.
+
+    With the default box window it reproduces skimage's
+    structural_similarity (7x7 uniform window, sample covariance), but only
+    the valid interior is combined and averaged, so no full SSIM map is kept.
+    """
+
+    def __init__(self, gaussian=False):
+        self.gaussian = gaussian
+        if gaussian:
+            self.window = SSIM_GAUSSIAN_WINDOW
+            self.cov_norm = 1.0
+        else:
+            self.window = SSIM_WINDOW
+            n = self.window * self.window
+            self.cov_norm = n / (n - 1)
+        self.pad = (self.window - 1) // 2
+        self.c1 = (SSIM_K1 * SSIM_DATA_RANGE) ** 2
+        self.c2 = (SSIM_K2 * SSIM_DATA_RANGE) ** 2
+
+    def _filter(self, image):
+        if self.gaussian:
+            filtered = cv2.GaussianBlur(
+                image,
+                (self.window, self.window),
+                SSIM_GAUSSIAN_SIGMA,
+                borderType=cv2.BORDER_REFLECT,
+            )
+        else:
+            filtered = cv2.boxFilter(
+                image,
+                -1,
+                (self.window, self.window),
+                normalize=True,
+                borderType=cv2.BORDER_REFLECT,
+            )
+        return self._crop(filtered)
+
+    def _crop(self, image):
+        p = self.pad
+        return image[p:-p, p:-p]
+
+    def prepare(self, gray):
+        if min(gray.shape[:2]) <= 2 * self.pad:
+            raise ValueError(
+                f"Image {gray.shape} is smaller than the {self.window}x{self.window} SSIM window"
+            )
+        y = gray.astype(np.float32)
+        mu = self._filter(y)
+        var = self.cov_norm * (self._filter(y * y) - mu * mu)
+        return {"float": y, "mu": mu, "var": var}
+
+    def compare(self, stats_x, stats_y):
+        mu_x, mu_y = stats_x["mu"], stats_y["mu"]
+        cov = self.cov_norm * (
+            self._filter(stats_x["float"] * stats_y["float"]) - mu_x * mu_y
+        )
+        num = (2 * mu_x * mu_y + self.c1) * (2 * cov + self.c2)
+        den = (mu_x * mu_x + mu_y * mu_y + self.c1) * (
+            stats_x["var"] + stats_y["var"] + self.c2
+        )
+        return float(cv2.mean(num / den)[0])
+
+
+class NCCBackend:
+    """Zero-mean normalized cross-correlation over the whole image, in [-1, 1]"""
+
+    def prepare(self, gray):
+        y = gray.astype(np.float32)
+        mean, std = cv2.meanStdDev(y)
+        centered = y - float(mean[0][0])
+        return {"centered": centered, "norm": float(std[0][0]) * np.sqrt(y.size)}
+
+    def compare(self, stats_x, stats_y):
+        denom = stats_x["norm"] * stats_y["norm"]
+        if denom == 0:
+            # Flat images carry no structure, only two flat images are a match
+            return 1.0 if stats_x["norm"] == stats_y["norm"] else 0.0
+        score = float(np.vdot(stats_x["centered"], stats_y["centered"]) / denom)
+        return min(max(score, -1.0), 1.0)
+
+
+class MADBackend:
+    """1 - mean absolute difference, scaled so identical images score 1.0"""
+
+    def prepare(self, gray):
+        return {"gray": gray}
+
+    def compare(self, stats_x, stats_y):
+        diff = cv2.absdiff(stats_x["gray"], stats_y["gray"])
+        return 1.0 - float(cv2.mean(diff)[0]) / SSIM_DATA_RANGE
+
+
+SIMILARITY_BACKENDS = {
+    "ssim": SSIMBackend,
+    "ssim_gaussian": lambda: SSIMBackend(gaussian=True),
+    "ncc": NCCBackend,
+    "mad": MADBackend,
+}
+
+
+class SimilarityEngine:
+    """
+    Pluggable image similarity used by ImageProcessor.calculate_similarity.
+
+    The second image of a comparison is treated as the reference/template.
+    With cache=True its grayscale conversion and per-backend statistics are
+    cached by object identity, so templates loaded once (battle log texts,
+    indicators...) are only prepared the first time they are compared. The
+    cache keeps the reference alive, so it is only for long-lived images:
+    a crop of a capture would pin the whole frame.
+    """
+
+    def __init__(self, method="ssim", cache_size=32):
+        if method not in SIMILARITY_BACKENDS:
+            raise ValueError(f"Unknown similarity method: {method}")
+        self.method = method
+        self.cache_size = cache_size
+        self._backends = {}
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def backend(self, method=None):
+        method = method or self.method
+        backend = self._backends.get(method)
+        if backend is None:
+            if method not in SIMILARITY_BACKENDS:
+                raise ValueError(f"Unknown similarity method: {method}")
+            backend = SIMILARITY_BACKENDS[method]()
+            self._backends[method] = backend
+        return backend
+
+    @traced("similarity.score")
+    def score(self, image, reference, method=None, cache=False):
+        method = method or self.method
+        backend = self.backend(method)
+        stats_x = backend.prepare(to_gray(image))
+        if cache:
+            stats_y = self._reference_stats(method, backend, reference)
+        else:
+            stats_y = backend.prepare(to_gray(reference))
+        return backend.compare(stats_x, stats_y)
+
+    def _reference_stats(self, method, backend, reference):
+        key = (method, id(reference))
+        with self._lock:
+            entry = self._cache.get(key)
+            # Keeping the array in the entry guarantees its id is not reused
+            if entry is not None and entry[0] is reference:
+                self._cache.move_to_end(key)
+                return entry[1]
+        stats = backend.prepare(to_gray(reference))
+        with self._lock:
+            self._cache[key] = (reference, stats)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return stats
+
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
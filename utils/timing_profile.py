@@ -0,0 +1,233 @@
+"""
+Per-device timings.
+
+Only the keys in LEARNED_TIMINGS are measured while the bot plays or
+calibrates: the capture latency, the long-press zoom, the play animations
+and the attack menu. The others are gesture durations and waits nothing
+measures; they keep their default unless set by hand for a device in
+timing_profiles.json.
+"""
+
+import json
+import os
+import threading
+
+from utils.clock import clock
+
+TIMING_PROFILES_FILE = "timing_profiles.json"
+
+# Hand tuned delays for LDPlayer at 1600x900, used until a device is measured
+DEFAULT_TIMINGS = {
+    "drag_duration": 0.5,
+    "energy_drag_duration": 0.3,
+    "long_press_capture_delay": 0.5,
+    "long_press_duration": 0.7,
+    "swipe_scan_dwell": 0.4,
+    "battle_log_ready": 2.0,
+    "play_animation_active": 1.0,
+    "play_animation_evolve": 2.0,
+    "play_animation_bench": 1.0,
+    "play_animation_trainer": 1.5,
+    "play_animation_draw": 2.5,
+    "attack_menu_open": 1.0,
+    "attack_confirm": 1.0,
+    "screencap_latency": 0.5,
+}
+# Timings something calls observe() for (TimingCalibrator, TurnExecutor,
+# AttackController)
+LEARNED_TIMINGS = (
+    "screencap_latency",
+    "long_press_capture_delay",
+    "play_animation_active",
+    "play_animation_evolve",
+    "play_animation_bench",
+    "play_animation_trainer",
+    "play_animation_draw",
+    "attack_menu_open",
+    "attack_confirm",
+)
+
+# Learned values never leave [MIN_FACTOR, MAX_FACTOR] x the default
+MIN_FACTOR = 0.25
+MAX_FACTOR = 3.0
+
+
+class TimingProfile:
+    """
+    Per-device delays and gesture durations.
+
+    Each timing keeps an exponentially weighted estimate of how long the
+    action really took on this device. get() returns that estimate plus a
+    safety margin, or the default until the first observation. Profiles of
+    every device live in timing_profiles.json, keyed by the ADB serial.
+    """
+
+    def __init__(self, device_id=None, path=TIMING_PROFILES_FILE, margin=1.25):
+        self.path = path
+        self.margin = margin
+        self.alpha = 0.3  # Weight of a new observation
+        self.device_id = None
+        self.estimates = {}
+        self._lock = threading.Lock()
+        if device_id:
+            self.load(device_id)
+
+    def get(self, name):
+        default = DEFAULT_TIMINGS[name]
+        with self._lock:
+            entry = self.estimates.get(name)
+        if entry is None:
+            return default
+        value = entry["estimate"] * self.margin
+        return min(max(value, default * MIN_FACTOR), default * MAX_FACTOR)
+
+    def observe(self, name, seconds):
+        """Record how long `name` actually took"""
+        if name not in DEFAULT_TIMINGS or seconds is None or seconds < 0:
+            return
+        with self._lock:
+            entry = self.estimates.get(name)
+            if entry is None:
+                self.estimates[name] = {"estimate": seconds, "samples": 1}
+            else:
+                entry["estimate"] += self.alpha * (seconds - entry["estimate"])
+                entry["samples"] += 1
+
+    def load(self, device_id):
+        self.device_id = device_id
+        profiles = self._read_all()
+        with self._lock:
+            self.estimates = {
+                name: entry
+                for name, entry in profiles.get(device_id, {}).items()
+                if name in DEFAULT_TIMINGS
+            }
+
+    def save(self):
+        if not self.device_id:
+            return
+        profiles = self._read_all()
+        with self._lock:
+            profiles[self.device_id] = dict(self.estimates)
+        try:
+            with open(self.path, "w") as f:
+                json.dump(profiles, f, indent=4)
+        except OSError as e:
+            print(f"Error saving timing profile: {e}")
+
+    def _read_all(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error loading timing profiles: {e}")
+            return {}
+
+    def summary(self):
+        return {name: round(self.get(name), 3) for name in LEARNED_TIMINGS}
+
+
+class TimingCalibrator:
+    """
+    Measures how long an action takes to show its visual effect.
+
+    measure_settle() captures a region, runs the action and polls frames
+    until the region has changed and then stopped changing; the time until
+    it settled is fed to the profile. calibrate() runs the measurements that
+    are safe to repeat on the battle screen.
+    """
+
+    def __init__(
+        self,
+        profile,
+        image_processor,
+        frame_source,
+        log_callback,
+        settle_similarity=0.98,
+        change_similarity=0.95,
+    ):
+        self.profile = profile
+        self.image_processor = image_processor
+        self.frame_source = frame_source
+        self.log_callback = log_callback
+        self.settle_similarity = settle_similarity
+        self.change_similarity = change_similarity
+
+    def _region(self, frame, region):
+        x, y, w, h = region
+        return frame[y : y + h, x : x + w]
+
+    def _similarity(self, img1, img2):
+        return self.image_processor.similarity_engine.score(img1, img2, cache=False)
+
+    def measure_settle(self, name, action, region, timeout=6.0, poll=0.05):
+        """
+        Run action, return the seconds until region settled (None if not).
+        They are counted from when action returned, so a blocking gesture's
+        own duration is not learned as part of the wait that follows it.
+        """
+        before = self.frame_source()
+        if before is None:
+            return None
+        before = self._region(before, region)
+
+        action()
+        started = clock.time()
+        changed_at = None
+        previous = None
+        while clock.time() - started < timeout:
+            frame = self.frame_source()
+            if frame is not None:
+                current = self._region(frame, region)
+                if changed_at is None:
+                    if self._similarity(current, before) < self.change_similarity:
+                        changed_at = clock.time()
+                elif (
+                    previous is not None
+                    and self._similarity(current, previous) > self.settle_similarity
+                ):
+                    elapsed = clock.time() - started
+                    self.profile.observe(name, elapsed)
+                    return elapsed
+                previous = current
+            clock.sleep(poll)
+        return None
+
+    def measure_screencap(self, samples=3):
+        durations = []
+        for _ in range(samples):
+            started = clock.time()
+            if self.frame_source() is not None:
+                durations.append(clock.time() - started)
+        for duration in durations:
+            self.profile.observe("screencap_latency", duration)
+        return durations
+
+    def calibrate(self, card_x, card_y, zoom_region, reset_view, long_press):
+        """
+        Measure capture latency and the long-press zoom on a hand card.
+        long_press(x, y, duration) must only hold the touch, not capture.
+        """
+        self.log_callback("⏱️ Calibrating device timings...")
+        self.measure_screencap()
+        for _ in range(3):
+            reset_view()
+            clock.sleep(0.5)
+            # Holding for the max bound keeps the card zoomed while polling
+            press = threading.Thread(
+                target=long_press,
+                args=(card_x, card_y, DEFAULT_TIMINGS["long_press_duration"] * 3),
+            )
+            self.measure_settle(
+                "long_press_capture_delay", press.start, zoom_region, timeout=3.0
+            )
+            press.join()
+        reset_view()
+        self.profile.save()
+        self.log_callback(f"⏱️ Timing profile: {self.profile.summary()}")
+
+
+# Profile of the device the bot is currently connected to
+timing_profile = TimingProfile()
@@ -0,0 +1,137 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# Oldest spans are dropped past this, about 20 MB of trace
+MAX_EVENTS = 200_000
+
+
+class _NoSpan:
+    """Returned while tracing is off, entering it costs nothing"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+class _Span:
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.tracer.record(self.name, self.started, time.perf_counter(), self.args)
+        return False
+
+
+class Tracer:
+    """
+    Records timed spans and writes them as a Chrome trace.
+
+    span() is a context manager and traced() a decorator; while tracing is
+    off both cost one attribute check. Every span carries the current
+    context (device and match ids, see set_context) and the thread it ran
+    on, so the saved file opened in chrome://tracing or ui.perfetto.dev
+    shows what each thread was doing during a turn.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.path = None
+        self.context = {}
+        self.events = deque(maxlen=MAX_EVENTS)
+        self._thread_names = {}
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def start(self, path):
+        with self._lock:
+            self.path = path
+            self.events.clear()
+            self._thread_names.clear()
+            self._origin = time.perf_counter()
+        self.enabled = True
+
+    def stop(self):
+        self.enabled = False
+        self.save()
+
+    def set_context(self, **context):
+        self.context = {**self.context, **context}
+
+    def span(self, name, **args):
+        if not self.enabled:
+            return _NO_SPAN
+        return _Span(self, name, args)
+
+    def record(self, name, started, ended, args=None):
+        thread = threading.current_thread()
+        event = {
+            "name": name,
+            "ph": "X",
+            "ts": (started - self._origin) * 1e6,
+            "dur": (ended - started) * 1e6,
+            "pid": os.getpid(),
+            "tid": thread.ident,
+            "args": {**self.context, **args} if args else self.context,
+        }
+        with self._lock:
+            self._thread_names.setdefault(thread.ident, thread.name)
+            self.events.append(event)
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            events = list(self.events)
+            thread_names = dict(self._thread_names)
+        metadata = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": os.getpid(),
+                "tid": tid,
+                "args": {"name": name},
+            }
+            for tid, name in thread_names.items()
+        ]
+        try:
+            with open(self.path, "w") as f:
+                json.dump(
+                    {"traceEvents": metadata + events, "displayTimeUnit": "ms"}, f
+                )
+        except OSError as e:
+            print(f"Error saving trace: {e}")
+
+
+# Shared by every component, started from the run loop when configured
+tracer = Tracer()
+
+
+def traced(name):
+    """Decorator running the function inside a span called name"""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+            with _Span(tracer, name, None):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -6,6 +6,8 @@ from tkinter import filedialog, messagebox, ttk
 import cv2
 from PIL import Image, ImageDraw, ImageTk
 
+from utils.frame_spool import FrameSpool
+
 # Window Configuration
 DEFAULT_IMAGE_SIZE = (800, 600)
 SCREEN_WIDTH_RATIO = 0.3  # 40% of screen width
@@ -35,18 +37,21 @@ THEME = {
     "font": ("Consolas", 10),
 }
 
+# Frames are spooled to disk, an entry costs a thumbnail in memory
+DEFAULT_MAX_HISTORY = 1000
+
 # Add to existing constants
 TIME_FORMAT = "%H:%M:%S.%f"
 BUTTON_PADDING = (5, 2)
 
 
 class DebugWindow:
-    def __init__(self, root, max_history=50):
+    def __init__(self, root, max_history=DEFAULT_MAX_HISTORY):
         self.root = root
         self.window = None
         self.max_history = max_history
-        self.actions = []
-        self.images = []
+        self.actions = []  # (timestamp, description, frame id, coords)
+        self.frame_spool = FrameSpool()
         self.current_index = None
         self.image_size = DEFAULT_IMAGE_SIZE
         self.auto_follow = True
@@ -319,7 +324,7 @@ class DebugWindow:
             "Clear History", "Are you sure you want to clear all history?"
         ):
             self.actions = []
-            self.images = []
+            self.frame_spool.clear()
             self.current_index = None
             self.refresh_action_list()
             self.image_label.configure(image="")
@@ -349,9 +354,10 @@ class DebugWindow:
                 ]
 
                 for list_index in selected:
-                    actual_index, (timestamp, description, image, coords) = (
+                    actual_index, (timestamp, description, frame_id, coords) = (
                         visible_actions[list_index]
                     )
+                    image = self._frame(frame_id)
 
                     action_data = {
                         "timestamp": timestamp - self.start_time,
@@ -434,13 +440,12 @@ class DebugWindow:
 
         # Limit the history size
         if len(self.actions) >= self.max_history:
-            self.actions.pop(0)
-            self.images.pop(0)
+            self._drop_oldest()
             self.refresh_action_list()
 
-        # Add new action
-        self.actions.append((timestamp, action_description, image, action_coords))
-        self.images.append(image)
+        # Add new action, the frame itself goes to the spool
+        frame_id = self.frame_spool.add(image) if image is not None else None
+        self.actions.append((timestamp, action_description, frame_id, action_coords))
 
         # Update display if passes filter
         if self.filter_text.lower() in action_description.lower():
@@ -492,7 +497,8 @@ class DebugWindow:
 
         actual_index = visible_actions[index][0]
         self.current_index = actual_index
-        timestamp, description, image, action_coords = self.actions[actual_index]
+        timestamp, description, frame_id, action_coords = self.actions[actual_index]
+        image = self._frame(frame_id)
 
         if image is not None:
             # Convert image to RGB mode if it isn't already
@@ -563,10 +569,18 @@ class DebugWindow:
         self.max_history = max_history
         # Trim history if necessary
         while len(self.actions) > self.max_history:
-            self.actions.pop(0)
-            self.images.pop(0)
+            self._drop_oldest()
             self.refresh_action_list()
 
+    def _drop_oldest(self):
+        _, _, frame_id, _ = self.actions.pop(0)
+        if frame_id is not None:
+            self.frame_spool.discard(frame_id)
+
+    def _frame(self, frame_id):
+        """Full frame of an action, decoded from the spool when shown"""
+        return self.frame_spool.frame(frame_id) if frame_id is not None else None
+
     def _on_selection_change(self, event):
         """Handle selection changes in the listbox"""
         current_selection = set(self.action_listbox.curselection())
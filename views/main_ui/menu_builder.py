@@ -47,3 +47,6 @@ class MenuBuilder:
         tools_menu.add_command(
             label="Debug Window", command=self.bot_ui.ui_actions.toggle_debug_window
         )
+        tools_menu.add_command(
+            label="Calibrate Timings", command=self.bot_ui.ui_actions.calibrate_timings
+        )
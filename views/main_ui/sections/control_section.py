@@ -28,3 +28,11 @@ class ControlSection:
             **button_style,
         )
         self.start_stop_button.pack(pady=5)
+
+        self.concede_button = tk.Button(
+            self.section.frame,
+            text="Auto Concede",
+            command=self.bot_ui.ui_actions.toggle_concede,
+            **button_style,
+        )
+        self.concede_button.pack(pady=5)
@@ -1,4 +1,5 @@
 import os
+import threading
 from tkinter import filedialog
 
 import cv2
@@ -35,6 +36,34 @@ class UIActions:
             )
             self.bot_ui.log_section.log_message("Bot stopped.")
 
+    def toggle_concede(self):
+        if not self.bot_ui.bot_running:
+            self.bot_ui.bot_running = True
+            self.bot_ui.control_section.concede_button.config(
+                text="Stop Concede", bg=UI_COLORS["error"]
+            )
+            self.bot_ui.status_section.status_label.config(
+                text="Status: Conceding", fg=UI_COLORS["success"]
+            )
+            self.bot_ui.log_section.log_message("Auto concede started.")
+            self.bot_ui.bot.start_concede()
+        else:
+            self.bot_ui.bot.stop()
+            self.bot_ui.bot_running = False
+            self.bot_ui.control_section.concede_button.config(
+                text="Auto Concede", bg=UI_COLORS["info"]
+            )
+            self.bot_ui.control_section.start_stop_button.config(
+                text="Start Bot", bg=UI_COLORS["info"]
+            )
+            self.bot_ui.status_section.status_label.config(
+                text="Status: Not running", fg=UI_COLORS["error"]
+            )
+            self.bot_ui.log_section.log_message(
+                self.bot_ui.bot.concede_controller.stats.summary()
+            )
+            self.bot_ui.log_section.log_message("Auto concede stopped.")
+
     def select_emulator_path(self):
         path = filedialog.askdirectory()
         if path:
@@ -90,6 +119,14 @@ class UIActions:
         else:
             self.bot_ui.log_section.log_message("Failed to take screenshot.")
 
+    def calibrate_timings(self):
+        self.bot_ui.log_section.log_message(
+            "Calibrating timings, keep a battle with cards in hand open..."
+        )
+        threading.Thread(
+            target=self.bot_ui.bot.game_controller.calibrate_timings, daemon=True
+        ).start()
+
     def show_device_connection_dialog(self):
         DeviceConnectionDialog(
             self.bot_ui.root,